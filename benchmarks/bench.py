@@ -0,0 +1,518 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Benchmarks of kci-dev startup, results commands and result processing.
+
+Three groups of measurements are taken:
+
+startup
+    Import time (``python -X importtime``) of each subcommand and wall time
+    of ``kci-dev <subcommand> --help``.
+results
+    End-to-end latency of ``kci-dev results summary/builds/tests`` against
+    a local HTTP server returning recorded dashboard responses.
+throughput
+    FilterSet, cmd_tests, cmd_compare and maestro validate reconciliation on
+    synthetic datasets.
+
+Results are saved as JSON. Pass the file of an earlier run with --compare to
+report the measurements that got slower than --threshold.
+"""
+
+import contextlib
+import functools
+import http.server
+import json
+import os
+import platform
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+import click
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from kcidev.libs.common import kcidev_version
+from kcidev.libs.results import tests_filter_set
+from kcidev.main import SUBCOMMANDS
+from kcidev.subcommands.maestro.validate.helper import reconcile_items
+from kcidev.subcommands.results.parser import cmd_compare, cmd_tests
+
+GITURL = "https://git.kernel.org/pub/scm/linux/kernel/git/torvalds/linux.git"
+BRANCH = "master"
+COMMIT = "0" * 40
+PREVIOUS_COMMIT = "1" * 40
+
+PLATFORMS = ("qemu-x86", "qemu-arm64", "rk3399-rock-pi-4b", "beaglebone-black")
+ARCHITECTURES = ("x86_64", "arm64", "arm")
+COMPILERS = ("gcc-14", "clang-17")
+TEST_PATHS = ("baseline.login", "baseline.dmesg", "kselftest.cpufreq", "ltp.syscalls")
+STATUSES = ("PASS", "PASS", "PASS", "FAIL", "SKIP", "ERROR")
+
+# Endpoint suffix -> fixture file served by the dashboard stub
+FIXTURES = {
+    "summary": "summary.json",
+    "builds": "builds.json",
+    "tests": "tests.json",
+}
+FIXTURE_RECORDS = 2000
+
+
+def synthetic_builds(count, seed=0):
+    start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    # Records share their nested values, 1M of them still fit in memory
+    misc = [{"platform": p} for p in PLATFORMS]
+    return [
+        {
+            "id": f"maestro:b{i}",
+            "status": STATUSES[(i + seed) % len(STATUSES)],
+            "config_name": f"defconfig-{i % 50}",
+            "architecture": ARCHITECTURES[i % len(ARCHITECTURES)],
+            "compiler": COMPILERS[i % len(COMPILERS)],
+            "git_repository_branch": BRANCH,
+            "start_time": (start + timedelta(seconds=i)).isoformat(),
+            "misc": misc[i % len(misc)],
+            "config_url": None,
+            "log_url": None,
+        }
+        for i in range(count)
+    ]
+
+
+def synthetic_tests(count, seed=0):
+    start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    misc = [{"platform": p} for p in PLATFORMS]
+    compatibles = [[f"vendor,{p}"] for p in PLATFORMS]
+    return [
+        {
+            "id": f"maestro:t{i}",
+            "status": STATUSES[(i + seed) % len(STATUSES)],
+            "path": f"{TEST_PATHS[i % len(TEST_PATHS)]}.case{i % 997}",
+            "duration": i % 600,
+            "start_time": (start + timedelta(seconds=i)).isoformat(),
+            "environment_misc": misc[i % len(misc)],
+            "environment_compatible": compatibles[i % len(compatibles)],
+            "config": f"defconfig-{i % 50}",
+            "architecture": ARCHITECTURES[i % len(ARCHITECTURES)],
+            "compiler": COMPILERS[i % len(COMPILERS)],
+            "git_repository_branch": BRANCH,
+            "log_url": None,
+        }
+        for i in range(count)
+    ]
+
+
+def synthetic_summary(builds, tests):
+    def status(records):
+        counts = {}
+        for record in records:
+            counts[record["status"]] = counts.get(record["status"], 0) + 1
+        return {"status": counts}
+
+    return {
+        "summary": {
+            "builds": status(builds),
+            "boots": status(tests),
+            "tests": status(tests),
+        }
+    }
+
+
+def synthetic_maestro_boots(count):
+    results = ("pass", "pass", "fail", "incomplete")
+    error_data = [{"error_code": code} for code in (None, "Infrastructure", "Job")]
+    return [
+        {
+            "id": f"t{i}",
+            "result": results[i % len(results)],
+            "retry_counter": i % 4,
+            "data": error_data[i % len(error_data)],
+        }
+        for i in range(count)
+    ]
+
+
+def write_fixtures(path, count=FIXTURE_RECORDS):
+    builds = synthetic_builds(count)
+    tests = synthetic_tests(count)
+    responses = {
+        "summary": synthetic_summary(builds, tests),
+        "builds": {"builds": builds},
+        "tests": {"tests": tests},
+    }
+    for name, data in responses.items():
+        with open(os.path.join(path, FIXTURES[name]), "w") as f:
+            json.dump(data, f)
+
+
+class DashboardStub(http.server.BaseHTTPRequestHandler):
+    """Serve the fixture of the last path component of dashboard requests"""
+
+    fixtures = None
+
+    def do_GET(self):
+        endpoint = self.path.split("?")[0].rstrip("/").rsplit("/", 1)[-1]
+        fixture = FIXTURES.get(endpoint)
+        if not fixture:
+            self.send_error(404)
+            return
+        with open(os.path.join(self.fixtures, fixture), "rb") as f:
+            body = f.read()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@contextlib.contextmanager
+def dashboard_stub(fixtures):
+    handler = type("Handler", (DashboardStub,), {"fixtures": fixtures})
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}/api/"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def write_settings(path, dashboard_api):
+    settings = os.path.join(path, "kci-dev.toml")
+    with open(settings, "w") as f:
+        f.write(
+            'default_instance = "bench"\n'
+            "[bench]\n"
+            'api = "https://api.example.org/"\n'
+            'pipeline = "https://pipeline.example.org/"\n'
+            'token = "secret"\n'
+            f'dashboard_api = "{dashboard_api}"\n'
+            'ref_cache = ""\n'
+        )
+    return settings
+
+
+def best_time(func, repeat):
+    """Return the lowest wall time of repeat runs of func"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def run_kcidev(args):
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    process = subprocess.run(
+        [sys.executable, "-m", "kcidev.main", *args],
+        env=env,
+        cwd=ROOT,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+    if process.returncode != 0:
+        raise click.ClickException(
+            f"kci-dev {' '.join(args)} failed: {process.stderr.strip()}"
+        )
+
+
+IMPORTTIME_LINE = re.compile(r"import time:\s+\d+\s+\|\s+(\d+)\s+\|( *)(\S+)")
+
+
+def import_seconds(code):
+    """Return the time spent importing modules while running code"""
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        env=dict(os.environ, PYTHONPATH=ROOT),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    total = 0
+    for line in process.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        # Cumulative times of top level imports include the nested ones
+        if match and len(match.group(2)) == 1:
+            total += int(match.group(1))
+    return total / 1e6
+
+
+def bench_startup(settings, repeat):
+    results = []
+    for name, spec in SUBCOMMANDS.items():
+        module, _, attr = spec.partition(":")
+        code = f"from kcidev.main import cli\nimport {module}"
+        results.append(
+            {
+                "name": f"startup.{name}",
+                "import_seconds": import_seconds(code),
+                "seconds": best_time(
+                    functools.partial(
+                        run_kcidev, ["--settings", settings, name, "--help"]
+                    ),
+                    repeat,
+                ),
+            }
+        )
+    return results
+
+
+def bench_results(settings, repeat):
+    commit_args = ["--giturl", GITURL, "--branch", BRANCH, "--commit", COMMIT]
+    return [
+        {
+            "name": f"results.{command}",
+            "seconds": best_time(
+                functools.partial(
+                    run_kcidev,
+                    ["--settings", settings, "results", command, *commit_args],
+                ),
+                repeat,
+            ),
+        }
+        for command in FIXTURES
+    ]
+
+
+def filter_tests_set(tests):
+    filter_set = tests_filter_set(
+        status="fail", hardware="qemu-*", test_path="baseline.*", compiler="gcc-14"
+    )
+    return filter_set.filter_items(tests)
+
+
+def run_cmd_tests(tests):
+    cmd_tests(
+        tests,
+        COMMIT,
+        download_logs=False,
+        status_filter="fail",
+        filter=None,
+        start_date=None,
+        end_date=None,
+        compiler="gcc-14",
+        config=None,
+        hardware="qemu-*",
+        test_path="baseline.*",
+        git_branch=None,
+        compatible=None,
+        min_duration=None,
+        max_duration=None,
+        count=True,
+        use_json=False,
+        verbose=False,
+    )
+
+
+def run_cmd_compare(data):
+    from kcidev.libs import dashboard
+
+    def fetch(kind):
+        def fetch_data(origin, giturl, branch, commit, *args, **kwargs):
+            return {kind: data[commit][kind]}
+
+        return fetch_data
+
+    patched = {
+        "dashboard_fetch_builds": fetch("builds"),
+        "dashboard_fetch_boots": fetch("boots"),
+        "dashboard_fetch_tests": fetch("tests"),
+    }
+    saved = {name: getattr(dashboard, name) for name in patched}
+    try:
+        for name, func in patched.items():
+            setattr(dashboard, name, func)
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            cmd_compare(
+                "maestro", GITURL, BRANCH, [PREVIOUS_COMMIT, COMMIT], use_json=False
+            )
+    finally:
+        for name, func in saved.items():
+            setattr(dashboard, name, func)
+
+
+def bench_throughput(sizes, repeat):
+    results = []
+    for size in sizes:
+        tests = synthetic_tests(size)
+        builds = synthetic_builds(size // 10)
+        # The previous commit passed a few of the tests failing now
+        previous = [
+            dict(t, status="PASS") if t["status"] == "FAIL" and i % 7 == 0 else t
+            for i, t in enumerate(tests)
+        ]
+        compare_data = {
+            COMMIT: {"builds": builds, "boots": tests, "tests": tests},
+            PREVIOUS_COMMIT: {"builds": builds, "boots": previous, "tests": previous},
+        }
+        maestro_boots = synthetic_maestro_boots(size)
+        dashboard_boots = synthetic_tests(size)
+        benchmarks = {
+            "filterset": lambda: filter_tests_set(tests),
+            "cmd_tests": lambda: run_cmd_tests(tests),
+            "cmd_compare": lambda: run_cmd_compare(compare_data),
+            "validate_reconcile": lambda: reconcile_items(
+                maestro_boots, dashboard_boots, "boot"
+            ),
+        }
+        for name, func in benchmarks.items():
+            seconds = best_time(func, repeat)
+            results.append(
+                {
+                    "name": f"throughput.{name}",
+                    "size": size,
+                    "seconds": seconds,
+                    "records_per_second": size / seconds if seconds else None,
+                }
+            )
+        # Free the datasets before generating the next, bigger ones
+        del tests, previous, compare_data, maestro_boots, dashboard_boots
+    return results
+
+
+def result_key(result):
+    return (result["name"], result.get("size"))
+
+
+def compare_results(baseline, current, threshold):
+    """Return (name, size, baseline seconds, seconds) of the results slower
+    than their baseline by more than threshold (a fraction)"""
+    previous = {result_key(r): r["seconds"] for r in baseline["results"]}
+    regressions = []
+    for result in current["results"]:
+        before = previous.get(result_key(result))
+        if before and result["seconds"] > before * (1 + threshold):
+            regressions.append(
+                (result["name"], result.get("size"), before, result["seconds"])
+            )
+    return regressions
+
+
+def git_commit():
+    process = subprocess.run(
+        ["git", "-C", ROOT, "rev-parse", "HEAD"], capture_output=True, text=True
+    )
+    return process.stdout.strip() or None
+
+
+@click.command(
+    help="""Run the kci-dev benchmarks and save their results as JSON.
+
+\b
+Examples:
+  python benchmarks/bench.py --output before.json
+  python benchmarks/bench.py --output after.json --compare before.json
+  python benchmarks/bench.py --only throughput --sizes 10000
+"""
+)
+@click.option(
+    "--output",
+    default="bench-results.json",
+    show_default=True,
+    type=click.Path(dir_okay=False),
+    help="JSON file to save the results to",
+)
+@click.option(
+    "--only",
+    multiple=True,
+    type=click.Choice(["startup", "results", "throughput"]),
+    help="Benchmark groups to run, all of them by default",
+)
+@click.option(
+    "--sizes",
+    default="10000,100000,1000000",
+    show_default=True,
+    help="Comma separated record counts of the throughput datasets",
+)
+@click.option(
+    "--repeat",
+    default=3,
+    show_default=True,
+    type=click.IntRange(min=1),
+    help="Runs of each benchmark, the fastest one is kept",
+)
+@click.option(
+    "--fixtures",
+    type=click.Path(exists=True, file_okay=False),
+    help="Directory with recorded dashboard responses (summary.json, "
+    "builds.json, tests.json). Synthetic ones are used by default",
+)
+@click.option(
+    "--compare",
+    type=click.Path(exists=True, dir_okay=False),
+    help="Results of an earlier run to compare with",
+)
+@click.option(
+    "--threshold",
+    default=0.2,
+    show_default=True,
+    type=click.FloatRange(min=0),
+    help="Slowdown over --compare results reported as a regression",
+)
+def main(output, only, sizes, repeat, fixtures, compare, threshold):
+    groups = only or ("startup", "results", "throughput")
+    sizes = [int(size) for size in sizes.split(",") if size]
+    report = {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "kcidev_version": kcidev_version,
+        "git_commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": [],
+    }
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if not fixtures:
+            write_fixtures(tmp)
+        with dashboard_stub(fixtures or tmp) as dashboard_api:
+            settings = write_settings(tmp, dashboard_api)
+            if "startup" in groups:
+                click.echo("Running startup benchmarks...", err=True)
+                report["results"] += bench_startup(settings, repeat)
+            if "results" in groups:
+                click.echo("Running results benchmarks...", err=True)
+                report["results"] += bench_results(settings, repeat)
+    if "throughput" in groups:
+        click.echo("Running throughput benchmarks...", err=True)
+        report["results"] += bench_throughput(sizes, repeat)
+
+    with open(output, "w") as f:
+        json.dump(report, f, indent=1)
+    for result in report["results"]:
+        size = f" [{result['size']}]" if "size" in result else ""
+        imports = (
+            f" (imports {result['import_seconds']:.4f}s)"
+            if "import_seconds" in result
+            else ""
+        )
+        click.echo(f"{result['name']}{size}: {result['seconds']:.4f}s{imports}")
+
+    if compare:
+        with open(compare, "r") as f:
+            baseline = json.load(f)
+        regressions = compare_results(baseline, report, threshold)
+        for name, size, before, after in regressions:
+            size = f" [{size}]" if size else ""
+            click.secho(
+                f"Regression {name}{size}: {before:.4f}s -> {after:.4f}s", fg="red"
+            )
+        if regressions:
+            raise SystemExit(1)
+        click.secho(f"No regression over {threshold:.0%} against {compare}", fg="green")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,7 +3,18 @@
 
 """kci-dev public package API."""
 
-from kcidev.api import KciDevError, KernelCIClient, run_command
-from kcidev.libs.common import kcidev_version
-
 __all__ = ["KciDevError", "KernelCIClient", "kcidev_version", "run_command"]
+
+
+def __getattr__(name):
+    # Imported on first access, the CLI entry point doesn't need the library
+    # API and its dependencies loaded at startup.
+    if name == "kcidev_version":
+        from kcidev.libs.common import kcidev_version
+
+        return kcidev_version
+    if name in __all__:
+        from kcidev import api
+
+        return getattr(api, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
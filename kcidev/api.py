@@ -9,6 +9,7 @@ without invoking Click commands or shelling out to ``kci-dev``.
 """
 
 from datetime import datetime, timezone
+from functools import partial
 
 import click
 from click.testing import CliRunner
@@ -34,7 +35,6 @@ from kcidev.libs.dashboard import (
     dashboard_fetch_summary,
     dashboard_fetch_test,
     dashboard_fetch_tests,
-    dashboard_fetch_tree_list,
     dashboard_fetch_tree_report,
     resolve_dashboard_api,
 )
@@ -49,13 +49,16 @@ from kcidev.libs.kcidb import (
     submit_to_kcidb,
 )
 from kcidev.libs.maestro_common import (
+    MAESTRO_PAGE_SIZE,
     maestro_get_node,
     maestro_get_nodes,
+    maestro_iter_nodes,
+    maestro_watch_trees,
     send_checkout_full,
     send_jobretry,
     send_patchset,
 )
-from kcidev.main import get_cli
+from kcidev.libs.results import fetch_boots, fetch_builds, fetch_tests, fetch_trees
 
 
 def run_command(args, *, catch_exceptions=True, env=None, input=None):
@@ -75,6 +78,9 @@ def run_command(args, *, catch_exceptions=True, env=None, input=None):
         A :class:`click.testing.Result` containing ``exit_code``, ``output``,
         ``stdout``, ``stderr``, and any captured exception.
     """
+    # kcidev.main imports this package, import it when the CLI is needed
+    from kcidev.main import get_cli
+
     runner = CliRunner()
     return runner.invoke(
         get_cli(),
@@ -368,11 +374,47 @@ class KernelCIClient:
 
     def get_tree_list(self, origin, days=7):
         return self._dashboard_request(
-            "Dashboard tree list request failed",
-            dashboard_fetch_tree_list,
+            "Dashboard tree list request failed", fetch_trees, origin, days, True
+        )
+
+    def list_builds(self, origin, giturl, branch, commit, arch=None, **filters):
+        """Return the builds of a checkout as a list of records.
+
+        ``filters`` are the keyword arguments of
+        :func:`kcidev.libs.results.fetch_builds`, e.g. ``status="fail"`` or
+        ``compiler="clang"``.
+        """
+        return self._dashboard_request(
+            "Dashboard builds request failed",
+            partial(fetch_builds, arch=arch, **filters),
             origin,
-            True,
-            days,
+            giturl,
+            branch,
+            commit,
+        )
+
+    def list_boots(self, origin, giturl, branch, commit, arch=None, **filters):
+        """Return the boots of a checkout matching the filters of
+        :func:`kcidev.libs.results.fetch_boots` as a list of records."""
+        return self._dashboard_request(
+            "Dashboard boots request failed",
+            partial(fetch_boots, arch=arch, **filters),
+            origin,
+            giturl,
+            branch,
+            commit,
+        )
+
+    def list_tests(self, origin, giturl, branch, commit, arch=None, **filters):
+        """Return the tests of a checkout matching the filters of
+        :func:`kcidev.libs.results.fetch_tests` as a list of records."""
+        return self._dashboard_request(
+            "Dashboard tests request failed",
+            partial(fetch_tests, arch=arch, **filters),
+            origin,
+            giturl,
+            branch,
+            commit,
         )
 
     def get_hardware_list(self, origin):
@@ -529,6 +571,45 @@ class KernelCIClient:
             True,
         )
 
+    def iter_nodes(self, filters=None, page_size=MAESTRO_PAGE_SIZE, api_url=None):
+        """Iterate over all Maestro nodes matching 'field=value' filters.
+
+        Nodes are fetched lazily in pages of ``page_size``, with the next
+        pages requested in the background while earlier ones are consumed.
+        """
+        url = api_url or self._instance_setting("api", human_readable_key="api URL")
+        nodes = maestro_iter_nodes(url, filters or [], page_size=page_size)
+        while True:
+            node = _as_library_error("Maestro nodes request failed", next, nodes, None)
+            if node is None:
+                return
+            yield node
+
+    def watch_trees(
+        self, trees, job_filter, test=None, on_event=None, api_url=None, token=None
+    ):
+        """Watch the jobs of several trees from one polling loop.
+
+        ``trees`` is a list of tree IDs, or a dict mapping tree IDs to their
+        root node name (``checkout`` or ``patchset``). ``on_event`` receives a
+        dict for each finished job and tree. Returns a dict mapping each tree
+        ID to its exit code, as used by ``kci-dev watch``.
+        """
+        url = api_url or self._instance_setting("api", human_readable_key="api URL")
+        token = token or self._instance_setting("token")
+        if not isinstance(trees, dict):
+            trees = {treeid: "checkout" for treeid in trees}
+        return _as_library_error(
+            "Maestro watch failed",
+            maestro_watch_trees,
+            url,
+            token,
+            trees,
+            job_filter,
+            test,
+            on_event=on_event,
+        )
+
     def retry_job(self, node_id, pipeline_url=None, token=None):
         """Retry a failed or incomplete job by Maestro node id."""
         url = pipeline_url or self._instance_setting(
@@ -6,6 +6,13 @@ import urllib
 
 from kcidev.libs.common import *
 from kcidev.libs.dashboard import dashboard_fetch_tree_list
+from kcidev.libs.remote_refs import ls_remote_ref
+
+# Entries identifying a git directory, i.e. a bare repository
+GIT_DIR_ENTRIES = ("HEAD", "objects", "refs")
+
+# Symbolic refs followed when resolving HEAD, as git does
+GIT_SYMREF_DEPTH = 5
 
 
 def repository_url_cleaner(url):
@@ -32,220 +39,260 @@ def repository_url_cleaner(url):
     return url_cleaned
 
 
-def _get_origin_url(current_folder):
-    """Ask Git for origin's URL from a repository or any directory within it."""
-    git_url = subprocess.run(
-        ["git", "remote", "get-url", "origin"],
-        cwd=current_folder,
-        check=True,
-        capture_output=True,
-        text=True,
-    ).stdout.strip()
-    logging.debug(f"Raw git URL from Git: {git_url}")
-    return repository_url_cleaner(git_url)
+def _is_git_dir(path):
+    return all(os.path.exists(os.path.join(path, name)) for name in GIT_DIR_ENTRIES)
+
+
+def _find_git_dir(folder):
+    """Return (work tree, git dir) of the repository containing folder.
+
+    The work tree is None for bare repositories, both are None outside of
+    a repository. Linked worktrees have a .git file pointing to their git
+    dir."""
+    path = os.path.abspath(folder)
+    while True:
+        dot_git = os.path.join(path, ".git")
+        if os.path.isdir(dot_git):
+            return path, dot_git
+        if os.path.isfile(dot_git):
+            with open(dot_git, "r") as f:
+                line = f.read().strip()
+            if not line.startswith("gitdir:"):
+                return None, None
+            gitdir = line[len("gitdir:") :].strip()
+            return path, os.path.normpath(os.path.join(path, gitdir))
+        if _is_git_dir(path):
+            return None, path
+        parent = os.path.dirname(path)
+        if parent == path:
+            return None, None
+        path = parent
+
+
+def _read_file(path):
+    try:
+        with open(path, "r") as f:
+            return f.read()
+    except OSError:
+        return None
 
 
-def is_inside_work_tree():
-    cmd = ["git", "rev-parse", "--is-inside-work-tree"]
-    logging.debug(f"Running command: {' '.join(cmd)}")
-    process = subprocess.Popen(
-        cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True
-    )
-    std_out, std_err = process.communicate()
-    is_inside_work_tree = std_out.strip() == "true"
+def _resolve_ref(gitdir, commondir, ref):
+    """Return the commit of ref from the loose refs or packed-refs, or None"""
+    for _ in range(GIT_SYMREF_DEPTH):
+        value = _read_file(os.path.join(gitdir, ref))
+        if value is None:
+            value = _read_file(os.path.join(commondir, ref))
+        if value is None:
+            for line in (
+                _read_file(os.path.join(commondir, "packed-refs")) or ""
+            ).splitlines():
+                if line.startswith(("#", "^")):
+                    continue
+                sha, _, name = line.partition(" ")
+                if name == ref:
+                    return sha
+            return None
+        value = value.strip()
+        if not value.startswith("ref:"):
+            return value
+        ref = value[len("ref:") :].strip()
+    return None
+
+
+def _config_origin_url(config):
+    """Return the url of the origin remote in a git config file"""
+    section = None
+    for line in config.splitlines():
+        line = line.strip()
+        if not line or line.startswith(("#", ";")):
+            continue
+        header = re.match(r'\[\s*([^\s\]"]+)(?:\s+"(.*)")?\s*\]', line)
+        if header:
+            section = (header.group(1).lower(), header.group(2))
+            continue
+        key, _, value = line.partition("=")
+        if section == ("remote", "origin") and key.strip().lower() == "url":
+            return value.strip().strip('"')
+    return None
 
-    if process.returncode != 0:
-        logging.debug(f"Not in git work tree: {std_err.strip()}")
-        return False
 
-    logging.debug(f"Git work tree check result: {is_inside_work_tree}")
-    if is_inside_work_tree:
+def _needs_git(commondir, config):
+    """Tell whether git itself must resolve refs or the origin url: reftable
+    refs, included config files and url rewrites are not read directly."""
+    if os.path.exists(os.path.join(commondir, "reftable")):
         return True
-    return False
+    configs = [config]
+    for path in (
+        os.path.expanduser("~/.gitconfig"),
+        os.path.join(
+            os.environ.get("XDG_CONFIG_HOME") or os.path.expanduser("~/.config"),
+            "git",
+            "config",
+        ),
+        "/etc/gitconfig",
+    ):
+        configs.append(_read_file(path) or "")
+    text = "\n".join(configs).lower()
+    return "insteadof" in text or re.search(r"^\s*\[\s*include", text, re.M)
+
+
+def _git_metadata(work_tree):
+    """Return the branch, commit and origin url of work_tree using git"""
+    result = subprocess.run(
+        ["git", "-C", work_tree, "rev-parse", "HEAD", "--symbolic-full-name", "HEAD"],
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        logging.debug(f"Failed to resolve HEAD: {result.stderr.strip()}")
+        commit, ref = None, ""
+    else:
+        commit, ref = result.stdout.split()
+    url = subprocess.run(
+        ["git", "-C", work_tree, "remote", "get-url", "origin"],
+        capture_output=True,
+        text=True,
+    ).stdout.strip()
+    return ref, commit, url or None
+
+
+def read_git_metadata(git_folder=None):
+    """Return the origin URL, branch and commit of the repository containing
+    git_folder (the current directory by default), without changing the
+    current directory.
+
+    Returns a dict with work_tree, git_dir, url (cleaned), branch (empty when
+    detached) and commit (None in an empty repository), or None outside of a
+    repository. HEAD, refs, packed-refs and the config are read directly; git
+    is only run for repositories these files don't fully describe."""
+    folder = git_folder or os.getcwd()
+    work_tree, git_dir = _find_git_dir(folder)
+    if git_dir is None:
+        logging.debug(f"No git repository at {folder}")
+        return None
+    metadata = {
+        "work_tree": work_tree,
+        "git_dir": git_dir,
+        "url": None,
+        "branch": "",
+        "commit": None,
+    }
+    if work_tree is None:
+        logging.debug(f"Bare repository at {git_dir}")
+        return metadata
+    commondir = git_dir
+    common = _read_file(os.path.join(git_dir, "commondir"))
+    if common:
+        commondir = os.path.normpath(os.path.join(git_dir, common.strip()))
+    config = _read_file(os.path.join(commondir, "config")) or ""
+    if _needs_git(commondir, config):
+        logging.debug(f"Reading metadata of {work_tree} with git")
+        ref, commit, url = _git_metadata(work_tree)
+    else:
+        head = (_read_file(os.path.join(git_dir, "HEAD")) or "").strip()
+        if head.startswith("ref:"):
+            ref = head[len("ref:") :].strip()
+            commit = _resolve_ref(git_dir, commondir, ref)
+        else:
+            ref, commit = "HEAD", head or None
+        url = _config_origin_url(config)
+    if ref.startswith("refs/heads/"):
+        metadata["branch"] = ref[len("refs/heads/") :]
+    metadata["commit"] = commit
+    if url:
+        logging.debug(f"Raw git URL from config: {url}")
+        metadata["url"] = repository_url_cleaner(url)
+    logging.debug(f"Git metadata of {folder}: {metadata}")
+    return metadata
+
+
+def is_inside_work_tree(git_folder=None):
+    metadata = read_git_metadata(git_folder)
+    inside = bool(metadata and metadata["work_tree"])
+    logging.debug(f"Git work tree check result: {inside}")
+    return inside
 
 
 def get_folder_repository(git_folder, branch):
     kci_msg("git folder: " + str(git_folder))
     logging.info(f"Getting repository info from folder: {git_folder}")
-    if git_folder:
-        current_folder = git_folder
-    else:
-        current_folder = os.getcwd()
-
+    current_folder = git_folder or os.getcwd()
     logging.debug(f"Current folder: {current_folder}")
 
-    previous_folder = os.getcwd()
-    if os.path.isdir(current_folder):
-        os.chdir(current_folder)
-        logging.debug(f"Changed to directory: {current_folder}")
-    else:
-        os.chdir(previous_folder)
+    if not os.path.isdir(current_folder):
         logging.error(f"Invalid directory: {current_folder}")
         kci_err("Not a folder")
         raise click.Abort()
-    bare_process = subprocess.run(
-        ["git", "rev-parse", "--is-bare-repository"],
-        capture_output=True,
-        text=True,
-    )
-    if bare_process.returncode == 0 and bare_process.stdout.strip() == "true":
-        os.chdir(previous_folder)
+    metadata = read_git_metadata(current_folder)
+    if metadata is None:
+        logging.error(f"No git repository found at: {current_folder}")
+        kci_err("Not a GIT folder")
+        raise click.Abort()
+    if metadata["work_tree"] is None:
         logging.error("Selected repository is bare and has no working tree")
         kci_err("The selected repository is bare and has no working tree.")
         raise click.Abort()
+    if not metadata["url"]:
+        logging.error(f"No origin remote in {metadata['work_tree']}")
+        kci_err("The repository has no origin remote")
+        raise click.Abort()
 
-    top_level_process = subprocess.run(
-        ["git", "rev-parse", "--show-toplevel"],
-        capture_output=True,
-        text=True,
+    git_url = metadata["url"]
+    branch_name = metadata["branch"]
+    if branch:
+        logging.info(f"Overriding branch from {branch_name} to {branch}")
+        branch_name = branch
+    last_commit_hash = metadata["commit"] or ""
+    logging.info(
+        f"Repository info - URL: {git_url}, Branch: {branch_name}, Commit: {last_commit_hash}"
     )
-    if top_level_process.returncode == 0:
-        current_folder = top_level_process.stdout.strip()
-    dot_git_folder = os.path.join(current_folder, ".git")
-
-    # Check if we are in a git repository
-    if os.path.exists(dot_git_folder):
-        logging.info(f"Found .git folder at: {dot_git_folder}")
-        # Let Git resolve the configuration, including linked worktrees whose
-        # .git entry is a file rather than a directory.
-        git_url = _get_origin_url(current_folder)
-
-        # Get current branch name
-        cmd = ["git", "branch", "--show-current"]
-        logging.debug(f"Running command: {' '.join(cmd)}")
-        process = subprocess.Popen(
-            cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True
-        )
-        branch_name, branch_err = process.communicate()
-        branch_name = branch_name.strip()
-        if process.returncode != 0:
-            logging.error(f"Failed to get branch name: {branch_err}")
-        else:
-            logging.debug(f"Current branch: {branch_name}")
+    kci_msg("tree: " + git_url)
+    kci_msg("branch: " + branch_name)
+    kci_msg("commit: " + last_commit_hash)
+    return git_url, branch_name, last_commit_hash
 
-        if branch:
-            logging.info(f"Overriding branch from {branch_name} to {branch}")
-            branch_name = branch
 
-        # Get last commit hash
-        cmd = ["git", "rev-parse", "HEAD"]
-        logging.debug(f"Running command: {' '.join(cmd)}")
-        process = subprocess.Popen(
-            cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True
-        )
-        last_commit_hash, commit_err = process.communicate()
-        last_commit_hash = last_commit_hash.strip()
-        if process.returncode != 0:
-            logging.error(f"Failed to get commit hash: {commit_err}")
-        else:
-            logging.debug(f"Current commit: {last_commit_hash}")
-
-        os.chdir(previous_folder)
-        logging.info(
-            f"Repository info - URL: {git_url}, Branch: {branch_name}, Commit: {last_commit_hash}"
-        )
-        kci_msg("tree: " + git_url)
-        kci_msg("branch: " + branch_name)
-        kci_msg("commit: " + last_commit_hash)
-        return git_url, branch_name, last_commit_hash
-    else:
-        os.chdir(previous_folder)
-        logging.error(f"No .git folder found at: {dot_git_folder}")
-        kci_err("Not a GIT folder")
-        raise click.Abort()
+def _folder_metadata(git_folder, what):
+    folder = git_folder or os.getcwd()
+    if not os.path.isdir(folder):
+        logging.warning(f"Invalid directory for {what} check: {folder}")
+        return None
+    metadata = read_git_metadata(folder)
+    if not metadata or not metadata["work_tree"]:
+        logging.debug("Not in a git work tree")
+        return None
+    return metadata
 
 
 def get_current_branch_name(git_folder):
     """Get the current branch name from a git repository."""
     logging.debug(f"Getting branch name from: {git_folder}")
-    if git_folder:
-        current_folder = git_folder
-    else:
-        current_folder = os.getcwd()
-
-    previous_folder = os.getcwd()
-    if os.path.isdir(current_folder):
-        os.chdir(current_folder)
-    else:
-        logging.warning(f"Invalid directory for branch check: {current_folder}")
-        os.chdir(previous_folder)
-        return None
-
-    if is_inside_work_tree():
-        cmd = ["git", "branch", "--show-current"]
-        logging.debug(f"Running command: {' '.join(cmd)}")
-        process = subprocess.Popen(
-            cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True
-        )
-        branch_name, err = process.communicate()
-        branch_name = branch_name.strip()
-        if process.returncode == 0:
-            logging.info(f"Current branch: {branch_name}")
-        else:
-            logging.error(f"Failed to get branch: {err}")
-        os.chdir(previous_folder)
-        return branch_name
-    else:
-        logging.debug("Not in a git work tree")
-        os.chdir(previous_folder)
+    metadata = _folder_metadata(git_folder, "branch")
+    if metadata is None:
         return None
+    logging.info(f"Current branch: {metadata['branch']}")
+    return metadata["branch"]
 
 
 def get_current_commit_hash(git_folder):
     """Get the current commit hash from a git repository."""
     logging.debug(f"Getting commit hash from: {git_folder}")
-    if git_folder:
-        current_folder = git_folder
-    else:
-        current_folder = os.getcwd()
-
-    previous_folder = os.getcwd()
-    if os.path.isdir(current_folder):
-        os.chdir(current_folder)
-    else:
-        logging.warning(f"Invalid directory for commit check: {current_folder}")
-        os.chdir(previous_folder)
-        return None
-
-    if is_inside_work_tree():
-        cmd = ["git", "rev-parse", "HEAD"]
-        logging.debug(f"Running command: {' '.join(cmd)}")
-        process = subprocess.Popen(
-            cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True
-        )
-        commit_hash, err = process.communicate()
-        commit_hash = commit_hash.strip()
-        if process.returncode == 0:
-            logging.info(f"Current commit: {commit_hash}")
-        else:
-            logging.error(f"Failed to get commit: {err}")
-        os.chdir(previous_folder)
-        return commit_hash
-    else:
-        logging.debug("Not in a git work tree")
-        os.chdir(previous_folder)
+    metadata = _folder_metadata(git_folder, "commit")
+    if metadata is None:
         return None
+    logging.info(f"Current commit: {metadata['commit']}")
+    return metadata["commit"]
 
 
 def get_repository_url(git_folder):
     """Get the repository URL from a git repository."""
     logging.debug(f"Getting repository URL from: {git_folder}")
-    if git_folder:
-        current_folder = git_folder
-    else:
-        current_folder = os.getcwd()
-
-    if not os.path.isdir(current_folder):
-        logging.warning(f"Invalid directory for URL check: {current_folder}")
-        return None
-
-    try:
-        git_url = _get_origin_url(current_folder)
-        logging.info(f"Repository URL: {git_url}")
-        return git_url
-    except (OSError, subprocess.CalledProcessError) as error:
-        logging.error(f"Failed to get repository URL: {error}")
+    metadata = _folder_metadata(git_folder, "URL")
+    if metadata is None:
         return None
+    logging.info(f"Repository URL: {metadata['url']}")
+    return metadata["url"]
 
 
 def get_latest_commit(origin, giturl, branch):
@@ -292,73 +339,27 @@ def resolve_git_reference(git_folder, reference, giturl=None):
     else:
         current_folder = os.getcwd()
 
-    previous_folder = os.getcwd()
-
     # Try to resolve using git ls-remote if we have a giturl
     # Note: ls-remote only works for refs (tags, branches), not short commits
     if giturl and not (
         len(reference) < 40 and all(c in "0123456789abcdef" for c in reference.lower())
     ):
         logging.info(f"Attempting to resolve {reference} from remote {giturl}")
-        # First try with the reference as-is
-        cmd = ["git", "ls-remote", giturl, reference]
-        logging.debug(f"Running command: {' '.join(cmd)}")
-        process = subprocess.Popen(
-            cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True
-        )
-        output, err = process.communicate()
-
-        if process.returncode == 0 and output:
-            # ls-remote output format: "<sha1>\t<ref>"
-            commit_hash = output.strip().split("\t")[0]
-            if commit_hash:
-                logging.debug(f"Found reference {reference} pointing to {commit_hash}")
-
-                # If this looks like a tag, we need to dereference it to get the commit
-                # Try with ^{} to get the commit the tag points to
-                cmd_deref = ["git", "ls-remote", giturl, f"{reference}^{{}}"]
-                logging.debug(f"Dereferencing tag with command: {' '.join(cmd_deref)}")
-                process_deref = subprocess.Popen(
-                    cmd_deref, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True
-                )
-                output_deref, err_deref = process_deref.communicate()
-
-                if process_deref.returncode == 0 and output_deref:
-                    dereferenced_hash = output_deref.strip().split("\t")[0]
-                    if dereferenced_hash and dereferenced_hash != commit_hash:
-                        logging.info(
-                            f"Resolved tag {reference} to commit {dereferenced_hash}"
-                        )
-                        return dereferenced_hash
-
-                # If dereferencing failed or returned same hash, use original
-                logging.info(f"Resolved {reference} to {commit_hash} from remote")
-                return commit_hash
-        else:
-            logging.debug(f"Failed to resolve from remote: {err}")
+        commit_hash = ls_remote_ref(giturl, reference)
+        if commit_hash:
+            return commit_hash
 
     # Try local resolution if we have a local git directory
-    if os.path.isdir(current_folder):
-        os.chdir(current_folder)
-
-        if is_inside_work_tree():
-            # Try to resolve the reference to a commit SHA1
-            cmd = ["git", "rev-parse", reference]
-            logging.debug(f"Running command: {' '.join(cmd)}")
-            process = subprocess.Popen(
-                cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True
-            )
-            commit_hash, err = process.communicate()
-            commit_hash = commit_hash.strip()
-
-            if process.returncode == 0:
-                logging.info(f"Resolved {reference} to {commit_hash} locally")
-                os.chdir(previous_folder)
-                return commit_hash
-            else:
-                logging.debug(f"Failed to resolve reference locally: {err.strip()}")
-
-        os.chdir(previous_folder)
+    if os.path.isdir(current_folder) and is_inside_work_tree(current_folder):
+        # Try to resolve the reference to a commit SHA1
+        cmd = ["git", "-C", current_folder, "rev-parse", reference]
+        logging.debug(f"Running command: {' '.join(cmd)}")
+        process = subprocess.run(cmd, capture_output=True, text=True)
+        commit_hash = process.stdout.strip()
+        if process.returncode == 0:
+            logging.info(f"Resolved {reference} to {commit_hash} locally")
+            return commit_hash
+        logging.debug(f"Failed to resolve reference locally: {process.stderr.strip()}")
 
     # If it looks like a short commit hash, we'll let the API try to handle it
     if len(reference) < 40 and all(c in "0123456789abcdef" for c in reference.lower()):
@@ -373,12 +374,20 @@ def resolve_git_reference(git_folder, reference, giturl=None):
 
 def set_giturl_branch_commit(origin, giturl, branch, commit, latest, git_folder):
     logging.info("Setting git URL, branch, and commit parameters")
-    # Fill in any missing parameters from local git repository
+    # Fill in any missing parameters from local git repository, all read
+    # at once
+    metadata = None
+    if not giturl or not branch or not (commit or latest):
+        metadata = _folder_metadata(git_folder, "repository") or {
+            "url": None,
+            "branch": None,
+            "commit": None,
+        }
     if not giturl:
         logging.debug(
             "No git URL provided, attempting to determine from local repository"
         )
-        giturl = get_repository_url(git_folder)
+        giturl = metadata["url"]
         if not giturl:
             logging.error("Failed to determine git URL from local repository")
             kci_err("No git URL provided and could not determine from local repository")
@@ -388,7 +397,7 @@ def set_giturl_branch_commit(origin, giturl, branch, commit, latest, git_folder)
         logging.debug(
             "No branch provided, attempting to determine from local repository"
         )
-        branch = get_current_branch_name(git_folder)
+        branch = metadata["branch"]
         if not branch:
             logging.error("Failed to determine branch from local repository")
             kci_err("No branch provided and could not determine from local repository")
@@ -398,7 +407,7 @@ def set_giturl_branch_commit(origin, giturl, branch, commit, latest, git_folder)
         logging.debug(
             "No commit provided, attempting to determine from local repository"
         )
-        commit = get_current_commit_hash(git_folder)
+        commit = metadata["commit"]
         if not commit:
             logging.error("Failed to determine commit from local repository")
             kci_err("No commit provided and could not determine from local repository")
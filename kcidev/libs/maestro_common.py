@@ -1,15 +1,18 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+import collections
 import errno
 import json
 import logging
 import time
+from concurrent.futures import ThreadPoolExecutor
 
 import click
 import requests
 
 from kcidev.libs.common import *
+from kcidev.libs.node_store import NODE_STORE_STATE, get_node_store, sync_limit
 
 PIPELINE_ENDPOINTS = {
     "checkout": "api/checkout",
@@ -17,6 +20,28 @@ PIPELINE_ENDPOINTS = {
     "patchset": "api/patchset",
 }
 
+# Nodes requested per call when walking large node queries page by page, and
+# how many of the following pages are fetched ahead of the consumer.
+MAESTRO_PAGE_SIZE = 250
+MAESTRO_PREFETCH_PAGES = 2
+
+# Parent ids sent in one parent__in query by maestro_get_children, and how
+# many of those batched queries run at the same time.
+MAESTRO_PARENT_BATCH = 50
+MAESTRO_CHILD_WORKERS = 4
+
+# maestro_watch_jobs polls quickly while nodes are changing and backs off
+# towards the idle interval while nothing happens.
+WATCH_POLL_FAST = 5
+WATCH_POLL_IDLE = 30
+WATCH_TEST_RESULT_TIMEOUT = 60
+
+
+class MaestroError(click.ClickException):
+    """A Maestro API request failed, exits the CLI with ENOENT"""
+
+    exit_code = errno.ENOENT
+
 
 def _api_url(base_url, path):
     """Join an API base URL and path without requiring a trailing slash."""
@@ -68,9 +93,17 @@ def maestro_print_nodes(nodes, field):
 
 
 def maestro_get_node(url, nodeid):
+    store = get_node_store()
+    if store:
+        node_data = store.get(url, nodeid)
+        if node_data:
+            logging.info(f"Maestro node {nodeid} served from node store")
+            return node_data
+
     headers = {
         "Content-Type": "application/json; charset=utf-8",
     }
+    base_url = url
     url = _api_url(url, f"latest/node/{nodeid}")
     logging.info(f"Fetching Maestro node: {nodeid}")
     logging.debug(f"Node URL: {url}")
@@ -83,11 +116,10 @@ def maestro_get_node(url, nodeid):
     except requests.exceptions.HTTPError as ex:
         logging.error(f"HTTP error fetching node {nodeid}: {ex}")
         maestro_api_error(ex.response)
-        sys.exit(errno.ENOENT)
+        raise MaestroError(f"Could not fetch Maestro node {nodeid}") from ex
     except Exception as ex:
         logging.error(f"Unexpected error fetching node {nodeid}: {ex}")
-        kci_err(ex)
-        sys.exit(errno.ENOENT)
+        raise MaestroError(f"Could not fetch Maestro node {nodeid}: {ex}") from ex
 
     node_data = response.json()
     if node_data is None:
@@ -95,24 +127,18 @@ def maestro_get_node(url, nodeid):
     logging.debug(
         f"Node {nodeid} data received, state: {node_data.get('state', 'unknown')}"
     )
+    if store:
+        store.add(base_url, [node_data])
     return node_data
 
 
-def maestro_get_nodes(url, limit, offset, filter, paginate):
+def _maestro_fetch_nodes(url, params):
     headers = {
         "Content-Type": "application/json; charset=utf-8",
     }
 
+    base_url = url
     url = _api_url(url, "latest/nodes/fast")
-    params = []
-    if paginate:
-        params.extend((("limit", limit), ("offset", offset)))
-        logging.info(f"Fetching Maestro nodes - limit: {limit}, offset: {offset}")
-    if filter:
-        logging.debug(f"Applying filters: {filter}")
-        # TBD: We need to translate filters if the API supports operators
-        # more complex than equality.
-        params.extend(tuple(f.split("=", 1)) for f in filter)
     logging.debug(f"Full nodes URL: {url}")
     maestro_print_api_call(url)
 
@@ -123,17 +149,195 @@ def maestro_get_nodes(url, limit, offset, filter, paginate):
     except requests.exceptions.HTTPError as ex:
         logging.error(f"HTTP error fetching nodes: {ex}")
         maestro_api_error(ex.response)
-        sys.exit(errno.ENOENT)
+        raise MaestroError("Could not fetch Maestro nodes") from ex
     except Exception as ex:
         logging.error(f"Unexpected error fetching nodes: {ex}")
-        kci_err(ex)
-        sys.exit(errno.ENOENT)
+        raise MaestroError(f"Could not fetch Maestro nodes: {ex}") from ex
 
     nodes_data = response.json()
     logging.info(f"Retrieved {len(nodes_data)} nodes")
+    store = get_node_store()
+    if store:
+        store.add(base_url, nodes_data)
     return nodes_data
 
 
+def _maestro_filter_params(filter):
+    if not filter:
+        return []
+    logging.debug(f"Applying filters: {filter}")
+    # TBD: We need to translate filters if the API supports operators
+    # more complex than equality.
+    return [tuple(f.split("=", 1)) for f in filter]
+
+
+def _maestro_fetch_nodes_page(url, filter, limit, offset):
+    logging.info(f"Fetching Maestro nodes - limit: {limit}, offset: {offset}")
+    params = [("limit", limit), ("offset", offset)]
+    params.extend(_maestro_filter_params(filter))
+    return _maestro_fetch_nodes(url, params)
+
+
+def maestro_iter_nodes(
+    url,
+    filter,
+    page_size=MAESTRO_PAGE_SIZE,
+    offset=0,
+    limit=None,
+    prefetch=MAESTRO_PREFETCH_PAGES,
+):
+    """Lazily yield Maestro nodes matching ``filter``, one page at a time.
+
+    Pages of ``page_size`` nodes are requested starting at ``offset`` until
+    the API returns a short page or ``limit`` nodes have been yielded. Once a
+    full page arrives, up to ``prefetch`` following pages are requested in the
+    background while the caller consumes the current one.
+    """
+    end = None if limit is None else offset + limit
+    if page_size < 1 or (end is not None and end <= offset):
+        return
+
+    def page_limit(start):
+        return page_size if end is None else min(page_size, end - start)
+
+    size = page_limit(offset)
+    page = _maestro_fetch_nodes_page(url, filter, size, offset)
+    next_offset = offset + size
+    pending = collections.deque()
+    executor = ThreadPoolExecutor(max_workers=max(1, prefetch))
+    try:
+        while True:
+            full = len(page) >= size
+            if full:
+                while len(pending) < max(1, prefetch) and (
+                    end is None or next_offset < end
+                ):
+                    next_size = page_limit(next_offset)
+                    future = executor.submit(
+                        _maestro_fetch_nodes_page,
+                        url,
+                        filter,
+                        next_size,
+                        next_offset,
+                    )
+                    pending.append((next_size, future))
+                    next_offset += next_size
+            yield from page
+            if not full or not pending:
+                return
+            size, future = pending.popleft()
+            page = future.result()
+    finally:
+        executor.shutdown(cancel_futures=True)
+
+
+def maestro_get_nodes(url, limit, offset, filter, paginate):
+    """Return Maestro nodes matching ``filter`` as a list.
+
+    With ``paginate`` at most ``limit`` nodes are returned starting at
+    ``offset``; otherwise every matching node is fetched page by page.
+    """
+    if paginate:
+        nodes_data = list(
+            maestro_iter_nodes(
+                url,
+                filter,
+                page_size=min(limit, MAESTRO_PAGE_SIZE),
+                offset=offset,
+                limit=limit,
+            )
+        )
+    else:
+        nodes_data = _maestro_query_nodes(url, filter)
+    logging.info(f"Retrieved {len(nodes_data)} nodes in total")
+    return nodes_data
+
+
+def _maestro_query_nodes(url, filter):
+    """Walk every node matching ``filter``, using the node store if enabled.
+
+    The first walk of a query records its nodes in the store. Later walks
+    of the same query only request the done nodes updated since then plus the
+    nodes that are not done yet, and take the rest from the store. Nodes are
+    returned in the order the API first listed them.
+    """
+    store = get_node_store()
+    filter = list(filter or [])
+    states = [f.split("=", 1)[1] for f in filter if f.split("=", 1)[0] == "state"]
+    state_ops = [f for f in filter if f.startswith("state__")]
+    if not store or state_ops or states not in ([], [NODE_STORE_STATE]):
+        return list(maestro_iter_nodes(url, filter))
+
+    key = store.query_key(filter)
+    synced = store.query_synced(url, key)
+    limit = sync_limit()
+    if synced is None:
+        nodes_data = list(maestro_iter_nodes(url, filter))
+        store.record_query(url, key, nodes_data, limit=limit)
+        return nodes_data
+
+    done_filter = filter if states else filter + [f"state={NODE_STORE_STATE}"]
+    if synced:
+        done_filter = done_filter + [f"updated__gt={synced}"]
+    updated = list(maestro_iter_nodes(url, done_filter))
+    pending = []
+    if not states:
+        pending = list(
+            maestro_iter_nodes(url, filter + [f"state__ne={NODE_STORE_STATE}"])
+        )
+    store.record_query(url, key, updated + pending, synced, limit)
+    nodes_data = store.query_nodes(url, key, pending)
+    logging.info(
+        f"Served {len(nodes_data) - len(updated) - len(pending)} nodes from node store"
+    )
+    return nodes_data
+
+
+def maestro_get_children(
+    url,
+    parent_ids,
+    filter,
+    cache=None,
+    batch_size=MAESTRO_PARENT_BATCH,
+    workers=MAESTRO_CHILD_WORKERS,
+):
+    """Return ``{parent_id: [children]}`` for every id in ``parent_ids``.
+
+    Children are requested with ``parent__in`` filters of up to
+    ``batch_size`` parents, running up to ``workers`` batches concurrently.
+    When a ``cache`` dict is passed, parents already looked up with the same
+    ``filter`` are served from it and new results are stored in it.
+    """
+    key = tuple(filter or ())
+    children = {}
+    missing = []
+    for parent_id in dict.fromkeys(parent_ids):
+        if cache is not None and (key, parent_id) in cache:
+            children[parent_id] = cache[(key, parent_id)]
+        else:
+            children[parent_id] = []
+            missing.append(parent_id)
+    if not missing:
+        return children
+
+    batches = [missing[i : i + batch_size] for i in range(0, len(missing), batch_size)]
+    logging.info(f"Fetching children of {len(missing)} nodes in {len(batches)} batches")
+
+    def fetch(batch):
+        batch_filter = [f"parent__in={','.join(batch)}"] + list(filter or [])
+        return list(maestro_iter_nodes(url, batch_filter))
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        for nodes in executor.map(fetch, batches):
+            for node in nodes:
+                if node.get("parent") in children:
+                    children[node["parent"]].append(node)
+    if cache is not None:
+        for parent_id in missing:
+            cache[(key, parent_id)] = children[parent_id]
+    return children
+
+
 def maestro_check_node(node, root_node="checkout"):
     """
     Node can be defined RUNNING/DONE/FAIL based on the state
@@ -168,20 +372,18 @@ def maestro_check_node(node, root_node="checkout"):
     return status
 
 
-def maestro_retrieve_treeid_nodes(baseurl, token, treeid):
+def _maestro_retrieve_watch_nodes(baseurl, token, params, what):
     url = _api_url(baseurl, "latest/nodes/fast")
     headers = {
         "Content-Type": "application/json; charset=utf-8",
         "Authorization": f"{token}",
     }
 
-    logging.info(f"Retrieving nodes for tree ID: {treeid}")
-    logging.debug(f"Tree nodes URL: {url}")
+    logging.info(f"Retrieving nodes for {what}")
+    logging.debug(f"Tree nodes URL: {url}, params: {params}")
 
     try:
-        response = kcidev_session.get(
-            url, headers=headers, params={"treeid": treeid}, timeout=30
-        )
+        response = kcidev_session.get(url, headers=headers, params=params, timeout=30)
         logging.debug(f"Tree nodes request status: {response.status_code}")
     except requests.exceptions.RequestException as e:
         logging.warning(f"Request exception retrieving tree nodes: {e}")
@@ -193,15 +395,33 @@ def maestro_retrieve_treeid_nodes(baseurl, token, treeid):
         return None
 
     if response.status_code >= 400:
-        logging.error(f"API error response for tree {treeid}: {response.status_code}")
+        logging.error(f"API error response for {what}: {response.status_code}")
         maestro_api_error(response)
         return None
 
     nodes = response.json()
-    logging.info(f"Retrieved {len(nodes)} nodes for tree {treeid}")
+    logging.info(f"Retrieved {len(nodes)} nodes for {what}")
     return nodes
 
 
+def maestro_retrieve_treeid_nodes(baseurl, token, treeid, updated_after=None):
+    params = {"treeid": treeid}
+    if updated_after:
+        # Only ask for nodes that changed since the last poll
+        params["updated__gt"] = updated_after
+    return _maestro_retrieve_watch_nodes(baseurl, token, params, f"tree {treeid}")
+
+
+def maestro_retrieve_trees_nodes(baseurl, token, treeids, updated_after=None):
+    """Retrieve the nodes of several trees with a single API request."""
+    params = {"treeid__in": ",".join(treeids)}
+    if updated_after:
+        params["updated__gt"] = updated_after
+    return _maestro_retrieve_watch_nodes(
+        baseurl, token, params, f"{len(treeids)} trees"
+    )
+
+
 def maestro_node_result(node):
     result = node["result"]
     if node["kind"] == "checkout":
@@ -235,115 +455,455 @@ def maestro_node_result(node):
     kci_msg(f" - node_id:{node['id']} ({node['updated']})")
 
 
-def maestro_watch_jobs(baseurl, token, treeid, job_filter, test, root_node="checkout"):
+def maestro_subscribe(baseurl, token, channel="node"):
+    """Subscribe to a Maestro pub/sub channel, return the subscription ID"""
+    url = _api_url(baseurl, f"latest/subscribe/{channel}")
+    headers = {
+        "Content-Type": "application/json; charset=utf-8",
+        "Authorization": f"{token}",
+    }
+    logging.info(f"Subscribing to Maestro {channel} events")
+    try:
+        response = kcidev_session.post(url, headers=headers, timeout=30)
+    except requests.exceptions.RequestException as e:
+        logging.warning(f"Failed to subscribe to {channel} events: {e}")
+        return None
+    if response.status_code >= 400:
+        logging.warning(
+            f"Subscription to {channel} events refused: {response.status_code}"
+        )
+        return None
+    try:
+        sub_id = response.json().get("id")
+    except ValueError as e:
+        # Proxies may answer with an HTML page
+        logging.warning(f"Invalid subscription reply for {channel} events: {e}")
+        return None
+    logging.debug(f"Subscribed to {channel} events, subscription: {sub_id}")
+    return sub_id
+
+
+def maestro_unsubscribe(baseurl, token, sub_id):
+    url = _api_url(baseurl, f"latest/unsubscribe/{sub_id}")
+    headers = {"Authorization": f"{token}"}
+    logging.info(f"Unsubscribing from Maestro events, subscription: {sub_id}")
+    try:
+        kcidev_session.post(url, headers=headers, timeout=30)
+    except requests.exceptions.RequestException as e:
+        logging.warning(f"Failed to unsubscribe {sub_id}: {e}")
+
+
+def _maestro_event_node(message):
+    """Extract the node carried by a pub/sub message, if any"""
+    data = message.get("data") if isinstance(message, dict) else None
+    if isinstance(data, str):
+        try:
+            data = json.loads(data)
+        except json.JSONDecodeError:
+            # keep-alive messages are plain strings
+            return None
+    # events are wrapped in CloudEvents envelopes
+    if isinstance(data, dict) and "specversion" in data:
+        data = data.get("data")
+    if isinstance(data, dict):
+        return data
+    return None
+
+
+def maestro_wait_for_event(baseurl, token, subscription, timeout, is_relevant):
+    """
+    Wait up to timeout seconds for a node event accepted by is_relevant.
+    Return True when such an event arrived. If listening fails, the
+    subscription is marked inactive and the rest of the timeout is slept.
+    """
+    if not subscription["active"]:
+        time.sleep(timeout)
+        return False
+    url = _api_url(baseurl, f"latest/listen/{subscription['id']}")
+    headers = {"Authorization": f"{token}"}
+    deadline = time.monotonic() + timeout
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return False
+        try:
+            response = kcidev_session.get(url, headers=headers, timeout=(10, remaining))
+            response.raise_for_status()
+            message = response.json()
+        except requests.exceptions.ReadTimeout:
+            return False
+        except (requests.exceptions.RequestException, ValueError) as e:
+            logging.warning(f"Listening for node events failed: {e}")
+            kci_warning("Node event stream unavailable, falling back to polling")
+            subscription["active"] = False
+            time.sleep(max(0, deadline - time.monotonic()))
+            return False
+        node = _maestro_event_node(message)
+        if node and is_relevant(node):
+            logging.debug(f"Node event for {node.get('name')} ({node.get('id')})")
+            return True
+
+
+def _maestro_watch_waiter(baseurl, token, events, is_relevant):
+    """
+    Return a (wait, close) pair. wait(interval) blocks until the next poll
+    is due: with events enabled, until a relevant node event arrives (or the
+    idle interval passes as a safety net), otherwise for interval seconds.
+    """
+    sub_id = maestro_subscribe(baseurl, token) if events else None
+    if events and sub_id is None:
+        kci_warning("Node event subscription unavailable, falling back to polling")
+    subscription = {"id": sub_id, "active": sub_id is not None}
+
+    def wait(interval):
+        if not subscription["active"]:
+            time.sleep(interval)
+            return
+        maestro_wait_for_event(
+            baseurl, token, subscription, WATCH_POLL_IDLE, is_relevant
+        )
+
+    def close():
+        if sub_id is not None:
+            maestro_unsubscribe(baseurl, token, sub_id)
+
+    return wait, close
+
+
+def _maestro_watch_relevance(states):
+    """Tell whether a node event belongs to one of the trees of states,
+    which may be filled after the subscription"""
+
+    def is_relevant(node):
+        return node.get("treeid") in states
+
+    return is_relevant
+
+
+def maestro_watch_state(job_filter, root_node="checkout"):
+    """Return the state used to follow the jobs of a single tree."""
     # the tree's root node (checkout or patchset) must complete as well
     job_filter = list(job_filter)
     job_filter.append(root_node)
-    kci_log(f"job_filter: {', '.join(job_filter)}")
+    return {
+        "job_filter": job_filter,
+        "root_node": root_node,
+        # Nodes seen so far, keyed by node ID
+        "nodes": {},
+        "last_updated": None,
+        "jobs": {job: {"done": False, "running": False} for job in job_filter},
+        "jobs_done_ts": None,
+        "failed_job": None,
+        "test_result": None,
+    }
+
+
+def maestro_watch_merge(state, updates):
+    """Merge updated nodes into the watch state"""
+    for node in updates:
+        state["nodes"][node["id"]] = node
+        if state["last_updated"] is None or node["updated"] > state["last_updated"]:
+            state["last_updated"] = node["updated"]
+
+
+def maestro_watch_check(state, test, on_job_done=None):
+    """
+    Check the watched jobs of a tree against the nodes seen so far.
+    Return None while the watch must go on, otherwise the exit code:
+    0 - jobs completed (or test passed), 1 - test failed,
+    2 - a job failed before the test or the test result never showed up
+    """
+    job_filter = state["job_filter"]
+    root_node = state["root_node"]
+    inprogress = 0
+    joblist = job_filter.copy()
+
+    # Tricky part in watch is that we might have one item in job_filter (job, test),
+    # but it might spawn multiple nodes with same name
+    test_result = None
+    logging.debug(f"Processing {len(state['nodes'])} nodes")
+    for node in state["nodes"].values():
+        if node["name"] == test:
+            test_result = node["result"]
+            logging.debug(f"Test node {test} result: {test_result}")
+        if node["name"] not in job_filter:
+            continue
+        job = state["jobs"][node["name"]]
+        status = maestro_check_node(node, root_node=root_node)
+        if status == "DONE":
+            if not job["done"]:
+                logging.info(
+                    f"Job {node['name']} completed with result: {node['result']}"
+                )
+                if on_job_done:
+                    on_job_done(node, job["running"])
+                job["done"] = True
+            job["running"] = False
+            if node["name"] in joblist:
+                joblist.remove(node["name"])
+        elif status == "RUNNING":
+            logging.debug(f"Job {node['name']} is running")
+            job["running"] = True
+            inprogress += 1
+        else:
+            logging.warning(f"Job {node['name']} failed with status: {status}")
+            if node["name"] in joblist:
+                joblist.remove(node["name"])
+            # if test is same as job, dont indicate infra-failure if test job fail
+            if test and test != node["name"]:
+                # if we have a test, and prior job failed, we should indicate that
+                logging.error(f"Job {node['name']} failed, test cannot be executed")
+                state["failed_job"] = node["name"]
+                return 2
+    state["test_result"] = test_result
+    # The test result is all the caller waits for, so there is no need to
+    # wait for the remaining jobs once it is known.
+    if test and test_result:
+        return 0 if test_result == "pass" else 1
+    if len(joblist) == 0 and inprogress == 0:
+        logging.info(
+            f"All jobs completed. Remaining in queue: {len(joblist)}, in progress: {inprogress}"
+        )
+        kci_info("All jobs completed")
+        if not test:
+            return 0
+        if state["jobs_done_ts"] is None:
+            state["jobs_done_ts"] = time.monotonic()
+            logging.debug("All jobs done, waiting for test results")
+        # if all jobs done, usually test results must be available
+        # max within 60s. Safeguard in case of test node is not available
+        test_result_wait = time.monotonic() - state["jobs_done_ts"]
+        if test_result_wait < WATCH_TEST_RESULT_TIMEOUT:
+            logging.debug(
+                f"Waiting for test results ({int(test_result_wait)}s elapsed)"
+            )
+            return None
+        logging.error(f"Test {test} result was not available after 60s")
+        return 2
+    return None
+
+
+def _print_job_done(node, was_running):
+    if was_running:
+        kci_msg("")
+    maestro_node_result(node)
+
+
+def maestro_watch_jobs(
+    baseurl, token, treeid, job_filter, test, root_node="checkout", events=False
+):
+    session = maestro_watch_session(
+        baseurl, token, job_filter, test, root_node=root_node, events=events
+    )
+    try:
+        ret = maestro_watch_tree(session, treeid)
+    finally:
+        maestro_watch_close(session)
+    if test:
+        sys.exit(ret)
+
+
+def maestro_watch_session(
+    baseurl, token, job_filter, test, root_node="checkout", events=False
+):
+    """
+    Open a session to watch trees with the same jobs one after the other,
+    as bisection does. The event subscription, if any, is shared by all the
+    trees watched with maestro_watch_tree() until maestro_watch_close().
+    """
+    trees = {}
+    wait, close = _maestro_watch_waiter(
+        baseurl,
+        token,
+        events,
+        _maestro_watch_relevance(trees),
+    )
+    return {
+        "baseurl": baseurl,
+        "token": token,
+        "job_filter": job_filter,
+        "test": test,
+        "root_node": root_node,
+        # Watch state of the tree being watched, keyed by tree ID
+        "trees": trees,
+        "wait": wait,
+        "close": close,
+    }
+
+
+def maestro_watch_tree(session, treeid):
+    """
+    Watch the jobs of treeid until they are done and return the exit code
+    of maestro_watch_check(). The watch state of the tree is kept in
+    session["trees"][treeid] afterwards.
+    """
+    state = maestro_watch_state(session["job_filter"], session["root_node"])
+    session["trees"].clear()
+    session["trees"][treeid] = state
+    kci_log(f"job_filter: {', '.join(state['job_filter'])}")
     logging.info(f"Starting job watch for tree {treeid}")
-    logging.debug(f"Watching jobs: {job_filter}, test: {test}")
-    previous_nodes = None
-    running = False
-    jobs_done_ts = None
+    logging.debug(f"Watching jobs: {state['job_filter']}, test: {session['test']}")
+    return _maestro_watch_jobs_loop(
+        session["baseurl"],
+        session["token"],
+        treeid,
+        state,
+        session["test"],
+        session["wait"],
+    )
+
+
+def maestro_watch_close(session):
+    session["close"]()
 
-    job_info = {}
-    for job in job_filter:
-        job_info[job] = {"done": False, "running": False}
 
+def _maestro_watch_jobs_loop(baseurl, token, treeid, state, test, wait):
+    interval = WATCH_POLL_FAST
     while True:
-        inprogress = 0
-        joblist = job_filter.copy()
-        nodes = maestro_retrieve_treeid_nodes(baseurl, token, treeid)
-        if not nodes:
+        # Each poll only asks the API for nodes updated after the newest
+        # timestamp we have seen.
+        updates = maestro_retrieve_treeid_nodes(
+            baseurl, token, treeid, updated_after=state["last_updated"]
+        )
+        if updates is None or not (updates or state["nodes"]):
             logging.warning("No nodes found for tree, will retry")
             kci_warning("No nodes found. Retrying...")
             time.sleep(5)
             continue
+        maestro_watch_merge(state, updates)
         # Keep checking the test-result deadline after the jobs have completed,
-        # even when the API response has not changed.
-        if previous_nodes == nodes and jobs_done_ts is None:
-            logging.debug("No changes in nodes, waiting...")
+        # even when nothing has changed since the last poll.
+        if not updates and state["jobs_done_ts"] is None:
+            # Nothing is transitioning, back off towards the idle interval
+            interval = min(interval * 2, WATCH_POLL_IDLE)
+            logging.debug(f"No changes in nodes, waiting {interval}s...")
             kci_msg_nonl(".")
-            time.sleep(30)
+            wait(interval)
             continue
+        interval = WATCH_POLL_FAST
 
         time_local = time.localtime()
         kci_info(f"\nCurrent time: {time.strftime('%Y-%m-%d %H:%M:%S', time_local)}")
 
-        # Tricky part in watch is that we might have one item in job_filter (job, test),
-        # but it might spawn multiple nodes with same name
-        test_result = None
-        logging.debug(f"Processing {len(nodes)} nodes")
-        for node in nodes:
-            if node["name"] == test:
-                test_result = node["result"]
-                logging.debug(f"Test node {test} result: {test_result}")
-            if node["name"] in job_filter:
-                status = maestro_check_node(node, root_node=root_node)
-                if status == "DONE":
-                    if job_info[node["name"]]["running"]:
-                        kci_msg("")
-                        job_info[node["name"]]["running"] = False
-                    if not job_info[node["name"]]["done"]:
-                        logging.info(
-                            f"Job {node['name']} completed with result: {node['result']}"
-                        )
-                        maestro_node_result(node)
-                        job_info[node["name"]]["done"] = True
-                    if isinstance(joblist, list) and node["name"] in joblist:
-                        joblist.remove(node["name"])
-                elif status == "RUNNING":
-                    logging.debug(f"Job {node['name']} is running")
-                    job_info[node["name"]]["running"] = True
-                    inprogress += 1
-                else:
-                    logging.warning(f"Job {node['name']} failed with status: {status}")
-                    if isinstance(joblist, list) and node["name"] in joblist:
-                        joblist.remove(node["name"])
-                    # if test is same as job, dont indicate infra-failure if test job fail
-                    if test and test != node["name"]:
-                        # if we have a test, and prior job failed, we should indicate that
-                        logging.error(
-                            f"Job {node['name']} failed, test cannot be executed"
-                        )
-                        kci_err(f"Job {node['name']} failed, test can't be executed")
-                        sys.exit(2)
-        if isinstance(joblist, list) and len(joblist) == 0 and inprogress == 0:
-            logging.info(
-                f"All jobs completed. Remaining in queue: {len(joblist)}, in progress: {inprogress}"
+        ret = maestro_watch_check(state, test, _print_job_done)
+        if ret is None:
+            if state["jobs_done_ts"] is None:
+                kci_msg_nonl(f"\rRunning job...")
+            wait(interval)
+            continue
+        if not test:
+            return ret
+        if state["failed_job"]:
+            kci_err(f"Job {state['failed_job']} failed, test can't be executed")
+        elif ret == 0:
+            logging.info(f"Test {test} passed")
+        elif ret == 1:
+            logging.info(f"Test {test} failed with result: {state['test_result']}")
+        else:
+            kci_err(f"Test {test} result was not available after 60s")
+        return ret
+
+
+def maestro_watch_trees(
+    baseurl, token, trees, job_filter, test, on_event=None, events=False
+):
+    """
+    Watch the jobs of several trees from a single polling loop.
+
+    trees maps each tree ID to its root node name (checkout or patchset),
+    or to a dict with the root_node, job_filter and test of that tree when
+    they differ from the arguments.
+    All pending trees are polled with one combined request, and on_event is
+    called with a JSON-serialisable dict for every finished job and tree.
+    With events, node events from the API wake the loop up instead of
+    fixed polling intervals.
+    Return a dict mapping each tree ID to its exit code, as documented in
+    maestro_watch_check().
+    """
+
+    def emit(event):
+        if on_event:
+            on_event(event)
+
+    states = {}
+    for treeid, spec in trees.items():
+        if not isinstance(spec, dict):
+            spec = {"root_node": spec}
+        states[treeid] = maestro_watch_state(
+            spec.get("job_filter", job_filter), spec.get("root_node", "checkout")
+        )
+        states[treeid]["test"] = spec.get("test", test)
+    wait, close = _maestro_watch_waiter(
+        baseurl, token, events, _maestro_watch_relevance(states)
+    )
+    try:
+        return _maestro_watch_trees_loop(baseurl, token, states, test, emit, wait)
+    finally:
+        close()
+
+
+def _maestro_watch_trees_loop(baseurl, token, states, test, emit, wait):
+    exit_codes = {}
+    last_updated = None
+    interval = WATCH_POLL_FAST
+    logging.info(f"Starting job watch for {len(states)} trees")
+
+    while len(exit_codes) < len(states):
+        pending = [treeid for treeid in states if treeid not in exit_codes]
+        updates = maestro_retrieve_trees_nodes(
+            baseurl, token, pending, updated_after=last_updated
+        )
+        if updates is None:
+            time.sleep(5)
+            continue
+        for node in updates:
+            if node.get("treeid") in states:
+                maestro_watch_merge(states[node["treeid"]], [node])
+            if last_updated is None or node["updated"] > last_updated:
+                last_updated = node["updated"]
+        waiting = any(states[treeid]["jobs_done_ts"] is not None for treeid in pending)
+        if not updates and not waiting:
+            interval = min(interval * 2, WATCH_POLL_IDLE)
+            logging.debug(f"No changes in nodes, waiting {interval}s...")
+            wait(interval)
+            continue
+        interval = WATCH_POLL_FAST
+
+        for treeid in pending:
+            state = states[treeid]
+            if not state["nodes"]:
+                continue
+
+            def job_done(node, was_running, treeid=treeid):
+                emit(
+                    {
+                        "event": "job",
+                        "treeid": treeid,
+                        "name": node["name"],
+                        "kind": node.get("kind"),
+                        "node_id": node["id"],
+                        "result": node["result"],
+                        "updated": node["updated"],
+                    }
+                )
+
+            ret = maestro_watch_check(state, state.get("test", test), job_done)
+            if ret is None:
+                continue
+            exit_codes[treeid] = ret
+            emit(
+                {
+                    "event": "tree",
+                    "treeid": treeid,
+                    "exit_code": ret,
+                    "failed_job": state["failed_job"],
+                    "test_result": state["test_result"],
+                }
             )
-            kci_info("All jobs completed")
-            if not test:
-                return
-            else:
-                if jobs_done_ts is None:
-                    jobs_done_ts = time.monotonic()
-                    logging.debug("All jobs done, waiting for test results")
-                # if all jobs done, usually test results must be available
-                # max within 60s. Safeguard in case of test node is not available
-                test_result_wait = time.monotonic() - jobs_done_ts
-                if not test_result and test_result_wait < 60:
-                    logging.debug(
-                        f"Waiting for test results ({int(test_result_wait)}s elapsed)"
-                    )
-                    time.sleep(30)
-                    continue
-
-                if test_result and test_result == "pass":
-                    logging.info(f"Test {test} passed")
-                    sys.exit(0)
-                elif test_result:
-                    logging.info(f"Test {test} failed with result: {test_result}")
-                    sys.exit(1)
-                else:
-                    logging.error(f"Test {test} result was not available after 60s")
-                    kci_err(f"Test {test} result was not available after 60s")
-                    sys.exit(2)
-
-        running = True
-        kci_msg_nonl(f"\rRunning job...")
-        previous_nodes = nodes
-        time.sleep(30)
+        if len(exit_codes) < len(states):
+            wait(interval)
+
+    return exit_codes
 
 
 def send_jobretry(baseurl, jobid, token):
@@ -421,6 +981,59 @@ def send_checkout_full(baseurl, token, **kwargs):
     return result
 
 
+# --reuse-existing policies: which existing checkouts may be watched
+# instead of submitting a new one
+CHECKOUT_REUSE_POLICIES = ("no", "running", "any")
+
+
+def maestro_find_checkout(
+    baseurl,
+    giturl,
+    branch,
+    commit,
+    job_filter=None,
+    platform_filter=None,
+    policy="running",
+    exclude=(),
+):
+    """
+    Return the newest checkout node of giturl/branch/commit submitted with
+    the same job and platform filters, or None.
+
+    With the running policy only checkouts still in flight are returned,
+    with any the ones that completed successfully too. Checkouts of trees
+    in exclude are ignored.
+    """
+    if policy not in CHECKOUT_REUSE_POLICIES[1:]:
+        return None
+    filters = [
+        "kind=checkout",
+        f"data.kernel_revision.url={giturl}",
+        f"data.kernel_revision.branch={branch}",
+        f"data.kernel_revision.commit={commit}",
+    ]
+    nodes = maestro_get_nodes(baseurl, None, 0, filters, False)
+    candidates = []
+    for node in nodes:
+        if node.get("treeid") in exclude:
+            continue
+        if sorted(node.get("jobfilter") or []) != sorted(job_filter or []):
+            continue
+        if sorted(node.get("platform_filter") or []) != sorted(platform_filter or []):
+            continue
+        if node["state"] == "done" and (
+            policy == "running" or node.get("result") != "pass"
+        ):
+            continue
+        candidates.append(node)
+    if not candidates:
+        logging.info(f"No existing checkout of {commit} to reuse")
+        return None
+    node = max(candidates, key=lambda node: node.get("created") or "")
+    logging.info(f"Found existing checkout {node['id']} of {commit}")
+    return node
+
+
 def send_patchset(
     baseurl,
     token,
@@ -0,0 +1,171 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+from datetime import datetime, timedelta, timezone
+
+# Only nodes in this state are stored: Maestro does not modify them anymore.
+NODE_STORE_STATE = "done"
+# Seconds taken off the start time of a walk for its sync mark, covering the
+# clock skew with the API server
+NODE_STORE_SYNC_MARGIN = 300
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS nodes (
+    api TEXT NOT NULL,
+    id TEXT NOT NULL,
+    node TEXT NOT NULL,
+    PRIMARY KEY (api, id)
+);
+CREATE TABLE IF NOT EXISTS queries (
+    api TEXT NOT NULL,
+    query TEXT NOT NULL,
+    updated TEXT,
+    PRIMARY KEY (api, query)
+);
+CREATE TABLE IF NOT EXISTS query_nodes (
+    api TEXT NOT NULL,
+    query TEXT NOT NULL,
+    id TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    PRIMARY KEY (api, query, id)
+);
+"""
+
+_node_store = None
+
+
+class NodeStore:
+    """SQLite cache of finished Maestro nodes.
+
+    Nodes are keyed by API URL and node id. Besides the nodes themselves the
+    store remembers which nodes matched each node query that has been walked,
+    in the order the API listed them, together with a sync mark: the newest
+    ``updated`` timestamp of its done nodes, but no later than the start of
+    the walk. Only the exact same query is replayed from the store, and only
+    needs to ask the API for what changed since.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        # Pages are prefetched from worker threads, serialize access here
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.executescript(_SCHEMA)
+        logging.info(f"Using Maestro node store {path}")
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    @staticmethod
+    def query_key(filter):
+        return json.dumps(sorted(filter or []))
+
+    def add(self, api, nodes):
+        """Store the done nodes of ``nodes``, ignoring the others."""
+        rows = []
+        for node in nodes:
+            if not node or node.get("state") != NODE_STORE_STATE:
+                continue
+            rows.append((api, node["id"], json.dumps(node)))
+        if not rows:
+            return 0
+        with self._lock, self._db:
+            self._db.executemany("INSERT OR REPLACE INTO nodes VALUES (?, ?, ?)", rows)
+        return len(rows)
+
+    def get(self, api, node_id):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT node FROM nodes WHERE api = ? AND id = ?", (api, node_id)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def query_synced(self, api, key):
+        """Return the sync mark of a walked query, or None."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT updated FROM queries WHERE api = ? AND query = ?", (api, key)
+            ).fetchone()
+        return row[0] if row else None
+
+    def record_query(self, api, key, nodes, synced=None, limit=None):
+        """Add ``nodes`` to query ``key`` and move its mark forward.
+
+        Nodes new to the query are placed after the ones it already has, in
+        the order of ``nodes``. Only done nodes move the mark, and never past
+        ``limit``: a pending node, or one finishing while the pages are
+        walked, may end up done with an ``updated`` older than nodes seen in
+        the walk.
+        """
+        self.add(api, nodes)
+        done = [n for n in nodes if n.get("state") == NODE_STORE_STATE]
+        mark = max((n["updated"] for n in done if n.get("updated")), default="")
+        if limit and mark > limit:
+            mark = limit
+        mark = max(mark, synced or "")
+        with self._lock, self._db:
+            (last,) = self._db.execute(
+                "SELECT COALESCE(MAX(position), -1) FROM query_nodes"
+                " WHERE api = ? AND query = ?",
+                (api, key),
+            ).fetchone()
+            self._db.executemany(
+                "INSERT OR IGNORE INTO query_nodes VALUES (?, ?, ?, ?)",
+                [(api, key, n["id"], last + 1 + i) for i, n in enumerate(nodes)],
+            )
+            self._db.execute(
+                "INSERT OR REPLACE INTO queries VALUES (?, ?, ?)", (api, key, mark)
+            )
+
+    def query_nodes(self, api, key, pending=()):
+        """Return the stored done nodes of query ``key`` and the ``pending``
+        nodes recorded with it, in the order the API first listed them."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT query_nodes.id, nodes.node FROM query_nodes LEFT JOIN nodes"
+                " ON nodes.api = query_nodes.api AND nodes.id = query_nodes.id"
+                " WHERE query_nodes.api = ? AND query_nodes.query = ?"
+                " ORDER BY query_nodes.position",
+                (api, key),
+            ).fetchall()
+        pending = {node["id"]: node for node in pending}
+        return [
+            json.loads(node) if node else pending[node_id]
+            for node_id, node in rows
+            if node or node_id in pending
+        ]
+
+
+def sync_limit(margin=NODE_STORE_SYNC_MARGIN):
+    """Return the latest sync mark of a node walk starting now"""
+    start = datetime.now(timezone.utc) - timedelta(seconds=margin)
+    # Same format as the naive UTC timestamps of Maestro
+    return start.replace(tzinfo=None).isoformat()
+
+
+def set_node_store(path):
+    """Open the node store at ``path``, or disable it when ``path`` is empty."""
+    global _node_store
+    if _node_store is not None:
+        _node_store.close()
+    _node_store = NodeStore(os.path.expanduser(path)) if path else None
+
+
+def get_node_store():
+    return _node_store
+
+
+def configure_node_store(cfg, instance):
+    if not cfg:
+        return
+    icfg = cfg.get(instance) if instance else None
+    if not isinstance(icfg, dict):
+        icfg = {}
+    path = icfg.get("node_store") or cfg.get("node_store")
+    if path:
+        set_node_store(path)
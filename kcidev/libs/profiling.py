@@ -0,0 +1,62 @@
+import cProfile
+import io
+import logging
+import pstats
+import tracemalloc
+
+# Rows of the text report for functions and sites of memory still allocated
+# at exit
+PROFILE_TOP_FUNCTIONS = 25
+PROFILE_TOP_ALLOCATIONS = 10
+
+
+def start_profiling(path):
+    """Start profiling CPU time with cProfile and memory with tracemalloc,
+    return the state to give to stop_profiling()"""
+    logging.info(f"Profiling to {path}")
+    tracemalloc.start()
+    profiler = cProfile.Profile()
+    profiler.enable()
+    return {"path": path, "profiler": profiler}
+
+
+def profile_report(stats, peak, snapshot):
+    """Return the text report of pstats stats, the tracemalloc peak total and
+    the memory still allocated in snapshot"""
+    out = io.StringIO()
+    out.write(f"Peak traced memory: {peak / 1024 / 1024:.1f} MiB\n\n")
+    out.write(
+        f"Top {PROFILE_TOP_ALLOCATIONS} sites of memory still allocated at exit:\n"
+    )
+    for stat in snapshot.statistics("lineno")[:PROFILE_TOP_ALLOCATIONS]:
+        out.write(f"  {stat}\n")
+    out.write("\n")
+    stats.stream = out
+    stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(PROFILE_TOP_FUNCTIONS)
+    return out.getvalue()
+
+
+def stop_profiling(state):
+    """
+    Stop profiling and write the pstats file to the profile path, and the
+    text report of the top functions, the peak memory total and the sites of
+    memory still allocated next to it, with a .txt suffix. Return the report
+    path.
+    """
+    state["profiler"].disable()
+    # Only the memory still allocated when the command ends has its sites,
+    # the peak is a total
+    snapshot = tracemalloc.take_snapshot().filter_traces(
+        (tracemalloc.Filter(False, tracemalloc.__file__),)
+    )
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    path = state["path"]
+    stats = pstats.Stats(state["profiler"])
+    stats.dump_stats(path)
+    report_path = f"{path}.txt"
+    with open(report_path, "w") as f:
+        f.write(profile_report(stats, peak, snapshot))
+    logging.info(f"Profile written to {path} and {report_path}")
+    return report_path
@@ -0,0 +1,129 @@
+import json
+import logging
+import os
+import subprocess
+import time
+
+# Seconds a branch head resolved with ls-remote is reused. Tags are
+# assumed not to move and are kept for good.
+REF_CACHE_TTL = 60
+
+_ref_cache_path = os.path.join(
+    os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"),
+    "kci-dev",
+    "refs.json",
+)
+
+
+def set_ref_cache(path):
+    """Keep resolved remote refs in the JSON file ``path``, or don't cache
+    them when ``path`` is empty."""
+    global _ref_cache_path
+    _ref_cache_path = os.path.expanduser(path) if path else None
+
+
+def get_ref_cache():
+    return _ref_cache_path
+
+
+def configure_ref_cache(cfg, instance):
+    if not cfg:
+        return
+    icfg = cfg.get(instance) if instance else None
+    if not isinstance(icfg, dict):
+        icfg = {}
+    path = icfg.get("ref_cache", cfg.get("ref_cache"))
+    if path is not None:
+        set_ref_cache(path)
+
+
+def _load_cache():
+    if not _ref_cache_path:
+        return {}
+    try:
+        with open(_ref_cache_path, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_cache(cache):
+    if not _ref_cache_path:
+        return
+    try:
+        os.makedirs(os.path.dirname(os.path.abspath(_ref_cache_path)), exist_ok=True)
+        # Write and rename, concurrent commands never read a partial file
+        tmp_file = f"{_ref_cache_path}.{os.getpid()}.tmp"
+        with open(tmp_file, "w") as f:
+            json.dump(cache, f)
+        os.replace(tmp_file, _ref_cache_path)
+    except OSError as e:
+        logging.warning(f"Could not save ref cache {_ref_cache_path}: {e}")
+
+
+def _cache_key(giturl, ref):
+    return f"{giturl} {ref}"
+
+
+def parse_ls_remote(output, ref=None):
+    """Return (ref name, commit) of ls-remote output, or (None, None). The
+    annotated tag ``ref`` wins over other refs matching it, like a branch
+    ending in ``/<ref>``, else the first ref is used. The commit is the
+    peeled value for annotated tags."""
+    refs = {}
+    first = None
+    for line in output.splitlines():
+        sha, _, name = line.strip().partition("\t")
+        if not name:
+            continue
+        refs[name] = sha
+        if first is None and not name.endswith("^{}"):
+            first = name
+    tag = f"refs/tags/{ref}"
+    if ref and f"{tag}^{{}}" in refs:
+        return tag, refs[f"{tag}^{{}}"]
+    if first is None:
+        return None, None
+    return first, refs.get(f"{first}^{{}}", refs[first])
+
+
+def ls_remote_ref(giturl, ref):
+    """
+    Resolve ref (a tag, a branch or a full ref name) on the remote giturl
+    to a commit with a single ls-remote, asking for the peeled value of
+    tags at the same time. Results are cached by (url, ref): tags for
+    good, branch heads for REF_CACHE_TTL seconds. Return None when the ref
+    can't be resolved.
+    """
+    cache = _load_cache()
+    key = _cache_key(giturl, ref)
+    entry = cache.get(key)
+    if entry and (entry["tag"] or time.time() - entry["time"] < REF_CACHE_TTL):
+        logging.info(f"Resolved {ref} to {entry['commit']} from the ref cache")
+        return entry["commit"]
+
+    cmd = ["git", "ls-remote", giturl, ref, f"{ref}^{{}}"]
+    logging.debug(f"Running command: {' '.join(cmd)}")
+    process = subprocess.run(cmd, capture_output=True, text=True)
+    if process.returncode != 0:
+        logging.error(f"Failed to resolve {ref} from remote: {process.stderr.strip()}")
+        return None
+    name, commit = parse_ls_remote(process.stdout, ref)
+    if not commit:
+        logging.debug(f"{ref} not found on {giturl}")
+        return None
+    logging.info(f"Resolved {ref} ({name}) to {commit} from remote")
+    now = time.time()
+    # Expired branch heads are of no use anymore
+    cache = {
+        cached: entry
+        for cached, entry in cache.items()
+        if entry["tag"] or now - entry["time"] < REF_CACHE_TTL
+    }
+    cache[key] = {
+        "commit": commit,
+        "tag": name.startswith("refs/tags/"),
+        "time": now,
+    }
+    _save_cache(cache)
+    return commit
@@ -0,0 +1,184 @@
+"""Dashboard result queries returning plain records.
+
+These functions back the ``kci-dev results`` commands, the validation
+helpers and :class:`kcidev.api.KernelCIClient`. They fetch and filter
+dashboard data without going through Click option handling, git lookups
+or output rendering.
+"""
+
+import logging
+
+from kcidev.libs.dashboard import (
+    dashboard_fetch_boots,
+    dashboard_fetch_builds,
+    dashboard_fetch_tests,
+    dashboard_fetch_tree_list,
+)
+from kcidev.libs.filters import (
+    CompatibleFilter,
+    CompilerFilter,
+    ConfigFilter,
+    DateRangeFilter,
+    DurationFilter,
+    FilterSet,
+    GitBranchFilter,
+    HardwareFilter,
+    PathFilter,
+    StatusFilter,
+)
+from kcidev.libs.job_filters import HardwareRegexFilter, TestRegexFilter, TreeFilter
+
+
+def build_filter_set(status="all", compiler=None, config=None, git_branch=None):
+    filter_set = FilterSet()
+    filter_set.add_filter(StatusFilter(status))
+    filter_set.add_filter(CompilerFilter(compiler))
+    filter_set.add_filter(ConfigFilter(config))
+    filter_set.add_filter(GitBranchFilter(git_branch))
+    return filter_set
+
+
+def tests_filter_set(
+    status="all",
+    start_date=None,
+    end_date=None,
+    compiler=None,
+    config=None,
+    hardware=None,
+    test_path=None,
+    git_branch=None,
+    compatible=None,
+    min_duration=None,
+    max_duration=None,
+    filter_data=None,
+):
+    """Return the FilterSet for boots and tests.
+
+    ``filter_data`` is a parsed YAML filter file, mapping ``hardware``,
+    ``test`` and ``tree`` to regular expressions."""
+    filter_set = FilterSet()
+    filter_set.add_filter(StatusFilter(status))
+    filter_set.add_filter(DateRangeFilter(start_date, end_date))
+    filter_set.add_filter(CompilerFilter(compiler))
+    filter_set.add_filter(ConfigFilter(config))
+    filter_set.add_filter(HardwareFilter(hardware))
+    filter_set.add_filter(PathFilter(test_path))
+    filter_set.add_filter(GitBranchFilter(git_branch))
+    filter_set.add_filter(CompatibleFilter(compatible))
+    filter_set.add_filter(DurationFilter(min_duration, max_duration))
+    if filter_data:
+        if "hardware" in filter_data:
+            filter_set.add_filter(HardwareRegexFilter(filter_data["hardware"]))
+        if "test" in filter_data:
+            filter_set.add_filter(TestRegexFilter(filter_data["test"]))
+        if "tree" in filter_data:
+            filter_set.add_filter(TreeFilter(filter_data["tree"]))
+    return filter_set
+
+
+def filter_builds(builds, status="all", compiler=None, config=None, git_branch=None):
+    filter_set = build_filter_set(status, compiler, config, git_branch)
+    filtered = [build for build in builds if filter_set.matches(build)]
+    logging.info(f"Filtered {len(filtered)} builds from {len(builds)} total")
+    return filtered
+
+
+def filter_tests(tests, **filters):
+    """Return the boots or tests matching ``filters``, see tests_filter_set()"""
+    filter_set = tests_filter_set(**filters)
+    filtered = [test for test in tests if filter_set.matches(test)]
+    logging.info(f"Filtered {len(filtered)} tests from {len(tests)} total")
+    return filtered
+
+
+def fetch_trees(origin, days=7, use_json=False):
+    return dashboard_fetch_tree_list(origin, use_json, days)
+
+
+def fetch_builds(
+    origin,
+    giturl,
+    branch,
+    commit,
+    arch=None,
+    tree=None,
+    start_date=None,
+    end_date=None,
+    status="all",
+    compiler=None,
+    config=None,
+    git_branch=None,
+    use_json=False,
+    error_verbose=True,
+):
+    """Return the dashboard builds of a checkout matching the filters"""
+    data = dashboard_fetch_builds(
+        origin,
+        giturl,
+        branch,
+        commit,
+        arch,
+        tree,
+        start_date,
+        end_date,
+        use_json,
+        error_verbose,
+    )
+    return filter_builds(data["builds"], status, compiler, config, git_branch)
+
+
+def fetch_boots(
+    origin,
+    giturl,
+    branch,
+    commit,
+    arch=None,
+    tree=None,
+    start_date=None,
+    end_date=None,
+    boot_origin=None,
+    use_json=False,
+    error_verbose=True,
+    **filters,
+):
+    """Return the dashboard boots of a checkout matching the filters.
+
+    ``filters`` are passed to tests_filter_set(). The start and end dates
+    are both sent to the dashboard and checked on each boot."""
+    data = dashboard_fetch_boots(
+        origin,
+        giturl,
+        branch,
+        commit,
+        arch,
+        tree,
+        start_date,
+        end_date,
+        use_json,
+        boot_origin,
+        error_verbose,
+    )
+    return filter_tests(
+        data["boots"], start_date=start_date, end_date=end_date, **filters
+    )
+
+
+def fetch_tests(
+    origin,
+    giturl,
+    branch,
+    commit,
+    arch=None,
+    tree=None,
+    start_date=None,
+    end_date=None,
+    use_json=False,
+    **filters,
+):
+    """Return the dashboard tests of a checkout matching the filters"""
+    data = dashboard_fetch_tests(
+        origin, giturl, branch, commit, arch, tree, start_date, end_date, use_json
+    )
+    return filter_tests(
+        data["tests"], start_date=start_date, end_date=end_date, **filters
+    )
@@ -0,0 +1,56 @@
+import hashlib
+import logging
+
+import click
+
+
+class ShardParamType(click.ParamType):
+    """Click type for ``i/N`` shard selections, converted to ``(i, N)``."""
+
+    name = "i/N"
+
+    def convert(self, value, param, ctx):
+        if isinstance(value, tuple):
+            return value
+        try:
+            index, total = (int(part) for part in value.split("/"))
+        except ValueError:
+            self.fail(f"{value!r} is not in i/N format, e.g. 1/4", param, ctx)
+        if total < 1 or not 1 <= index <= total:
+            self.fail(f"shard {value!r} must satisfy 1 <= i <= N", param, ctx)
+        return index, total
+
+
+SHARD = ShardParamType()
+
+
+def shard_option(func):
+    return click.option(
+        "--shard",
+        type=SHARD,
+        help="Only process the trees of shard i out of N (e.g. 1/4)",
+    )(func)
+
+
+def tree_shard(giturl, branch, total):
+    """Return the 1-based shard a tree belongs to out of ``total`` shards.
+
+    The shard only depends on the git URL and branch, so every machine of a
+    sharded run picks the same trees without coordination."""
+    digest = hashlib.sha1(f"{giturl}\n{branch}".encode()).digest()
+    return int.from_bytes(digest[:8], "big") % total + 1
+
+
+def shard_trees(trees_list, shard):
+    """Keep the dashboard trees of ``shard``, all of them without a shard."""
+    if not shard:
+        return trees_list
+    index, total = shard
+    selected = [
+        tree
+        for tree in trees_list
+        if tree_shard(tree["git_repository_url"], tree["git_repository_branch"], total)
+        == index
+    ]
+    logging.info(f"Shard {index}/{total}: {len(selected)}/{len(trees_list)} trees")
+    return selected
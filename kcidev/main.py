@@ -1,29 +1,83 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+import importlib
 import logging
 
 import click
 
 from kcidev.libs.common import *
 from kcidev.libs.dashboard import configure_dashboard_api
-from kcidev.subcommands import (
-    bisect,
-    checkout,
-    config,
-    maestro,
-    mcp,
-    patchset,
-    results,
-    storage,
-    submit,
-    testretry,
-    watch,
-)
+from kcidev.libs.node_store import configure_node_store
+from kcidev.libs.remote_refs import configure_ref_cache
+
+# Subcommand name -> "module:command". Modules are imported on first use, so
+# running one subcommand doesn't pay for the imports of all the others.
+SUBCOMMANDS = {
+    "bisect": "kcidev.subcommands.bisect:bisect",
+    "checkout": "kcidev.subcommands.checkout:checkout",
+    "config": "kcidev.subcommands.config:config",
+    "maestro": "kcidev.subcommands.maestro:maestro",
+    "mcp": "kcidev.subcommands.mcp:mcp",
+    "multibisect": "kcidev.subcommands.multibisect:multibisect",
+    "patchset": "kcidev.subcommands.patchset:patchset",
+    "testretry": "kcidev.subcommands.testretry:testretry",
+    "results": "kcidev.subcommands.results:results",
+    "storage": "kcidev.subcommands.storage:storage",
+    "submit": "kcidev.subcommands.submit:submit",
+    "watch": "kcidev.subcommands.watch:watch",
+}
+
+
+def load_command(spec):
+    module, _, attr = spec.partition(":")
+    return getattr(importlib.import_module(module), attr)
+
+
+def profile_command(ctx, profile):
+    """Profile the rest of the command, writing the profile when ctx closes"""
+    from kcidev.libs.profiling import start_profiling, stop_profiling
+
+    profile_state = start_profiling(profile)
+
+    def write_profile():
+        try:
+            report = stop_profiling(profile_state)
+        except OSError as e:
+            kci_err(f"Could not write profile {profile}: {e}")
+            return
+        kci_log(f"Profile saved to {profile}, report in {report}")
+
+    # Runs once the subcommand is done, whether it succeeded or not
+    ctx.call_on_close(write_profile)
+
+
+class LazyGroup(click.Group):
+    """Click group importing the module of a subcommand when it is looked up"""
+
+    def __init__(self, *args, lazy_subcommands=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.lazy_subcommands = dict(lazy_subcommands or {})
+
+    def list_commands(self, ctx):
+        return sorted(set(self.commands) | set(self.lazy_subcommands))
+
+    def get_command(self, ctx, cmd_name):
+        if cmd_name not in self.commands and cmd_name in self.lazy_subcommands:
+            command = load_command(self.lazy_subcommands[cmd_name])
+            self.add_command(command, cmd_name)
+        return super().get_command(ctx, cmd_name)
+
+    def invoke(self, ctx):
+        # Before the subcommand is looked up, so its import is profiled too
+        if ctx.params.get("profile"):
+            profile_command(ctx, ctx.params["profile"])
+        return super().invoke(ctx)
 
 
 @click.group(
-    help="Stand alone tool for Linux Kernel developers and maintainers to interact with KernelCI."
+    cls=LazyGroup,
+    help="Stand alone tool for Linux Kernel developers and maintainers to interact with KernelCI.",
 )
 @click.version_option(kcidev_version, prog_name="kci-dev")
 @click.option(
@@ -34,8 +88,17 @@ from kcidev.subcommands import (
 )
 @click.option("--instance", help="API instance to use", required=False)
 @click.option("--debug", is_flag=True, help="Enable debug info")
+@click.option(
+    "--profile",
+    envvar="KCIDEV_PROFILE",
+    type=click.Path(dir_okay=False),
+    help="Profile the command with cProfile and tracemalloc, saving pstats to "
+    "this file and a report of the top functions, the peak memory and the "
+    "memory still allocated at exit to <file>.txt",
+)
 @click.pass_context
-def cli(ctx, settings, instance, debug):
+def cli(ctx, settings, instance, debug, profile):
+    # --profile is handled by LazyGroup.invoke()
     if debug:
         # DEBUG level is too verbose about included packages
         # us INFO instead
@@ -46,6 +109,8 @@ def cli(ctx, settings, instance, debug):
     ctx.obj["SETTINGS"] = settings
     cfg = ctx.obj["CFG"] or {}
     configure_dashboard_api(cfg, instance or cfg.get("default_instance"))
+    configure_node_store(cfg, instance or cfg.get("default_instance"))
+    configure_ref_cache(cfg, instance or cfg.get("default_instance"))
     if subcommand not in ("results", "config"):
         if instance:
             ctx.obj["INSTANCE"] = instance
@@ -64,20 +129,16 @@ def register_commands(command_group=None):
     """Register all kci-dev subcommands on a Click command group.
 
     The CLI entry point and the public Python API both use this helper so the
-    same commands are available from the shell and from library code.
+    same commands are available from the shell and from library code. A
+    LazyGroup only records where the commands are, other groups get them
+    imported and added right away.
     """
     command_group = command_group or cli
-    command_group.add_command(bisect.bisect)
-    command_group.add_command(checkout.checkout)
-    command_group.add_command(config.config)
-    command_group.add_command(maestro.maestro)
-    command_group.add_command(mcp.mcp)
-    command_group.add_command(patchset.patchset)
-    command_group.add_command(testretry.testretry)
-    command_group.add_command(results.results)
-    command_group.add_command(storage.storage)
-    command_group.add_command(submit.submit)
-    command_group.add_command(watch.watch)
+    if isinstance(command_group, LazyGroup):
+        command_group.lazy_subcommands.update(SUBCOMMANDS)
+        return command_group
+    for name, spec in SUBCOMMANDS.items():
+        command_group.add_command(load_command(spec), name)
     return command_group
 
 
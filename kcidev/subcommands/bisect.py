@@ -2,6 +2,7 @@
 # -*- coding: utf-8 -*-
 
 import copy
+import hashlib
 import json
 import logging
 import os
@@ -12,9 +13,18 @@ import time
 
 import click
 import requests
-from git import Repo
 
 from kcidev.libs.common import *
+from kcidev.libs.maestro_common import (
+    maestro_find_checkout,
+    maestro_get_nodes,
+    maestro_watch_close,
+    maestro_watch_session,
+    maestro_watch_tree,
+    maestro_watch_trees,
+    send_checkout_full,
+)
+from kcidev.libs.results import fetch_tests, filter_tests
 
 """
 To not lose the state of the bisection, we need to store the state in a file
@@ -25,6 +35,8 @@ The state file is a json file that contains the following keys:
 - bad: the known bad commit
 - retry_fail: the number of times to retry the failed test
 - history: the list of commits that have been tested (each entry has "commitid": state)
+- steps: the Maestro runs of each tested commit, with their treeid, exit code
+  and the time spent submitting the checkout and watching its jobs
 """
 default_state = {
     "giturl": "",
@@ -37,11 +49,21 @@ default_state = {
     "platform_filter": [],
     "test": "",
     "workdir": "",
+    "reference": "",
+    "paths": [],
     "bisect_init": False,
     "next_commit": None,
     "first_bad": None,
+    "steps": [],
 }
 
+# Likelihood of a commit not touching --paths to be the first bad commit,
+# relative to one touching them
+UNRELATED_COMMIT_WEIGHT = 0.1
+
+# git bisect verdict for the exit code of a bisection step
+STEP_RESULTS = {0: "good", 1: "bad", 2: "skip"}
+
 MAESTRO_RETRY_LIMIT = 3
 MAESTRO_RETRY_BASE_DELAY = 2
 
@@ -121,35 +143,6 @@ def git_exec_getcommit(cmd):
     return commit, False
 
 
-def kcidev_exec(cmd):
-    """
-    Execute a kci-dev and return the return code
-    """
-    process = None
-    click.secho("Executing kci-dev command: " + " " + str(cmd), fg="green")
-    logging.info(f"Executing kci-dev command: {' '.join(cmd)}")
-    with subprocess.Popen(
-        cmd,
-        stdout=subprocess.PIPE,
-        stderr=subprocess.STDOUT,
-        text=True,
-        bufsize=1,
-    ) as process:
-        try:
-            for line in process.stdout:
-                click.echo(line, nl=False)
-            process.wait()
-            logging.debug(
-                f"kci-dev command completed with return code: {process.returncode}"
-            )
-        except Exception as e:
-            logging.error(f"Error executing kci-dev: {e}")
-            kci_err(f"Error executing kci-dev: {e}")
-            sys.exit(1)
-
-    return process
-
-
 def execute_cmdline(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE):
     try:
         return subprocess.run(cmd, stdout=stdout, stderr=stderr, check=True)
@@ -165,7 +158,12 @@ def init_bisect(repo, state):
     click.secho("Initiating bisection...", fg="green")
     logging.info(f"Initializing bisection - good: {state['good']}, bad: {state['bad']}")
 
-    execute_cmdline(["git", "bisect", "start"], subprocess.DEVNULL)
+    no_checkout = is_partial_clone(repo)
+    if no_checkout:
+        # Only BISECT_HEAD moves, the blobs of each step are never fetched
+        execute_cmdline(["git", "bisect", "start", "--no-checkout"], subprocess.DEVNULL)
+    else:
+        execute_cmdline(["git", "bisect", "start"], subprocess.DEVNULL)
     execute_cmdline(["git", "bisect", "good", state["good"]], subprocess.DEVNULL)
     execute_cmdline(["git", "bisect", "bad", state["bad"]], subprocess.DEVNULL)
 
@@ -180,27 +178,75 @@ def init_bisect(repo, state):
         kci_log("---")
         kci_log(results.stdout)
 
-    commit_sha = repo.head.commit.hexsha
+    if no_checkout:
+        commit_sha = repo.git.rev_parse("BISECT_HEAD")
+    else:
+        commit_sha = repo.head.commit.hexsha
+    commit_sha = next_bisect_commit(state, commit_sha)
     logging.info(f"Starting bisection at commit: {commit_sha}")
     os.chdir(olddir)
     return commit_sha
 
 
-def update_tree(workdir, branch, giturl, reset=True):
+def update_object_cache(cache, giturl, branch, blobless=True):
+    """
+    Fetch branch of giturl into the shared object cache, a bare repository
+    that bisect workdirs borrow objects from. The cache is created when it
+    does not exist; an existing repository is only updated when kci-dev
+    created it, other local clones are used as they are.
+    """
+    from git import Repo
+
+    if not os.path.exists(cache):
+        logging.info(f"Creating shared object cache in {cache}")
+        Repo.init(cache, bare=True).git.config("kcidev.cache", "true")
+    cache_repo = Repo(cache)
+    if cache_repo.git.config("--get", "kcidev.cache", with_exceptions=False) != "true":
+        logging.info(f"Using {cache} as object reference without updating it")
+        return
+    click.secho(f"Updating object cache {cache}...", fg="green")
+    # Keep the refs of each tree apart, several trees share the cache
+    namespace = hashlib.sha1(giturl.encode()).hexdigest()[:12]
+    options = ["--filter=blob:none"] if blobless else []
+    cache_repo.git.fetch(
+        *options, giturl, f"+refs/heads/{branch}:refs/kcidev/{namespace}/{branch}"
+    )
+
+
+def update_tree(workdir, branch, giturl, reset=True, blobless=True, reference=None):
+    """
+    Clone or update the bisect workdir. git bisect only walks the commit
+    graph and the steps are built by Maestro, so new clones skip the file
+    contents (blob:none partial clone) and do not check out a working tree.
+    With reference, objects are borrowed from that local repository, see
+    update_object_cache().
+    """
+    from git import Repo
+
+    if reference:
+        update_object_cache(reference, giturl, branch, blobless)
     if not os.path.exists(workdir):
         click.secho(
             "Cloning repository (this might take significant time!)...", fg="green"
         )
         logging.info(f"Cloning repository {giturl} to {workdir}")
-        repo = Repo.clone_from(giturl, workdir)
-        repo.git.checkout(branch)
-        logging.info(f"Cloned and checked out branch {branch}")
+        options = ["--branch", branch]
+        if blobless:
+            options += ["--filter=blob:none", "--no-checkout"]
+        if reference:
+            options += ["--reference-if-able", os.path.abspath(reference)]
+        repo = Repo.clone_from(giturl, workdir, multi_options=options)
+        logging.info(f"Cloned branch {branch}")
     else:
         click.secho("Pulling repository...", fg="green")
         logging.info(f"Updating existing repository in {workdir}")
         repo = Repo(workdir)
         repo.git.fetch("origin", branch)
-        if reset:
+        if reset and is_partial_clone(repo):
+            # Moving the branch is enough, checking out would fetch every blob
+            repo.git.reset("--soft", f"origin/{branch}")
+            logging.info(f"Updated to latest {branch} branch")
+        elif reset:
             repo.git.reset("--hard", f"origin/{branch}")
             logging.info(f"Updated to latest {branch} branch")
         else:
@@ -208,16 +254,387 @@ def update_tree(workdir, branch, giturl, reset=True):
     return repo
 
 
-def bisection_loop(state):
+def is_partial_clone(repo):
+    promisor = repo.git.config("--get", "remote.origin.promisor", with_exceptions=False)
+    return promisor == "true"
+
+
+def bisect_maestro(cfg, instance, events=False, reuse=True):
+    """Return the Maestro settings used to run the bisection steps"""
+    icfg = (cfg or {}).get(instance) or {}
+    return {
+        "pipeline": icfg.get("pipeline"),
+        "api": icfg.get("api"),
+        "token": icfg.get("token"),
+        "events": events,
+        # Look for existing results before checking out a commit
+        "reuse": reuse,
+        # Watch session shared by all steps, opened by the first one
+        "watch": None,
+    }
+
+
+def close_bisect_maestro(maestro):
+    if maestro["watch"] is not None:
+        maestro_watch_close(maestro["watch"])
+        maestro["watch"] = None
+
+
+def _dashboard_test_results(state, commit):
+    tests = fetch_tests(
+        "maestro", state["giturl"], state["branch"], commit, test_path=state["test"]
+    )
+    if state["platform_filter"]:
+        tests = [
+            test
+            for platform in state["platform_filter"]
+            for test in filter_tests(tests, hardware=platform)
+        ]
+    return [test["status"].lower() for test in tests if test.get("status")]
+
+
+def _maestro_test_results(maestro, state, commit):
+    filters = [
+        f"name={state['test']}",
+        f"data.kernel_revision.url={state['giturl']}",
+        f"data.kernel_revision.commit={commit}",
+        "state=done",
+    ]
+    nodes = maestro_get_nodes(maestro["api"], None, 0, filters, False)
+    platforms = set(state["platform_filter"])
+    return [
+        node["result"]
+        for node in nodes
+        if not platforms or (node.get("data") or {}).get("platform") in platforms
+    ]
+
+
+def _broken_build_job(maestro, state, commit):
+    """Return the name of a kbuild job of the job filter that only failed"""
+    filters = [
+        "kind=kbuild",
+        f"data.kernel_revision.url={state['giturl']}",
+        f"data.kernel_revision.commit={commit}",
+        "state=done",
+    ]
+    nodes = maestro_get_nodes(maestro["api"], None, 0, filters, False)
+    results = {}
+    for node in nodes:
+        if node["name"] in state["job_filter"]:
+            results.setdefault(node["name"], set()).add(node["result"])
+    for name, job_results in sorted(results.items()):
+        if job_results == {"fail"}:
+            return name
+    return None
+
+
+def find_existing_step(maestro, state, commit):
+    """
+    Look for finished runs of the bisected test on commit in the dashboard
+    and in Maestro. Return a step dict as run_bisect_step() does when they
+    conclusively passed or failed, or a skip step when a kbuild job of the
+    job filter failed on it. None when the commit must be tested, also when
+    this bisection already ran it in Maestro: a retry would find that run.
+    """
+    if not maestro["reuse"] or not state["test"]:
+        return None
+    if any(
+        step["commit"] == commit and step.get("treeid")
+        for step in state.get("steps", [])
+    ):
+        return None
+    for source, get_results in (
+        ("dashboard", lambda: _dashboard_test_results(state, commit)),
+        ("maestro", lambda: _maestro_test_results(maestro, state, commit)),
+    ):
+        try:
+            results = {result for result in get_results() if result in ("pass", "fail")}
+        except (click.ClickException, click.Abort, requests.RequestException) as e:
+            # The lookup is only a shortcut, run the step when it fails
+            logging.warning(f"Could not get {source} results for {commit}: {e}")
+            continue
+        if len(results) != 1:
+            # No result yet, or flaky ones: let a new run decide
+            continue
+        result = results.pop()
+        click.secho(f"{commit}: test {result}ed in {source} results", fg="green")
+        logging.info(f"Reusing {source} result {result} for {commit}")
+        return {
+            "commit": commit,
+            "treeid": None,
+            "code": 0 if result == "pass" else 1,
+            "test_result": result,
+            "failed_job": None,
+            "submit_seconds": 0.0,
+            "watch_seconds": 0.0,
+            "reused": source,
+        }
+    try:
+        failed_job = _broken_build_job(maestro, state, commit)
+    except (click.ClickException, click.Abort, requests.RequestException) as e:
+        logging.warning(f"Could not get maestro builds for {commit}: {e}")
+        failed_job = None
+    if failed_job:
+        click.secho(f"{commit}: {failed_job} is known to fail", fg="yellow")
+        logging.info(f"Skipping {commit}, build {failed_job} failed in maestro")
+        return {
+            "commit": commit,
+            "treeid": None,
+            "code": 2,
+            "test_result": None,
+            "failed_job": failed_job,
+            "submit_seconds": 0.0,
+            "watch_seconds": 0.0,
+            "reused": "maestro",
+        }
+    return None
+
+
+def _running_checkout(maestro, state, commit, exclude=()):
+    """
+    Return a checkout of commit with the bisection filters still running,
+    e.g. from an interrupted run. Trees of earlier steps and the exclude
+    treeids are not reused: a retry needs a new run.
+    """
+    if not maestro["reuse"]:
+        return None
+    try:
+        return maestro_find_checkout(
+            maestro["api"],
+            state["giturl"],
+            state["branch"],
+            commit,
+            state["job_filter"],
+            state["platform_filter"],
+            exclude={step["treeid"] for step in state.get("steps", [])} | set(exclude),
+        )
+    except (click.ClickException, click.Abort, requests.RequestException) as e:
+        logging.warning(f"Could not look up checkouts of {commit}: {e}")
+        return None
+
+
+def submit_bisect_step(maestro, state, commit, exclude=()):
+    """
+    Check out commit in Maestro, without watching a running checkout of the
+    exclude treeids. Return the step dict of run_bisect_step(), with exit
+    code 3 and no treeid when the checkout could not be submitted.
+    """
+    step = {
+        "commit": commit,
+        "treeid": None,
+        "code": 3,
+        "test_result": None,
+        "failed_job": None,
+        "submit_seconds": 0.0,
+        "watch_seconds": 0.0,
+        "reused": None,
+    }
+    start = time.monotonic()
+    node = _running_checkout(maestro, state, commit, exclude)
+    if node:
+        click.secho(f"{commit}: watching running checkout {node['id']}", fg="green")
+        resp = {"node": node}
+    else:
+        resp = send_checkout_full(
+            maestro["pipeline"],
+            maestro["token"],
+            giturl=state["giturl"],
+            branch=state["branch"],
+            commit=commit,
+            job_filter=list(state["job_filter"]),
+            platform_filter=list(state["platform_filter"]),
+        )
+    step["submit_seconds"] = time.monotonic() - start
+    treeid = ((resp or {}).get("node") or {}).get("treeid")
+    if not treeid:
+        kci_err(f"Failed to trigger checkout of {commit}")
+        return step
+    step["treeid"] = treeid
+    click.secho(f"{commit}: treeid {treeid}", fg="green")
+    return step
+
+
+def run_bisect_step(maestro, state, commit):
+    """
+    Check out commit in Maestro and watch the bisected test in-process.
+    Return a dict with the commit, its treeid, the watch exit code
+    (0 - test passed, 1 - test failed, 2 - inconclusive, 3 - Maestro error),
+    the test result and failed job if any, and the seconds spent submitting
+    the checkout and watching the jobs. Conclusive existing results are
+    used instead of a new run, see find_existing_step().
+    """
+    step = find_existing_step(maestro, state, commit)
+    if step:
+        return step
+    step = submit_bisect_step(maestro, state, commit)
+    if not step["treeid"]:
+        return step
+
+    if maestro["watch"] is None:
+        maestro["watch"] = maestro_watch_session(
+            maestro["api"],
+            maestro["token"],
+            state["job_filter"],
+            state["test"],
+            events=maestro["events"],
+        )
+    start = time.monotonic()
+    step["code"] = maestro_watch_tree(maestro["watch"], step["treeid"])
+    step["watch_seconds"] = time.monotonic() - start
+    watch_state = maestro["watch"]["trees"][step["treeid"]]
+    step["test_result"] = watch_state["test_result"]
+    step["failed_job"] = watch_state["failed_job"]
+    logging.info(
+        f"Step {commit}: code {step['code']}, submitted in "
+        f"{step['submit_seconds']:.1f}s, watched for {step['watch_seconds']:.1f}s"
+    )
+    return step
+
+
+def run_bisect_steps(maestro, state, commits):
+    """
+    Check out all commits in Maestro at once and watch their trees
+    concurrently. Return the step dicts of run_bisect_step() in commit order.
+    """
+    return run_bisect_batch(maestro, [(state, commit) for commit in commits])
+
+
+def run_bisect_batch(maestro, work):
+    """
+    Run the steps of (state, commit) pairs, possibly from several
+    bisections, with one watch of all their trees. Return the step dicts of
+    run_bisect_step() in the order of work.
+    """
+    steps = []
+    for state, commit in work:
+        # Bisections testing the same commit with the same filters would
+        # find the same running checkout: each step watches its own tree
+        used = {step["treeid"] for step in steps if step["treeid"]}
+        steps.append(
+            find_existing_step(maestro, state, commit)
+            or submit_bisect_step(maestro, state, commit, used)
+        )
+    by_tree = {step["treeid"]: step for step in steps if step["treeid"]}
+    if not by_tree:
+        return steps
+    trees = {
+        step["treeid"]: {
+            "root_node": "checkout",
+            "job_filter": state["job_filter"],
+            "test": state["test"],
+        }
+        for (state, _), step in zip(work, steps)
+        if step["treeid"]
+    }
+    start = time.monotonic()
+
+    def tree_done(event):
+        if event["event"] != "tree":
+            return
+        step = by_tree[event["treeid"]]
+        step["code"] = event["exit_code"]
+        step["test_result"] = event["test_result"]
+        step["failed_job"] = event["failed_job"]
+        step["watch_seconds"] = time.monotonic() - start
+        click.secho(
+            f"{step['commit']}: {STEP_RESULTS.get(step['code'], 'error')} "
+            f"after {step['watch_seconds']:.0f}s",
+            fg="green",
+        )
+
+    codes = maestro_watch_trees(
+        maestro["api"],
+        maestro["token"],
+        trees,
+        [],
+        None,
+        on_event=tree_done,
+        events=maestro["events"],
+    )
+    for treeid, code in codes.items():
+        by_tree[treeid]["code"] = code
+    return steps
+
+
+def _git_output(cmd):
+    return execute_cmdline(cmd).stdout.decode("utf-8", errors="replace").split()
+
+
+def bisect_candidates(count, paths=()):
+    """
+    Return up to count commits splitting the remaining git bisect range of
+    the current directory in count + 1 parts, newest first.
+
+    Without paths the parts hold the same number of commits. With paths,
+    commits that do not touch them are less likely to be the culprit and
+    weigh UNRELATED_COMMIT_WEIGHT instead of 1: the parts hold the same
+    weight, which minimizes the expected number of remaining steps.
+    """
+    good = _git_output(
+        ["git", "for-each-ref", "--format=%(objectname)", "refs/bisect/good-*"]
+    )
+    skipped = set(
+        _git_output(
+            ["git", "for-each-ref", "--format=%(objectname)", "refs/bisect/skip-*"]
+        )
+    )
+    bad = _git_output(["git", "rev-parse", "refs/bisect/bad"])[0]
+    revs = _git_output(["git", "rev-list", "--topo-order", bad, "--not", *good])
+    remaining = [rev for rev in revs if rev != bad and rev not in skipped]
+    if not remaining:
+        return []
+    # The first bad commit is one of the remaining commits or bad itself
+    weights = [1.0] * (len(remaining) + 1)
+    if paths:
+        touching = set(
+            _git_output(["git", "rev-list", bad, "--not", *good, "--", *paths])
+        )
+        weights = [
+            1.0 if rev in touching else UNRELATED_COMMIT_WEIGHT
+            for rev in [bad, *remaining]
+        ]
+    # newer[i]: weight of the positions newer than remaining[i], which hold
+    # the first bad commit when remaining[i] is good
+    newer = []
+    for weight in weights[:-1]:
+        newer.append((newer[-1] if newer else 0.0) + weight)
+    total = sum(weights)
+    picks = set()
+    for part in range(1, count + 1):
+        target = part * total / (count + 1)
+        picks.add(min(range(len(newer)), key=lambda i: abs(newer[i] - target)))
+    return [remaining[i] for i in sorted(picks)]
+
+
+def next_bisect_commit(state, commit):
+    """Return the commit to test after git bisect suggested commit"""
+    if not state.get("paths"):
+        return commit
+    picks = bisect_candidates(1, state["paths"])
+    return picks[0] if picks else commit
+
+
+def _is_ancestor(commit, ref):
+    result = subprocess.run(
+        ["git", "merge-base", "--is-ancestor", commit, ref],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    return result.returncode == 0
+
+
+def bisection_loop(state, maestro, parallel=1):
     olddir = os.getcwd()
     try:
         os.chdir(state["workdir"])
-        return _bisection_loop(state)
+        if parallel > 1:
+            return _parallel_bisection_loop(state, maestro, parallel)
+        return _bisection_loop(state, maestro)
     finally:
         os.chdir(olddir)
 
 
-def _bisection_loop(state):
+def _bisection_loop(state, maestro):
     commit = state["next_commit"]
     if commit is None:
         logging.error(
@@ -227,37 +644,13 @@ def _bisection_loop(state):
         return
     click.secho("Testing commit: " + commit, fg="green")
     logging.info(f"Testing commit {commit} for regression")
-    cmd = [
-        "kci-dev",
-        "checkout",
-        "--giturl",
-        state["giturl"],
-        "--branch",
-        state["branch"],
-        "--test",
-        state["test"],
-        "--commit",
-        commit,
-        "--watch",
-    ]
-    # job_filter is array, so we need to add each element as a separate argument
-    for job in state["job_filter"]:
-        cmd.append("--job-filter")
-        cmd.append(job)
-    for platform in state["platform_filter"]:
-        cmd.append("--platform-filter")
-        cmd.append(platform)
-    result = kcidev_exec(cmd)
-    try:
-        testret = result.returncode
-    except Exception as e:
-        logging.error(f"Error getting return code from kci-dev: {e}")
-        kci_err(f"Error executing kci-dev, no returncode: {e}")
-        sys.exit(1)
+    steps = state.setdefault("steps", [])
+    step = run_bisect_step(maestro, state, commit)
+    steps.append(step)
 
     retry_fail = state.get("retry_fail", 0)
     for retry in range(retry_fail):
-        if testret != 1:
+        if step["code"] != 1 or step.get("reused"):
             break
         attempt = retry + 1
         click.secho(f"Test failed; retrying ({attempt}/{retry_fail})", fg="yellow")
@@ -267,9 +660,21 @@ def _bisection_loop(state):
             attempt,
             retry_fail,
         )
-        result = kcidev_exec(cmd)
-        testret = result.returncode
+        step = run_bisect_step(maestro, state, commit)
+        steps.append(step)
+
+    return mark_bisect_step(state, step)
 
+
+def mark_bisect_step(state, step):
+    """
+    Mark the commit of step, its last run, in the git bisect of the current
+    directory and update state. Return None on a Maestro error.
+    """
+    commit = step["commit"]
+    retry_fail = state.get("retry_fail", 0)
+    steps = state.setdefault("steps", [])
+    testret = step["code"]
     logging.info(f"Test completed with return code: {testret}")
 
     if testret == 0:
@@ -284,20 +689,25 @@ def _bisection_loop(state):
     elif testret == 2:
         # TBD: Retry failed test to make sure it is not a flaky test
         bisect_result = "skip"
-        logging.info(f"Commit {commit} marked as SKIP (test inconclusive)")
-    elif testret == 3:
+        if step["failed_job"]:
+            logging.info(
+                f"Commit {commit} marked as SKIP ({step['failed_job']} failed)"
+            )
+        else:
+            logging.info(f"Commit {commit} marked as SKIP (test inconclusive)")
+    else:
         logging.warning("Maestro internal error - will retry")
         kci_err(f"Maestro failed to execute the test.")
         # Internal maestro error, retry procesure
         return None
-    else:
-        logging.error(f"Unexpected return code {testret} from kci-dev")
-        kci_err(
-            f"Unknown or critical return code from kci-dev: {testret}. Try to run last command manually and inspect the output:"
-        )
-        kci_err(f"{' '.join(cmd)}")
-        sys.exit(1)
-    cmd = ["git", "bisect", bisect_result]
+    runs = [s for s in steps if s["commit"] == commit]
+    seconds = sum(s["submit_seconds"] + s["watch_seconds"] for s in runs)
+    click.secho(
+        f"Commit {commit} is {bisect_result} "
+        f"({len(runs)} Maestro runs, {seconds:.0f}s)",
+        fg="green",
+    )
+    cmd = ["git", "bisect", bisect_result, commit]
     commitid, complete = git_exec_getcommit(cmd)
     if not commitid:
         logging.error("Git bisect returned empty commit")
@@ -305,6 +715,75 @@ def _bisection_loop(state):
         sys.exit(1)
 
     state["history"].append({commit: bisect_result})
+    if complete:
+        state["first_bad"] = commitid
+        state["next_commit"] = None
+    else:
+        state["next_commit"] = next_bisect_commit(state, commitid)
+    logging.info(f"Bisection history updated - {len(state['history'])} commits tested")
+    return state
+
+
+def _parallel_bisection_loop(state, maestro, parallel):
+    if state["next_commit"] is None:
+        logging.error(
+            "No next commit to test - bisection may be complete or in error state"
+        )
+        click.secho("Bisection error?", fg="green")
+        return
+    commits = bisect_candidates(parallel, state.get("paths"))
+    if len(commits) < 2:
+        return _bisection_loop(state, maestro)
+    click.secho(f"Testing {len(commits)} commits: {' '.join(commits)}", fg="green")
+    logging.info(f"Testing {len(commits)} commits in parallel")
+    steps = state.setdefault("steps", [])
+    results = {}
+    pending = commits
+    for attempt in range(state.get("retry_fail", 0) + 1):
+        if attempt:
+            click.secho(
+                f"Tests failed on {len(pending)} commits; retrying "
+                f"({attempt}/{state['retry_fail']})",
+                fg="yellow",
+            )
+        for step in run_bisect_steps(maestro, state, pending):
+            steps.append(step)
+            results[step["commit"]] = step["code"]
+        pending = [
+            step["commit"]
+            for step in steps[-len(pending) :]
+            if step["code"] == 1 and not step.get("reused")
+        ]
+        if not pending:
+            break
+
+    if all(code == 3 for code in results.values()):
+        kci_err("Maestro failed to execute the tests.")
+        return None
+
+    # Mark the oldest bad commit first, then only the good and skipped
+    # commits below it: a flaky good result above a bad one is ignored
+    bad = [commit for commit in commits if results[commit] == 1]
+    marks = [(bad[-1], "bad")] if bad else []
+    marks += [
+        (commit, STEP_RESULTS[results[commit]])
+        for commit in commits
+        if results[commit] in (0, 2)
+    ]
+    commitid, complete = None, False
+    for commit, bisect_result in marks:
+        if bisect_result != "bad" and not _is_ancestor(commit, "refs/bisect/bad"):
+            kci_warning(f"Ignoring {bisect_result} result of {commit} above a bad one")
+            continue
+        commitid, complete = git_exec_getcommit(
+            ["git", "bisect", bisect_result, commit]
+        )
+        state["history"].append({commit: bisect_result})
+        if complete:
+            break
+    if commitid is None:
+        return None
+
     if complete:
         state["first_bad"] = commitid
         state["next_commit"] = None
@@ -324,6 +803,16 @@ and marks commits as good/bad based on test results.
 The bisection state is saved to a file, allowing you to interrupt and resume
 the process. Use --ignore-state to start a fresh bisection.
 
+With --parallel K, K evenly spaced commits of the remaining range are checked
+out and watched at the same time, and all their results narrow the range.
+This needs about log(K+1) rounds instead of log(2), using K times the CI
+capacity per round.
+
+With --paths, commits touching these paths are considered more likely to
+be the culprit and the range is split by likelihood instead of commit
+count. Commits whose kbuild job of --job-filter already failed in Maestro
+are skipped without being checked out again.
+
 \b
 Examples:
   kci-dev bisect --giturl https://git.kernel.org/torvalds/linux.git \\
@@ -336,6 +825,12 @@ Examples:
 
   # Start fresh, ignoring saved state
   kci-dev bisect --ignore-state --giturl ... --good ... --bad ...
+
+  # Favour commits touching the GPU drivers
+  kci-dev bisect ... --paths drivers/gpu
+
+  # Test 3 commits per round, splitting the range in 4 parts each time
+  kci-dev bisect --parallel 3
 """
 )
 @click.option("--giturl", help="Git repository URL containing the kernel source")
@@ -355,6 +850,18 @@ Examples:
     default="kcidev-src",
     type=click.Path(),
 )
+@click.option(
+    "--blobless/--full-clone",
+    default=True,
+    show_default=True,
+    help="Clone the workdir without file contents or a checked out tree",
+)
+@click.option(
+    "--reference",
+    help="Borrow git objects from this local repository. It is created as a "
+    "shared object cache for all workdirs when it does not exist",
+    type=click.Path(),
+)
 @click.option(
     "--ignore-state", help="Ignore saved state and start fresh bisection", is_flag=True
 )
@@ -377,6 +884,31 @@ Examples:
 @click.option(
     "--test", help="Specific test expected to fail (e.g., baseline.login, ltp.syscalls)"
 )
+@click.option(
+    "--paths",
+    help="Source paths likely related to the regression (e.g. drivers/gpu). "
+    "Commits touching them are tested first. Can be used multiple times",
+    multiple=True,
+)
+@click.option(
+    "--events",
+    is_flag=True,
+    help="Follow Maestro node events instead of polling at fixed intervals",
+)
+@click.option(
+    "--reuse/--no-reuse",
+    default=True,
+    show_default=True,
+    help="Use conclusive existing dashboard and Maestro results, or a running "
+    "checkout, of a commit instead of testing it again",
+)
+@click.option(
+    "--parallel",
+    help="Test this many evenly spaced commits of the bisect range at once",
+    default=1,
+    type=click.IntRange(min=1),
+    show_default=True,
+)
 
 # test
 @click.pass_context
@@ -388,11 +920,17 @@ def bisect(
     bad,
     retry_fail,
     workdir,
+    blobless,
+    reference,
     ignore_state,
     state_file,
     job_filter,
     platform_filter,
     test,
+    paths,
+    events,
+    reuse,
+    parallel,
 ):
     logging.info("Starting bisect command")
     logging.debug(
@@ -446,9 +984,11 @@ def bisect(
         state["job_filter"] = job_filter
         state["platform_filter"] = platform_filter
         state["test"] = test
+        state["paths"] = list(paths)
         state["workdir"] = workdir
+        state["reference"] = reference or ""
         logging.info("Initialized new bisection state")
-        repo = update_tree(workdir, branch, giturl)
+        repo = update_tree(workdir, branch, giturl, True, blobless, reference)
         save_state(state, state_file)
     else:
         logging.info("Resuming bisection from saved state")
@@ -460,7 +1000,11 @@ def bisect(
             )
             return
         repo = update_tree(
-            state["workdir"], state["branch"], state["giturl"], reset=False
+            state["workdir"],
+            state["branch"],
+            state["giturl"],
+            reset=False,
+            reference=state.get("reference"),
         )
 
     if not state["bisect_init"]:
@@ -469,40 +1013,46 @@ def bisect(
         state["bisect_init"] = True
         save_state(state, state_file)
 
-    while True:
-        click.secho("Bisection loop", fg="green")
-        logging.info(
-            f"Starting bisection iteration - commits tested: {len(state.get('history', []))}"
-        )
-        for attempt in range(1, MAESTRO_RETRY_LIMIT + 1):
-            new_state = bisection_loop(state)
-            if new_state is not None:
-                break
-            if attempt == MAESTRO_RETRY_LIMIT:
-                raise click.ClickException(
-                    "Maestro failed repeatedly; bisection state was preserved."
-                )
-            delay = MAESTRO_RETRY_BASE_DELAY**attempt
-            logging.warning(
-                "Maestro failed; retrying in %d seconds (%d/%d)",
-                delay,
-                attempt,
-                MAESTRO_RETRY_LIMIT,
-            )
-            click.secho(
-                f"Retrying Maestro in {delay} seconds "
-                f"({attempt}/{MAESTRO_RETRY_LIMIT})",
-                fg="yellow",
-            )
-            time.sleep(delay)
-        state = new_state
-        save_state(state, state_file)
-        if state.get("first_bad"):
-            click.secho(
-                f"Bisection complete. First bad commit: {state['first_bad']}",
-                fg="green",
+    # Checkouts are submitted and watched in this process, the HTTP session
+    # and the watch session are reused by every step and retry
+    maestro = bisect_maestro(config, instance, events, reuse)
+    try:
+        while True:
+            click.secho("Bisection loop", fg="green")
+            logging.info(
+                f"Starting bisection iteration - commits tested: {len(state.get('history', []))}"
             )
-            return
+            for attempt in range(1, MAESTRO_RETRY_LIMIT + 1):
+                new_state = bisection_loop(state, maestro, parallel)
+                if new_state is not None:
+                    break
+                if attempt == MAESTRO_RETRY_LIMIT:
+                    raise click.ClickException(
+                        "Maestro failed repeatedly; bisection state was preserved."
+                    )
+                delay = MAESTRO_RETRY_BASE_DELAY**attempt
+                logging.warning(
+                    "Maestro failed; retrying in %d seconds (%d/%d)",
+                    delay,
+                    attempt,
+                    MAESTRO_RETRY_LIMIT,
+                )
+                click.secho(
+                    f"Retrying Maestro in {delay} seconds "
+                    f"({attempt}/{MAESTRO_RETRY_LIMIT})",
+                    fg="yellow",
+                )
+                time.sleep(delay)
+            state = new_state
+            save_state(state, state_file)
+            if state.get("first_bad"):
+                click.secho(
+                    f"Bisection complete. First bad commit: {state['first_bad']}",
+                    fg="green",
+                )
+                return
+    finally:
+        close_bisect_maestro(maestro)
 
 
 if __name__ == "__main__":
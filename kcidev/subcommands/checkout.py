@@ -3,16 +3,14 @@
 
 import datetime
 import logging
-import re
-import subprocess
 import sys
 import time
 
 import click
-from git import Repo
 
 from kcidev.libs.common import *
 from kcidev.libs.maestro_common import *
+from kcidev.libs.remote_refs import ls_remote_ref
 
 
 def retrieve_tot_commit(repourl, branch):
@@ -22,18 +20,8 @@ def retrieve_tot_commit(repourl, branch):
     Unfortunately, gitpython does not support fetching the latest commit
     on a branch without having to clone the repo.
     """
-    cmd = ["git", "ls-remote", repourl, f"refs/heads/{branch}"]
     logging.info(f"Retrieving tip-of-tree commit for {repourl} branch {branch}")
-    logging.debug(f"Running command: {' '.join(cmd)}")
-
-    process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-    stdout, stderr = process.communicate()
-
-    if process.returncode != 0:
-        logging.error(f"Failed to retrieve tip-of-tree: {stderr.decode('utf-8')}")
-        return None
-
-    sha = re.split(r"\t+", stdout.decode("ascii"))[0]
+    sha = ls_remote_ref(repourl, f"refs/heads/{branch}")
     logging.info(f"Retrieved tip-of-tree commit: {sha}")
     return sha
 
@@ -64,6 +52,10 @@ Examples:
                    --job-filter baseline --platform-filter qemu-x86 \\
                    --watch
 
+  # Watch a running checkout of the same commit and filters if there is one
+  kci-dev checkout --giturl ... --branch ... --commit ... \\
+                   --job-filter baseline --watch --reuse-existing running
+
   # Watch for a specific test result and return appropriate exit code
   kci-dev checkout --giturl ... --branch ... --commit ... \\
                    --job-filter baseline --watch --test baseline.login
@@ -109,9 +101,33 @@ Examples:
     "--test",
     help="Watch for specific test result and set exit code accordingly (requires --watch)",
 )
+@click.option(
+    "--events",
+    is_flag=True,
+    help="Follow Maestro node events instead of polling at fixed intervals",
+)
+@click.option(
+    "--reuse-existing",
+    type=click.Choice(CHECKOUT_REUSE_POLICIES),
+    default="no",
+    show_default=True,
+    help="Use an existing checkout of the same commit with the same filters "
+    "instead of submitting a new one: only while it is running, or also once "
+    "it completed successfully (any)",
+)
 @click.pass_context
 def checkout(
-    ctx, giturl, branch, commit, job_filter, platform_filter, tipoftree, watch, test
+    ctx,
+    giturl,
+    branch,
+    commit,
+    job_filter,
+    platform_filter,
+    tipoftree,
+    watch,
+    test,
+    events,
+    reuse_existing,
 ):
     # Check if no parameters provided - show help
     if not any(
@@ -146,6 +162,8 @@ def checkout(
         raise click.UsageError("No job filter defined. Can't watch for a job(s)!")
     if test and not watch:
         raise click.UsageError("Test option only works with watch option")
+    if events and not watch:
+        raise click.UsageError("Events option only works with watch option")
     if not commit and not tipoftree:
         raise click.UsageError("No commit or tree/branch latest commit defined")
     if tipoftree:
@@ -160,16 +178,29 @@ def checkout(
                 "Unable to retrieve latest commit. Wrong tree/branch?"
             )
         click.secho(f"Commit to checkout: {commit}", fg="green")
-    resp = send_checkout_full(
-        url,
-        token,
-        giturl=giturl,
-        branch=branch,
-        commit=commit,
-        job_filter=job_filter,
-        platform_filter=platform_filter,
-        watch=watch,
+    resp = None
+    node = maestro_find_checkout(
+        apiurl,
+        giturl,
+        branch,
+        commit,
+        job_filter,
+        platform_filter,
+        policy=reuse_existing,
     )
+    if node:
+        resp = {"message": f"Reusing existing checkout {node['id']}", "node": node}
+    else:
+        resp = send_checkout_full(
+            url,
+            token,
+            giturl=giturl,
+            branch=branch,
+            commit=commit,
+            job_filter=job_filter,
+            platform_filter=platform_filter,
+            watch=watch,
+        )
     if not resp:
         kci_err("Failed to trigger checkout")
         sys.exit(64)
@@ -201,7 +232,7 @@ def checkout(
         if test:
             click.secho(f"Watching for test result: {test}", fg="green")
         # watch for jobs
-        maestro_watch_jobs(apiurl, token, treeid, job_filter, test)
+        maestro_watch_jobs(apiurl, token, treeid, job_filter, test, events=events)
 
 
 if __name__ == "__main__":
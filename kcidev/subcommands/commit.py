@@ -4,10 +4,11 @@
 import logging
 
 import click
-from git import Repo
 
 
 def find_diff(path, branch, origin, repository):
+    from git import Repo
+
     logging.info(f"Finding diff between {origin} and {branch} in {path}")
     repo = Repo(path)
     assert not repo.bare
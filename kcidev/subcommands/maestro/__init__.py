@@ -1,12 +1,17 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+import itertools
 import sys
 
 import click
 
 from kcidev.libs.common import kci_msg, kci_msg_cyan, kci_msg_green, kci_msg_nonl
-from kcidev.libs.maestro_common import maestro_get_nodes
+from kcidev.libs.maestro_common import (
+    MAESTRO_PARENT_BATCH,
+    maestro_get_children,
+    maestro_iter_nodes,
+)
 from kcidev.subcommands.maestro.results import results
 from kcidev.subcommands.maestro.validate import validate
 
@@ -151,6 +156,40 @@ def print_bar_graph(data):
     plt.show()
 
 
+def iter_coverage_reports(api_url, build_nodes, batch_size=MAESTRO_PARENT_BATCH):
+    """Yield ``(build, coverage_report, coverage_tests)`` for build nodes.
+
+    Builds are consumed in chunks of ``batch_size``. For each chunk the
+    process children and then the test grandchildren of the coverage reports
+    are looked up with batched queries, so results stream out chunk by chunk
+    instead of waiting for the whole tree.
+    """
+    cache = {}
+    build_nodes = iter(build_nodes)
+    while True:
+        builds = list(itertools.islice(build_nodes, batch_size))
+        if not builds:
+            return
+        processes = maestro_get_children(
+            api_url,
+            [build["id"] for build in builds],
+            ["kind=process", "state=done", "result=pass"],
+            cache,
+        )
+        reports = [
+            (build, child)
+            for build in builds
+            for child in processes[build["id"]]
+            if child["name"].startswith("coverage-report") and child.get("artifacts")
+        ]
+        tests = maestro_get_children(
+            api_url, [child["id"] for _, child in reports], ["kind=test"], cache
+        )
+        for build, child in reports:
+            if tests[child["id"]]:
+                yield build, child, tests[child["id"]]
+
+
 @maestro.command(
     name="coverage",
     help="""Fetch coverage information for maestro results on chromiumos tree
@@ -216,58 +255,44 @@ def coverage(ctx, branch, commit, limit, offset, start_date, end_date, graph_out
         filters.append(f"created__lt={end_date}")
     if graph_output:
         aggregate_data = {}
-    build_nodes = maestro_get_nodes(api_url, limit, offset, filters, True)
-    for build_node in build_nodes:
-        child_nodes = maestro_get_nodes(
-            api_url,
-            limit,
-            offset,
-            [f"parent={build_node['id']}", "kind=process", "state=done", "result=pass"],
-            True,
-        )
-        for child in child_nodes:
-            if not child["name"].startswith("coverage-report"):
-                continue
-            artifacts = child.get("artifacts")
-            if artifacts:
-                coverage_tests = maestro_get_nodes(
-                    api_url, 50, 0, [f"parent={child['id']}", "kind=test"], True
-                )
-                if not coverage_tests:
-                    continue
-                b = child["data"].get("kernel_revision", {}).get("branch")
-                c = child["data"].get("kernel_revision", {}).get("commit")
-                func_coverage = None
-                line_coverage = None
-                for test in coverage_tests:
-                    if test["name"] == "coverage.functions":
-                        func_coverage = test["data"].get("misc", {}).get("measurement")
-                    if test["name"] == "coverage.lines":
-                        line_coverage = test["data"].get("misc", {}).get("measurement")
-
-                if graph_output:
-                    data = {
-                        "commit": c,
-                        "function_coverage": func_coverage,
-                        "line_coverage": line_coverage,
-                        "coverage_report_url": artifacts.get("coverage_report"),
-                    }
-                    if aggregate_data.get(f"chromiumos/{b}"):
-                        aggregate_data[f"chromiumos/{b}"].append(data)
-                    else:
-                        aggregate_data[f"chromiumos/{b}"] = [data]
-                else:
-                    kci_msg_nonl("- Tree/branch: ")
-                    kci_msg_cyan(f"chromiumos/{b}")
-                    kci_msg(f"  Commit: {c}")
-                    kci_msg(f"  Build: {api_url}viewer?node_id={build_node['id']}")
-                    kci_msg_nonl("  Function coverage: ")
-                    kci_msg_green(f"{func_coverage}%")
-                    kci_msg_nonl("  Line coverage: ")
-                    kci_msg_green(f"{line_coverage}%")
-                    kci_msg(f"  Coverage report: {artifacts.get('coverage_report')}")
-                    kci_msg(f"  Coverage logs: {artifacts.get('log')}")
-                    kci_msg("")
+    build_nodes = maestro_iter_nodes(api_url, filters, offset=offset, limit=limit)
+    for build_node, child, coverage_tests in iter_coverage_reports(
+        api_url, build_nodes
+    ):
+        artifacts = child["artifacts"]
+        b = child["data"].get("kernel_revision", {}).get("branch")
+        c = child["data"].get("kernel_revision", {}).get("commit")
+        func_coverage = None
+        line_coverage = None
+        for test in coverage_tests:
+            if test["name"] == "coverage.functions":
+                func_coverage = test["data"].get("misc", {}).get("measurement")
+            if test["name"] == "coverage.lines":
+                line_coverage = test["data"].get("misc", {}).get("measurement")
+
+        if graph_output:
+            data = {
+                "commit": c,
+                "function_coverage": func_coverage,
+                "line_coverage": line_coverage,
+                "coverage_report_url": artifacts.get("coverage_report"),
+            }
+            if aggregate_data.get(f"chromiumos/{b}"):
+                aggregate_data[f"chromiumos/{b}"].append(data)
+            else:
+                aggregate_data[f"chromiumos/{b}"] = [data]
+        else:
+            kci_msg_nonl("- Tree/branch: ")
+            kci_msg_cyan(f"chromiumos/{b}")
+            kci_msg(f"  Commit: {c}")
+            kci_msg(f"  Build: {api_url}viewer?node_id={build_node['id']}")
+            kci_msg_nonl("  Function coverage: ")
+            kci_msg_green(f"{func_coverage}%")
+            kci_msg_nonl("  Line coverage: ")
+            kci_msg_green(f"{line_coverage}%")
+            kci_msg(f"  Coverage report: {artifacts.get('coverage_report')}")
+            kci_msg(f"  Coverage logs: {artifacts.get('log')}")
+            kci_msg("")
     if graph_output:
         print_bar_graph(aggregate_data)
 
@@ -5,7 +5,6 @@ import logging
 import sys
 
 import click
-from git import Repo
 
 from kcidev.libs.common import *
 from kcidev.libs.maestro_common import *
@@ -75,7 +74,7 @@ Examples:
 @click.option(
     "--paginate/--no-paginate",
     default=True,
-    help="Enable or disable pagination parameters in the API request",
+    help="Fetch only --limit nodes from --offset, or walk every page of matching nodes",
 )
 @click.option(
     "--verbose/--no-verbose",
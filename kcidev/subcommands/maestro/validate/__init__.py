@@ -2,8 +2,11 @@ import sys
 
 import click
 
+from kcidev.subcommands.maestro.validate.all import validate_all
 from kcidev.subcommands.maestro.validate.boots import boots
 from kcidev.subcommands.maestro.validate.builds import builds
+from kcidev.subcommands.maestro.validate.merge import merge
+from kcidev.subcommands.maestro.validate.serve import serve
 
 
 @click.group(
@@ -13,6 +16,9 @@ from kcidev.subcommands.maestro.validate.builds import builds
 Subcommands:
     builds - Validate build results
     boots  - Validate boot results
+    all    - Validate build and boot results in a single run
+    merge  - Merge JSON reports of a sharded validation run
+    serve  - Validate continuously and export Prometheus metrics
 
 \b
 Examples:
@@ -22,6 +28,11 @@ Examples:
     # Validate boots
     kci-dev maestro validate boots --all-checkouts --days <number-of-days>
     kci-dev maestro validate boots -commit <git-commit> --giturl <git-url> --branch <git-branch>
+    # Validate builds and boots sharing the fetched data
+    kci-dev maestro validate all --all-checkouts --days <number-of-days>
+    # Split validation across machines and merge the JSON reports
+    kci-dev maestro validate builds --all-checkouts --json --shard 1/2 > shard1.json
+    kci-dev maestro validate merge shard1.json shard2.json
     # Validate builds history
     kci-dev maestro validate builds --history --all-checkouts --days <number-of-days> --arch <architecture-filter>
     kci-dev maestro validate builds --history -commit <git-commit> --giturl <git-url> --branch <git-branch> --days <number-of-days>
@@ -39,6 +50,9 @@ def validate(ctx):
 # Add subcommands to the validate group
 validate.add_command(builds)
 validate.add_command(boots)
+validate.add_command(validate_all)
+validate.add_command(merge)
+validate.add_command(serve)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,230 @@
+import json
+import sys
+
+import click
+
+from kcidev.libs.common import kci_msg_bold
+from kcidev.libs.git_repo import get_tree_name, set_giturl_branch_commit
+from kcidev.libs.results import fetch_trees
+from kcidev.libs.shard import shard_option, shard_trees
+
+from .helper import (
+    checkpoint_row,
+    get_checkout_stats,
+    load_checkpoint,
+    print_simple_list,
+    print_table_stats,
+    save_checkpoint_row,
+    validation_reports_to_json,
+)
+
+TABLE_HEADERS = {
+    "builds": [
+        "tree/branch",
+        "Commit",
+        "Maestro\nbuilds",
+        "Dashboard\nbuilds",
+        "Build count\ncomparison",
+        "Missing build IDs",
+        "Builds with\nstatus mismatch",
+    ],
+    "boots": [
+        "tree/branch",
+        "Commit",
+        "Maestro\nboots",
+        "Dashboard\nboots",
+        "Boot count\ncomparison",
+        "Missing boot IDs",
+        "Boots with\nstatus mismatch",
+    ],
+}
+
+
+@click.command(
+    name="all",
+    help="""Validate dashboard build and boot results with maestro.
+
+Same as running the builds and boots validation one after the other, but
+the tree list is downloaded once and the maestro and dashboard data of
+each checkout is fetched once for both validations.
+
+Provide --all-checkouts flag to validate all available checkouts,
+or use --giturl, --branch, and --commit for a specific checkout.
+
+\b
+Examples:
+    kci-dev maestro validate all --all-checkouts --days <number-of-days>
+    kci-dev maestro validate all --commit <git-commit> --giturl <git-url> --branch <git-branch>
+    kci-dev maestro validate all --all-checkouts --json --fail-on-mismatch
+    """,
+)
+@click.option(
+    "--all-checkouts",
+    is_flag=True,
+    help="Get build and boot validation stats for all available checkouts",
+)
+@click.option(
+    "--days",
+    help="Provide a period of time in days to get results for",
+    type=int,
+    default="7",
+)
+@click.option(
+    "--origin",
+    help="Select KCIDB origin",
+    default="maestro",
+)
+@click.option(
+    "--giturl",
+    help="Git URL of kernel tree",
+)
+@click.option(
+    "--branch",
+    help="Branch to get results for",
+)
+@click.option(
+    "--commit",
+    help="Commit or tag to get results for",
+)
+@click.option(
+    "--git-folder",
+    help="Path of git repository folder",
+)
+@click.option(
+    "--latest",
+    is_flag=True,
+    help="Select latest results available",
+)
+@click.option("--arch", help="Filter by arch")
+@click.option(
+    "--verbose",
+    is_flag=True,
+    default=False,
+    help="Get detailed output",
+)
+@click.option(
+    "--table-output",
+    is_flag=True,
+    default=False,
+    help="Display results in table format",
+)
+@click.option(
+    "--json",
+    "use_json",
+    is_flag=True,
+    default=False,
+    help="Print validation results as JSON",
+)
+@click.option(
+    "--fail-on-mismatch",
+    is_flag=True,
+    default=False,
+    help="Exit with status 1 when validation finds mismatches",
+)
+@click.option(
+    "--state-file",
+    help="Checkpoint validated checkouts to this file",
+)
+@click.option(
+    "--resume",
+    is_flag=True,
+    default=False,
+    help="Skip checkouts that validated fine in a previous run with the same --state-file",
+)
+@shard_option
+@click.pass_context
+def validate_all(
+    ctx,
+    all_checkouts,
+    origin,
+    giturl,
+    branch,
+    commit,
+    git_folder,
+    latest,
+    arch,
+    days,
+    verbose,
+    table_output,
+    use_json,
+    fail_on_mismatch,
+    state_file,
+    resume,
+    shard,
+):
+    final_stats = {"builds": [], "boots": []}
+    raise_errors = use_json or fail_on_mismatch
+    checkpoint = load_checkpoint(
+        state_file, resume, {"origin": origin, "arch": arch, "days": days}
+    )
+    if shard and not all_checkouts:
+        raise click.UsageError("--shard only works with --all-checkouts")
+    stdout = sys.stdout
+    if use_json:
+        sys.stdout = sys.stderr
+    try:
+        if not use_json:
+            print("Fetching build and boot information...")
+        if all_checkouts:
+            if giturl or branch or commit:
+                raise click.UsageError(
+                    "Cannot use --all-checkouts with --giturl, --branch, or --commit"
+                )
+            trees_list = shard_trees(fetch_trees(origin, days), shard)
+            checkouts = [
+                (
+                    tree["git_repository_url"],
+                    tree["git_repository_branch"],
+                    tree["git_commit_hash"],
+                    tree["tree_name"],
+                    tree.get("start_time"),
+                )
+                for tree in trees_list
+            ]
+        else:
+            giturl, branch, commit = set_giturl_branch_commit(
+                origin, giturl, branch, commit, latest, git_folder
+            )
+            tree_name = get_tree_name(origin, giturl, branch)
+            checkouts = [(giturl, branch, commit, tree_name, None)]
+        for giturl, branch, commit, tree_name, started in checkouts:
+            tree_branch = f"{tree_name}/{branch}"
+            stats = {
+                kind: checkpoint_row(checkpoint, kind, tree_branch, commit)
+                for kind in final_stats
+            }
+            if not all(stats.values()):
+                stats = get_checkout_stats(
+                    ctx,
+                    giturl,
+                    branch,
+                    commit,
+                    tree_name,
+                    verbose,
+                    arch,
+                    raise_errors,
+                )
+                for kind, row in stats.items():
+                    save_checkpoint_row(checkpoint, kind, row, started)
+            for kind, row in stats.items():
+                if row:
+                    final_stats[kind].append(row)
+    finally:
+        sys.stdout = stdout
+    report = validation_reports_to_json(final_stats, False, origin, days, arch)
+    if use_json:
+        click.echo(json.dumps(report))
+    else:
+        for kind, rows in final_stats.items():
+            if not rows:
+                continue
+            kci_msg_bold(f"{kind.capitalize()}:")
+            if table_output:
+                max_col_width = [None, 40, 3, 3, 2, 30, 30]
+                print_table_stats(
+                    rows, TABLE_HEADERS[kind], max_col_width, "simple_grid"
+                )
+            else:
+                print_simple_list(rows, kind, False)
+    if fail_on_mismatch and not report["summary"]["ok"]:
+        ctx.exit(1)
@@ -3,10 +3,13 @@ import sys
 import click
 
 from kcidev.libs.git_repo import get_tree_name, set_giturl_branch_commit
-from kcidev.subcommands.results import trees
+from kcidev.libs.results import fetch_trees
+from kcidev.libs.shard import shard_option, shard_trees
 
 from .helper import (
+    checkpointed,
     get_boot_stats,
+    load_checkpoint,
     print_simple_list,
     print_table_stats,
     print_validation_json,
@@ -96,6 +99,17 @@ Examples:
     default=False,
     help="Exit with status 1 when validation finds mismatches",
 )
+@click.option(
+    "--state-file",
+    help="Checkpoint validated checkouts to this file",
+)
+@click.option(
+    "--resume",
+    is_flag=True,
+    default=False,
+    help="Skip checkouts that validated fine in a previous run with the same --state-file",
+)
+@shard_option
 @click.pass_context
 def boots(
     ctx,
@@ -112,9 +126,17 @@ def boots(
     table_output,
     use_json,
     fail_on_mismatch,
+    state_file,
+    resume,
+    shard,
 ):
     final_stats = []
     raise_errors = use_json or fail_on_mismatch
+    checkpoint = load_checkpoint(
+        state_file, resume, {"origin": origin, "arch": arch, "days": days}
+    )
+    if shard and not all_checkouts:
+        raise click.UsageError("--shard only works with --all-checkouts")
     stdout = sys.stdout
     if use_json:
         sys.stdout = sys.stderr
@@ -126,21 +148,29 @@ def boots(
                 raise click.UsageError(
                     "Cannot use --all-checkouts with --giturl, --branch, or --commit"
                 )
-            trees_list = ctx.invoke(trees, origin=origin, days=days, verbose=False)
+            trees_list = shard_trees(fetch_trees(origin, days), shard)
             for tree in trees_list:
                 giturl = tree["git_repository_url"]
                 branch = tree["git_repository_branch"]
                 commit = tree["git_commit_hash"]
                 tree_name = tree["tree_name"]
-                stats = get_boot_stats(
-                    ctx,
-                    giturl,
-                    branch,
+                started = tree.get("start_time")
+                stats = checkpointed(
+                    checkpoint,
+                    "boots",
+                    f"{tree_name}/{branch}",
                     commit,
-                    tree_name,
-                    verbose,
-                    arch,
-                    raise_errors,
+                    lambda: get_boot_stats(
+                        ctx,
+                        giturl,
+                        branch,
+                        commit,
+                        tree_name,
+                        verbose,
+                        arch,
+                        raise_errors,
+                    ),
+                    started,
                 )
                 if stats:
                     final_stats.append(stats)
@@ -149,15 +179,21 @@ def boots(
                 origin, giturl, branch, commit, latest, git_folder
             )
             tree_name = get_tree_name(origin, giturl, branch)
-            stats = get_boot_stats(
-                ctx,
-                giturl,
-                branch,
+            stats = checkpointed(
+                checkpoint,
+                "boots",
+                f"{tree_name}/{branch}",
                 commit,
-                tree_name,
-                verbose,
-                arch,
-                raise_errors,
+                lambda: get_boot_stats(
+                    ctx,
+                    giturl,
+                    branch,
+                    commit,
+                    tree_name,
+                    verbose,
+                    arch,
+                    raise_errors,
+                ),
             )
             if stats:
                 final_stats.append(stats)
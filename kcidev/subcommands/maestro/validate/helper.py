@@ -1,14 +1,32 @@
 #!/usr/bin/env python3
 
+import contextvars
 import json
-from datetime import datetime, timedelta
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
 
 import click
-from tabulate import tabulate
 
 from kcidev.libs.common import kci_msg, kci_msg_bold, kci_msg_json, kci_msg_red
-from kcidev.subcommands.maestro.results import results
-from kcidev.subcommands.results import boots, builds
+from kcidev.libs.maestro_common import maestro_get_nodes
+from kcidev.libs.results import fetch_boots, fetch_builds
+
+# Checkouts whose maestro and dashboard builds are fetched at the same time
+# in history mode
+HISTORY_FETCH_WORKERS = 4
+
+# Results of a checkout keep arriving for a while after it started. Its
+# checkpointed row is only reused when it was validated after this time, or
+# once the maestro checkout was done.
+CHECKOUT_SETTLE_TIME = timedelta(days=2)
+
+
+def get_maestro_nodes(ctx, filters):
+    """Walk all maestro nodes of the configured instance matching filters"""
+    url = ctx.obj["CFG"][ctx.obj["INSTANCE"]]["api"]
+    return maestro_get_nodes(url, None, 0, filters, False)
 
 
 def get_builds(ctx, giturl, branch, commit, arch, raise_errors=False):
@@ -25,23 +43,9 @@ def get_builds(ctx, giturl, branch, commit, arch, raise_errors=False):
     ]
     if arch:
         filters.append("data.arch=" + arch)
-    maestro_builds = ctx.invoke(
-        results,
-        nodes=True,
-        filter=filters,
-        paginate=False,
-        verbose=False,
-    )
+    maestro_builds = get_maestro_nodes(ctx, filters)
     try:
-        dashboard_builds = ctx.invoke(
-            builds,
-            giturl=giturl,
-            branch=branch,
-            commit=commit,
-            count=True,
-            verbose=False,
-            arch=arch,
-        )
+        dashboard_builds = fetch_builds("maestro", giturl, branch, commit, arch=arch)
     except click.Abort:
         if raise_errors:
             raise
@@ -57,43 +61,120 @@ def get_builds(ctx, giturl, branch, commit, arch, raise_errors=False):
     return maestro_builds, dashboard_builds
 
 
-def find_missing_items(maestro_data, dashboard_data, item_type, verbose):
+BUILD_STATUS_MAP = {
+    "pass": "PASS",
+    "fail": "FAIL",
+    "incomplete": "ERROR",
+}
+
+BOOT_STATUS_MAP = {
+    "pass": "PASS",
+    "fail": "FAIL",
+}
+
+MISSED_TEST_CODES = (
+    "Bug",
+    "Configuration",
+    "invalid_job_params",
+    "Job",
+    "job_generation_error",
+    "ObjectNotPersisted",
+    "RequestBodyTooLarge",
+    "submit_error",
+    "Unexisting permission codename.",
+    "kbuild_internal_error",
+)
+
+ERRORED_TEST_CODES = (
+    "Canceled",
+    "Infrastructure",
+    "LAVATimeout",
+    "MultinodeTimeout",
+    "Test",
+)
+
+
+def _build_retry(node):
+    return node["result"] == "incomplete" and node["retry_counter"] != 3
+
+
+def _boot_retry(node):
+    return node["result"] in {"incomplete", "fail"} and node["retry_counter"] != 3
+
+
+def _build_status(node):
+    return BUILD_STATUS_MAP.get(node["result"])
+
+
+def _boot_status(node):
+    if node["result"] != "incomplete":
+        return BOOT_STATUS_MAP.get(node["result"])
+    error_code = node["data"].get("error_code")
+    if error_code in MISSED_TEST_CODES:
+        return "MISS"
+    if error_code in ERRORED_TEST_CODES:
+        return "ERROR"
+    return None
+
+
+# Per item type: is a maestro node a retry, and which dashboard status it maps to
+RECONCILE_RULES = {
+    "build": (_build_retry, _build_status),
+    "boot": (_boot_retry, _boot_status),
+}
+
+
+def reconcile_items(maestro_data, dashboard_data, item_type, verbose=False):
     """
-    Compare build/boot IDs found in maestro with dashboard results
-    Return missing builds/boots in dashboard.
+    Compare maestro nodes with dashboard results of the same item type.
+    Return the missing IDs and the IDs whose status does not match.
+
+    Dashboard IDs are normalized once and both sides are indexed, so the
+    comparison is linear in the number of items. Missing IDs are taken from
+    the side with more items, maestro retries excluded.
     """
+    is_retry, expected_status = RECONCILE_RULES.get(item_type, (None, None))
     dashboard_ids = [b["id"].split(":")[1] for b in dashboard_data]
+    dashboard_status = {
+        item_id: b["status"] for item_id, b in zip(dashboard_ids, dashboard_data)
+    }
 
-    if item_type == "build":
-        # Exclude build retries
-        maestro_data = [
-            b
-            for b in maestro_data
-            if (b["result"] != "incomplete" or b["retry_counter"] == 3)
-        ]
-    elif item_type == "boot":
-        # Exclude boot retries
-        maestro_data = [
-            b
-            for b in maestro_data
-            if (b["result"] not in {"incomplete", "fail"} or b["retry_counter"] == 3)
-        ]
-
-    maestro_ids = [b["id"] for b in maestro_data]
-    if len(maestro_ids) > len(dashboard_ids):
-        missing_items = [b for b in maestro_data if b["id"] not in dashboard_ids]
+    maestro_items = []
+    maestro_ids = set()
+    status_mismatch_ids = []
+    for b in maestro_data:
+        if not is_retry or not is_retry(b):
+            maestro_items.append(b)
+            maestro_ids.add(b["id"])
+        if expected_status and b["id"] in dashboard_status:
+            if dashboard_status[b["id"]] != expected_status(b):
+                status_mismatch_ids.append(b["id"])
+
+    if len(maestro_items) > len(dashboard_ids):
+        missing_items = [b for b in maestro_items if b["id"] not in dashboard_status]
         missing_ids = [b["id"] for b in missing_items]
     else:
-        missing_items = [
-            b for b in dashboard_data if b["id"].split(":")[1] not in maestro_ids
+        missing = [
+            (item_id, b)
+            for item_id, b in zip(dashboard_ids, dashboard_data)
+            if item_id not in maestro_ids
         ]
-        missing_ids = [b["id"].split(":")[1] for b in missing_items]
+        missing_ids = [item_id for item_id, _ in missing]
+        missing_items = [b for _, b in missing]
 
     if missing_items and verbose:
         kci_msg("Missing items:")
         kci_msg_json(missing_items)
 
-    return missing_ids
+    return missing_ids, status_mismatch_ids
+
+
+def find_missing_items(maestro_data, dashboard_data, item_type, verbose):
+    """
+    Compare build/boot IDs found in maestro with dashboard results
+    Return missing builds/boots in dashboard.
+    """
+    return reconcile_items(maestro_data, dashboard_data, item_type, verbose)[0]
 
 
 def validate_build_status(maestro_builds, dashboard_builds):
@@ -101,21 +182,28 @@ def validate_build_status(maestro_builds, dashboard_builds):
     Validate if the build status of dashboard pulled build
     matches with the maestro build status
     """
-    status_map = {
-        "pass": "PASS",
-        "fail": "FAIL",
-        "incomplete": "ERROR",
-    }
-    builds_with_status_mismatch = []
-    dashboard_build_status_dict = {
-        b["id"].split(":")[1]: b["status"] for b in dashboard_builds
-    }
-    for b in maestro_builds:
-        build_id = b["id"]
-        if build_id in dashboard_build_status_dict:
-            if dashboard_build_status_dict[build_id] != status_map.get(b["result"]):
-                builds_with_status_mismatch.append(build_id)
-    return builds_with_status_mismatch
+    return reconcile_items(maestro_builds, dashboard_builds, "build")[1]
+
+
+def validation_row(
+    item_type, maestro_items, dashboard_items, tree_name, branch, commit, verbose
+):
+    """Reconcile maestro and dashboard items of a commit into a stats row"""
+    summary_flag = "✅"
+    missing_ids, status_mismatch_ids = reconcile_items(
+        maestro_items, dashboard_items, item_type, verbose
+    )
+    if len(dashboard_items) != len(maestro_items) or missing_ids or status_mismatch_ids:
+        summary_flag = "❌"
+    return [
+        f"{tree_name}/{branch}",
+        commit,
+        len(maestro_items),
+        len(dashboard_items),
+        summary_flag,
+        missing_ids,
+        status_mismatch_ids,
+    ]
 
 
 def get_build_stats(
@@ -127,34 +215,108 @@ def get_build_stats(
     )
     if dashboard_builds is None:
         return []
-    summary_flag = "✅"
-    missing_build_ids = find_missing_items(
-        maestro_builds, dashboard_builds, "build", verbose
+    return validation_row(
+        "build", maestro_builds, dashboard_builds, tree_name, branch, commit, verbose
     )
 
-    builds_with_status_mismatch = validate_build_status(
-        maestro_builds, dashboard_builds
-    )
-    if (
-        len(dashboard_builds) != len(maestro_builds)
-        or missing_build_ids
-        or builds_with_status_mismatch
-    ):
-        summary_flag = "❌"
-    stats = [
-        f"{tree_name}/{branch}",
-        commit,
-        len(maestro_builds),
-        len(dashboard_builds),
-        summary_flag,
-        missing_build_ids,
-        builds_with_status_mismatch,
-    ]
-    return stats
+
+def load_checkpoint(state_file, resume, options=None):
+    """Return the validation checkpoint kept in ``state_file``.
+
+    Without ``state_file`` None is returned and nothing is checkpointed.
+    Previous rows are only loaded when ``resume`` is set, and only when they
+    were validated with the same ``options`` (origin, arch, days...)."""
+    if not state_file:
+        if resume:
+            raise click.UsageError("--resume requires --state-file")
+        return None
+    # Compare options as they are stored in the file
+    options = json.loads(json.dumps(options or {}))
+    checkpoint = {"file": state_file, "options": options, "rows": {}}
+    if resume and os.path.exists(state_file):
+        with open(state_file, "r") as f:
+            state = json.load(f)
+        if state.get("options") != options:
+            raise click.UsageError(
+                f"{state_file} was written with options {state.get('options')}, "
+                f"not {options}. Run without --resume to start over"
+            )
+        checkpoint["rows"] = state.get("rows", {})
+        logging.info(
+            f"Loaded {len(checkpoint['rows'])} validated checkouts from {state_file}"
+        )
+    return checkpoint
+
+
+def checkpoint_key(kind, tree_branch, commit):
+    return f"{kind}|{tree_branch}|{commit}"
+
+
+def checkout_settled(started, done=False, now=None):
+    """Tell whether no more results are expected for a checkout: it is done,
+    or its ``started`` timestamp is older than CHECKOUT_SETTLE_TIME"""
+    if done:
+        return True
+    try:
+        start = datetime.fromisoformat(started.replace("Z", "+00:00"))
+    except (AttributeError, ValueError):
+        return False
+    if start.tzinfo is None:
+        start = start.replace(tzinfo=timezone.utc)
+    return (now or datetime.now(timezone.utc)) - start >= CHECKOUT_SETTLE_TIME
+
+
+def checkpoint_row(checkpoint, kind, tree_branch, commit):
+    """Return the checkpointed row of a checkout if it validated fine with
+    some items once the checkout was settled. Other checkouts are validated
+    again"""
+    if not checkpoint:
+        return None
+    entry = checkpoint["rows"].get(checkpoint_key(kind, tree_branch, commit))
+    if not entry or not entry["settled"]:
+        return None
+    row = entry["row"]
+    # No items at all usually means the results did not arrive yet
+    if validation_row_ok(row) and row[2]:
+        return row
+    return None
+
+
+def save_checkpoint_row(checkpoint, kind, row, started=None, done=False):
+    """Record a validated row and write the checkpoint file. ``started`` and
+    ``done`` describe the checkout, see checkout_settled()"""
+    if not checkpoint or not row:
+        return
+    checkpoint["rows"][checkpoint_key(kind, row[0], row[1])] = {
+        "row": row,
+        "settled": checkout_settled(started, done),
+    }
+    if not checkpoint["file"]:
+        return
+    tmp_file = checkpoint["file"] + ".tmp"
+    with open(tmp_file, "w") as f:
+        json.dump({"options": checkpoint["options"], "rows": checkpoint["rows"]}, f)
+    os.replace(tmp_file, checkpoint["file"])
+
+
+def checkpointed(
+    checkpoint, kind, tree_branch, commit, get_stats, started=None, done=False
+):
+    """Return the checkpointed row of a checkout, or compute it with
+    ``get_stats()`` and checkpoint it"""
+    row = checkpoint_row(checkpoint, kind, tree_branch, commit)
+    if row:
+        logging.info(f"Skipping {kind} {tree_branch} {commit}: already validated")
+        return row
+    row = get_stats()
+    save_checkpoint_row(checkpoint, kind, row, started, done)
+    return row
 
 
 def print_table_stats(data, headers, max_col_width, table_fmt):
     """Print build statistics in tabular format"""
+    from tabulate import tabulate
+
     print("Creating a stats report...")
     print(
         tabulate(data, headers=headers, maxcolwidths=max_col_width, tablefmt=table_fmt)
@@ -250,14 +412,31 @@ def print_simple_list(data, item_type, history=False):
             kci_msg("")
 
 
+def validation_row_ok(row):
+    """Check if a validation stats row has no mismatch of any kind"""
+    return row[2] == row[3] and row[4] == "✅" and not row[5] and not row[6]
+
+
+def validation_summary(results):
+    """Summarize the results of a JSON validation report."""
+    return {
+        "checked": len(results),
+        "failed": sum(not result["ok"] for result in results),
+        "missing": sum(len(result["missing_ids"]) for result in results),
+        "status_mismatches": sum(
+            len(result["status_mismatch_ids"]) for result in results
+        ),
+        "ok": all(result["ok"] for result in results),
+    }
+
+
 def validation_rows_to_json(kind, rows, history, origin, days, arch):
     """Convert validation stats rows to the public JSON report format."""
     results = []
     for row in rows:
         missing_ids = row[5] or []
         status_mismatch_ids = row[6] or []
-        ok = row[2] == row[3] and row[4] == "✅" and not missing_ids
-        ok = ok and not status_mismatch_ids
+        ok = validation_row_ok(row)
         results.append(
             {
                 "tree_branch": row[0],
@@ -276,19 +455,50 @@ def validation_rows_to_json(kind, rows, history, origin, days, arch):
         "origin": origin,
         "days": days,
         "arch": arch,
-        "summary": {
-            "checked": len(results),
-            "failed": sum(not result["ok"] for result in results),
-            "missing": sum(len(result["missing_ids"]) for result in results),
-            "status_mismatches": sum(
-                len(result["status_mismatch_ids"]) for result in results
-            ),
-            "ok": all(result["ok"] for result in results),
-        },
+        "summary": validation_summary(results),
         "results": results,
     }
 
 
+def validation_reports_to_json(rows_by_kind, history, origin, days, arch):
+    """Combine the validation rows of several kinds into one JSON report.
+
+    Each result keeps the validation_rows_to_json() format with an extra
+    "kind" field, and the summary covers all kinds."""
+    results = []
+    for kind, rows in rows_by_kind.items():
+        report = validation_rows_to_json(kind, rows, history, origin, days, arch)
+        results.extend({"kind": kind, **result} for result in report["results"])
+
+    return {
+        "kind": "all",
+        "history": history,
+        "origin": origin,
+        "days": days,
+        "arch": arch,
+        "summary": validation_summary(results),
+        "results": results,
+    }
+
+
+def merge_validation_reports(reports):
+    """Combine JSON validation reports of the shards of a run into one."""
+    fields = ("kind", "history", "origin", "days", "arch")
+    first = reports[0]
+    for report in reports[1:]:
+        for field in fields:
+            if report.get(field) != first.get(field):
+                raise click.ClickException(
+                    f"Cannot merge reports with different {field}: "
+                    f"{first.get(field)!r} and {report.get(field)!r}"
+                )
+    results = [result for report in reports for result in report["results"]]
+    merged = {field: first.get(field) for field in fields}
+    merged["summary"] = validation_summary(results)
+    merged["results"] = results
+    return merged
+
+
 def print_validation_json(kind, rows, history, origin, days, arch):
     """Print a single JSON validation report to stdout."""
     report = validation_rows_to_json(kind, rows, history, origin, days, arch)
@@ -301,50 +511,7 @@ def validate_boot_status(maestro_boots, dashboard_boots):
     Validate if the boot status of dashboard pulled boot
     matches with the maestro boot status
     """
-    MISSED_TEST_CODES = (
-        "Bug",
-        "Configuration",
-        "invalid_job_params",
-        "Job",
-        "job_generation_error",
-        "ObjectNotPersisted",
-        "RequestBodyTooLarge",
-        "submit_error",
-        "Unexisting permission codename.",
-        "kbuild_internal_error",
-    )
-
-    ERRORED_TEST_CODES = (
-        "Canceled",
-        "Infrastructure",
-        "LAVATimeout",
-        "MultinodeTimeout",
-        "Test",
-    )
-
-    status_map = {
-        "pass": "PASS",
-        "fail": "FAIL",
-    }
-
-    boots_with_status_mismatch = []
-    dashboard_boot_status_dict = {
-        b["id"].split(":")[1]: b["status"] for b in dashboard_boots
-    }
-    for b in maestro_boots:
-        boot_id = b["id"]
-        if boot_id in dashboard_boot_status_dict:
-            if b["result"] == "incomplete":
-                result = None
-                if b["data"].get("error_code") in MISSED_TEST_CODES:
-                    result = "MISS"
-                elif b["data"].get("error_code") in ERRORED_TEST_CODES:
-                    result = "ERROR"
-                if dashboard_boot_status_dict[boot_id] != result:
-                    boots_with_status_mismatch.append(boot_id)
-            elif dashboard_boot_status_dict[boot_id] != status_map.get(b["result"]):
-                boots_with_status_mismatch.append(boot_id)
-    return boots_with_status_mismatch
+    return reconcile_items(maestro_boots, dashboard_boots, "boot")[1]
 
 
 def get_boots(ctx, giturl, branch, commit, arch, raise_errors=False):
@@ -360,23 +527,10 @@ def get_boots(ctx, giturl, branch, commit, arch, raise_errors=False):
     ]
     if arch:
         filters.append(f"data.arch={arch}")
-    maestro_boots = ctx.invoke(
-        results,
-        nodes=True,
-        filter=filters,
-        paginate=False,
-        verbose=False,
-    )
+    maestro_boots = get_maestro_nodes(ctx, filters)
     try:
-        dashboard_boots = ctx.invoke(
-            boots,
-            giturl=giturl,
-            branch=branch,
-            commit=commit,
-            count=True,
-            verbose=False,
-            arch=arch,
-            boot_origin="maestro",
+        dashboard_boots = fetch_boots(
+            "maestro", giturl, branch, commit, arch=arch, boot_origin="maestro"
         )
     except click.Abort:
         if raise_errors:
@@ -402,58 +556,84 @@ def get_boot_stats(
     )
     if dashboard_boots is None:
         return []
-    summary_flag = "✅"
-    missing_boot_ids = find_missing_items(
-        maestro_boots, dashboard_boots, "boot", verbose
+    return validation_row(
+        "boot", maestro_boots, dashboard_boots, tree_name, branch, commit, verbose
     )
-    boots_with_status_mismatch = validate_boot_status(maestro_boots, dashboard_boots)
-    if (
-        len(dashboard_boots) != len(maestro_boots)
-        or missing_boot_ids
-        or boots_with_status_mismatch
-    ):
-        summary_flag = "❌"
-    stats = [
-        f"{tree_name}/{branch}",
-        commit,
-        len(maestro_boots),
-        len(dashboard_boots),
-        summary_flag,
-        missing_boot_ids,
-        boots_with_status_mismatch,
-    ]
+
+
+def get_checkout_stats(
+    ctx, giturl, branch, commit, tree_name, verbose, arch, raise_errors=False
+):
+    """Get build and boot stats of a checkout
+
+    Builds and boots are fetched at the same time, each from maestro and
+    the dashboard exactly once. Return a dict with "builds" and "boots"
+    stats rows, an empty row when the dashboard data is unavailable"""
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        fetched = {
+            kind: executor.submit(
+                contextvars.copy_context().run,
+                fetch,
+                ctx,
+                giturl,
+                branch,
+                commit,
+                arch,
+                raise_errors,
+            )
+            for kind, fetch in (("builds", get_builds), ("boots", get_boots))
+        }
+        fetched = {kind: future.result() for kind, future in fetched.items()}
+
+    stats = {}
+    for kind, item_type in (("builds", "build"), ("boots", "boot")):
+        maestro_items, dashboard_items = fetched[kind]
+        if dashboard_items is None:
+            stats[kind] = []
+            continue
+        stats[kind] = validation_row(
+            item_type,
+            maestro_items,
+            dashboard_items,
+            tree_name,
+            branch,
+            commit,
+            verbose,
+        )
     return stats
 
 
 def get_builds_history_stats(
-    ctx, giturl, branch, tree_name, arch, days, verbose, raise_errors=False
+    ctx,
+    giturl,
+    branch,
+    tree_name,
+    arch,
+    days,
+    verbose,
+    raise_errors=False,
+    checkpoint=None,
 ):
     checkouts = get_checkouts(ctx, giturl, branch, days)
-    final_stats = []
-    builds_history = get_builds_history(ctx, checkouts, arch, raise_errors)
-    for b in builds_history:
-        missing_build_ids = find_missing_items(b[1], b[2], "build", verbose)
-        total_maestro_builds = len(b[1])
-        total_dashboard_builds = len(b[2])
-        mismatched_ids = validate_build_status(b[1], b[2])
-        summary_flag = (
-            "✅"
-            if total_maestro_builds == total_dashboard_builds
-            and not missing_build_ids
-            and not mismatched_ids
-            else "❌"
+    tree_branch = f"{tree_name}/{branch}"
+    rows = {}
+    pending = []
+    for c in checkouts:
+        commit = c["data"]["kernel_revision"].get("commit")
+        row = checkpoint_row(checkpoint, "builds-history", tree_branch, commit)
+        if row:
+            rows[c["id"]] = row
+        else:
+            pending.append(c)
+    for c, b in iter_builds_history(ctx, pending, arch, raise_errors):
+        if b is None:
+            continue
+        rows[c["id"]] = validation_row(
+            "build", b[1], b[2], tree_name, branch, b[0], verbose
         )
-        stats = [
-            f"{tree_name}/{branch}",
-            b[0],
-            total_maestro_builds,
-            total_dashboard_builds,
-            summary_flag,
-            missing_build_ids,
-            mismatched_ids,
-        ]
-        final_stats.append(stats)
-    return final_stats
+        # Only done checkouts are listed, see get_checkouts()
+        save_checkpoint_row(checkpoint, "builds-history", rows[c["id"]], done=True)
+    return [rows[c["id"]] for c in checkouts if c["id"] in rows]
 
 
 def get_checkouts(ctx, giturl, branch, days):
@@ -468,58 +648,85 @@ def get_checkouts(ctx, giturl, branch, days):
         "state=done",
         "created__gte=" + start_timestamp.isoformat(),
     ]
-    checkouts = ctx.invoke(
-        results,
-        nodes=True,
-        filter=filters,
-        paginate=False,
-        verbose=False,
-    )
+    checkouts = get_maestro_nodes(ctx, filters)
     return checkouts
 
 
-def get_builds_history(ctx, checkouts, arch, raise_errors=False):
-    """Get builds from maestro and dashboard for provided checkouts"""
-    builds_history = []
-    for c in checkouts:
-        commit = c["data"]["kernel_revision"].get("commit")
-        filters = [
-            "kind=kbuild",
-            "data.error_code__ne=node_timeout",
-            "parent=" + c["id"],
-            "state__ne=running",
-        ]
-        if arch:
-            filters.append(f"data.arch={arch}")
-        maestro_builds = ctx.invoke(
-            results,
-            nodes=True,
-            filter=filters,
-            paginate=False,
-            verbose=False,
+def _get_checkout_builds(ctx, checkout, arch, raise_errors):
+    """Get maestro and dashboard builds of a single checkout.
+    Return a [commit, maestro_builds, dashboard_builds] row, or None
+    when the dashboard builds could not be retrieved"""
+    commit = checkout["data"]["kernel_revision"].get("commit")
+    filters = [
+        "kind=kbuild",
+        "data.error_code__ne=node_timeout",
+        "parent=" + checkout["id"],
+        "state__ne=running",
+    ]
+    if arch:
+        filters.append(f"data.arch={arch}")
+    maestro_builds = get_maestro_nodes(ctx, filters)
+
+    branch = checkout["data"]["kernel_revision"].get("branch")
+    try:
+        dashboard_builds = fetch_builds(
+            "maestro",
+            checkout["data"]["kernel_revision"].get("url"),
+            branch,
+            commit,
+            arch=arch,
         )
+        return [commit, maestro_builds, dashboard_builds]
+    except click.Abort:
+        if raise_errors:
+            raise
+        kci_msg_red(f"{branch}/{commit}: Aborted while fetching dashboard builds")
+    except click.ClickException as e:
+        if "No builds available" in e.message:
+            return [commit, maestro_builds, []]
+        if raise_errors:
+            raise
+        kci_msg_red(f"{branch}/{commit}: {e.message}")
+    return None
 
-        branch = c["data"]["kernel_revision"].get("branch")
-        try:
-            dashboard_builds = ctx.invoke(
-                builds,
-                giturl=c["data"]["kernel_revision"].get("url"),
-                branch=branch,
-                commit=commit,
-                count=True,
-                verbose=False,
-                arch=arch,
+
+def iter_builds_history(
+    ctx, checkouts, arch, raise_errors=False, workers=HISTORY_FETCH_WORKERS
+):
+    """Yield ``(checkout, row)`` for provided checkouts in checkout order.
+
+    Up to ``workers`` checkouts are fetched concurrently. ``row`` is None
+    when the dashboard builds of the checkout could not be retrieved."""
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        # Copy the context so per-call settings like the dashboard URL apply
+        futures = [
+            executor.submit(
+                contextvars.copy_context().run,
+                _get_checkout_builds,
+                ctx,
+                c,
+                arch,
+                raise_errors,
             )
-            builds_history.append([commit, maestro_builds, dashboard_builds])
-        except click.Abort:
-            if raise_errors:
-                raise
-            kci_msg_red(f"{branch}/{commit}: Aborted while fetching dashboard builds")
-        except click.ClickException as e:
-            if "No builds available" in e.message:
-                builds_history.append([commit, maestro_builds, []])
-                continue
-            if raise_errors:
-                raise
-            kci_msg_red(f"{branch}/{commit}: {e.message}")
-    return builds_history
+            for c in checkouts
+        ]
+        try:
+            for c, future in zip(checkouts, futures):
+                yield c, future.result()
+        finally:
+            for future in futures:
+                future.cancel()
+
+
+def get_builds_history(
+    ctx, checkouts, arch, raise_errors=False, workers=HISTORY_FETCH_WORKERS
+):
+    """Get builds from maestro and dashboard for provided checkouts
+
+    Up to ``workers`` checkouts are fetched concurrently, rows are returned
+    in checkout order"""
+    return [
+        row
+        for _, row in iter_builds_history(ctx, checkouts, arch, raise_errors, workers)
+        if row is not None
+    ]
@@ -0,0 +1,41 @@
+import json
+
+import click
+
+from .helper import merge_validation_reports
+
+
+@click.command(
+    name="merge",
+    help="""Merge JSON validation reports into a single report.
+
+Combines the --json reports of a validation run split with --shard i/N
+across several machines. All reports must come from the same subcommand
+and use the same --history, --origin, --days and --arch options.
+
+\b
+Examples:
+    kci-dev maestro validate builds --all-checkouts --json --shard 1/2 > shard1.json
+    kci-dev maestro validate builds --all-checkouts --json --shard 2/2 > shard2.json
+    kci-dev maestro validate merge shard1.json shard2.json
+    """,
+)
+@click.argument("reports", nargs=-1, required=True, type=click.File("r"))
+@click.option(
+    "--fail-on-mismatch",
+    is_flag=True,
+    default=False,
+    help="Exit with status 1 when the merged report has mismatches",
+)
+@click.pass_context
+def merge(ctx, reports, fail_on_mismatch):
+    loaded = []
+    for report in reports:
+        try:
+            loaded.append(json.load(report))
+        except json.JSONDecodeError as e:
+            raise click.ClickException(f"{report.name} is not a JSON report: {e}")
+    merged = merge_validation_reports(loaded)
+    click.echo(json.dumps(merged))
+    if fail_on_mismatch and not merged["summary"]["ok"]:
+        ctx.exit(1)
@@ -0,0 +1,293 @@
+import logging
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+import click
+
+from kcidev.libs.common import kci_err, kci_msg, kcidev_session
+from kcidev.libs.results import fetch_trees
+from kcidev.libs.shard import shard_option, shard_trees
+
+from .helper import (
+    checkpoint_key,
+    checkpoint_row,
+    get_checkout_stats,
+    load_checkpoint,
+    save_checkpoint_row,
+    validation_row_ok,
+)
+
+INTERVAL_UNITS = {"s": 1, "m": 60, "h": 3600}
+
+KINDS = ("builds", "boots")
+
+
+def parse_interval(ctx, param, value):
+    """Convert intervals like 90, 30s, 10m or 1h to seconds"""
+    unit = INTERVAL_UNITS.get(value[-1:], None)
+    number = value[:-1] if unit else value
+    try:
+        seconds = int(number) * (unit or 1)
+    except ValueError:
+        raise click.BadParameter(f"{value!r} is not an interval like 30s, 10m or 1h")
+    if seconds < 1:
+        raise click.BadParameter("interval must be at least one second")
+    return seconds
+
+
+def new_serve_state():
+    return {
+        "cycles": 0,
+        "errors": 0,
+        "cycle_duration": 0.0,
+        "revalidated": 0,
+        "rows": {kind: [] for kind in KINDS},
+        # host -> [total seconds, request count]
+        "latency": {},
+        "lock": threading.Lock(),
+    }
+
+
+def record_api_latency(state):
+    """Return a requests response hook accumulating latency per API host"""
+
+    def hook(response, *args, **kwargs):
+        host = urlparse(response.url).netloc
+        with state["lock"]:
+            total = state["latency"].setdefault(host, [0.0, 0])
+            total[0] += response.elapsed.total_seconds()
+            total[1] += 1
+
+    return hook
+
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"')
+
+
+def render_metrics(state):
+    """Render the daemon state in the Prometheus text exposition format"""
+    lines = [
+        "# HELP kcidev_validate_cycles_total Validation cycles completed.",
+        "# TYPE kcidev_validate_cycles_total counter",
+        f"kcidev_validate_cycles_total {state['cycles']}",
+        "# HELP kcidev_validate_cycle_errors_total Validation cycles that failed.",
+        "# TYPE kcidev_validate_cycle_errors_total counter",
+        f"kcidev_validate_cycle_errors_total {state['errors']}",
+        "# HELP kcidev_validate_cycle_duration_seconds Duration of the last cycle.",
+        "# TYPE kcidev_validate_cycle_duration_seconds gauge",
+        f"kcidev_validate_cycle_duration_seconds {state['cycle_duration']:.3f}",
+        "# HELP kcidev_validate_revalidated_checkouts Checkouts fetched in the last cycle.",
+        "# TYPE kcidev_validate_revalidated_checkouts gauge",
+        f"kcidev_validate_revalidated_checkouts {state['revalidated']}",
+    ]
+    per_tree = (
+        ("checkouts_failed", "Checkouts failing validation.", None),
+        ("missing_items", "Items missing on one side.", 5),
+        ("status_mismatches", "Items with a different status.", 6),
+    )
+    for name, help_text, column in per_tree:
+        lines.append(f"# HELP kcidev_validate_{name} {help_text}")
+        lines.append(f"# TYPE kcidev_validate_{name} gauge")
+        for kind in KINDS:
+            for row in state["rows"][kind]:
+                if column is None:
+                    value = int(not validation_row_ok(row))
+                else:
+                    value = len(row[column] or [])
+                labels = f'kind="{kind}",tree="{_label(row[0])}"'
+                lines.append(f"kcidev_validate_{name}{{{labels}}} {value}")
+    lines.append(
+        "# HELP kcidev_api_request_duration_seconds Time spent in API requests."
+    )
+    lines.append("# TYPE kcidev_api_request_duration_seconds summary")
+    with state["lock"]:
+        latency = dict(state["latency"])
+    for host, (total, count) in sorted(latency.items()):
+        labels = f'host="{_label(host)}"'
+        lines.append(f"kcidev_api_request_duration_seconds_sum{{{labels}}} {total:.3f}")
+        lines.append(f"kcidev_api_request_duration_seconds_count{{{labels}}} {count}")
+    return "\n".join(lines) + "\n"
+
+
+def write_metrics_file(path, state):
+    # Write and rename, so collectors never read a partial file
+    tmp_file = path + ".tmp"
+    with open(tmp_file, "w") as f:
+        f.write(render_metrics(state))
+    os.replace(tmp_file, path)
+
+
+def start_metrics_server(port, state):
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] not in ("/", "/metrics"):
+                self.send_error(404)
+                return
+            body = render_metrics(state).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            logging.debug(f"metrics: {format % args}")
+
+    server = ThreadingHTTPServer(("127.0.0.1", port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    logging.info(f"Serving metrics on http://127.0.0.1:{server.server_port}/metrics")
+    return server
+
+
+def run_cycle(ctx, state, checkpoint, origin, days, arch, shard):
+    """Validate the checkouts of the current tree list.
+
+    Checkouts that validated fine in a previous cycle once they were settled
+    are not fetched again. New checkouts, the ones which failed and those
+    still collecting results (see checkout_settled()) are validated. Rows of
+    checkouts that left the tree list are dropped from the warm state."""
+    trees_list = shard_trees(fetch_trees(origin, days), shard)
+    rows = {kind: [] for kind in KINDS}
+    current = set()
+    revalidated = 0
+    for tree in trees_list:
+        giturl = tree["git_repository_url"]
+        branch = tree["git_repository_branch"]
+        commit = tree["git_commit_hash"]
+        tree_name = tree["tree_name"]
+        tree_branch = f"{tree_name}/{branch}"
+        stats = {
+            kind: checkpoint_row(checkpoint, kind, tree_branch, commit)
+            for kind in KINDS
+        }
+        if not all(stats.values()):
+            revalidated += 1
+            stats = get_checkout_stats(
+                ctx, giturl, branch, commit, tree_name, False, arch
+            )
+        for kind, row in stats.items():
+            save_checkpoint_row(checkpoint, kind, row, tree.get("start_time"))
+            current.add(checkpoint_key(kind, tree_branch, commit))
+            if row:
+                rows[kind].append(row)
+    checkpoint["rows"] = {
+        key: row for key, row in checkpoint["rows"].items() if key in current
+    }
+    state["rows"] = rows
+    state["revalidated"] = revalidated
+
+
+@click.command(
+    name="serve",
+    help="""Continuously validate build and boot results with maestro.
+
+Runs the validation of all checkouts every --interval, keeping the
+validated checkouts in memory so each cycle only fetches new checkouts,
+recent ones still collecting results and those that failed validation
+before. Metrics in the Prometheus text
+format are written to --metrics-file and/or served on --metrics-port.
+
+\b
+Examples:
+    kci-dev maestro validate serve --interval 10m --metrics-port 9464
+    kci-dev maestro validate serve --interval 1h --metrics-file /var/lib/node_exporter/kci-dev.prom
+    """,
+)
+@click.option(
+    "--interval",
+    default="10m",
+    callback=parse_interval,
+    help="Time between validation cycles, e.g. 30s, 10m, 1h (default: 10m)",
+)
+@click.option(
+    "--days",
+    help="Provide a period of time in days to get results for",
+    type=int,
+    default="7",
+)
+@click.option(
+    "--origin",
+    help="Select KCIDB origin",
+    default="maestro",
+)
+@click.option("--arch", help="Filter by arch")
+@click.option(
+    "--metrics-file",
+    help="Write Prometheus metrics to this file after each cycle",
+)
+@click.option(
+    "--metrics-port",
+    type=int,
+    help="Serve Prometheus metrics on this local port",
+)
+@click.option(
+    "--state-file",
+    help="Keep validated checkouts in this file across restarts",
+)
+@click.option(
+    "--cycles",
+    type=int,
+    default=0,
+    help="Stop after this many cycles (default: run forever)",
+)
+@shard_option
+@click.pass_context
+def serve(
+    ctx,
+    interval,
+    days,
+    origin,
+    arch,
+    metrics_file,
+    metrics_port,
+    state_file,
+    cycles,
+    shard,
+):
+    if not (metrics_file or metrics_port is not None):
+        raise click.UsageError("Provide --metrics-file or --metrics-port")
+    state = new_serve_state()
+    checkpoint = {"file": None, "rows": {}}
+    if state_file:
+        checkpoint = load_checkpoint(
+            state_file, True, {"origin": origin, "arch": arch, "days": days}
+        )
+    hook = record_api_latency(state)
+    kcidev_session.hooks["response"].append(hook)
+    server = None
+    if metrics_port is not None:
+        server = start_metrics_server(metrics_port, state)
+    try:
+        while True:
+            start = time.monotonic()
+            try:
+                run_cycle(ctx, state, checkpoint, origin, days, arch, shard)
+                state["cycles"] += 1
+            except (click.ClickException, click.Abort) as e:
+                state["errors"] += 1
+                kci_err(f"Validation cycle failed: {getattr(e, 'message', e)}")
+            state["cycle_duration"] = time.monotonic() - start
+            failing = sum(
+                not validation_row_ok(row)
+                for rows in state["rows"].values()
+                for row in rows
+            )
+            kci_msg(
+                f"Cycle {state['cycles'] + state['errors']}: "
+                f"{state['revalidated']} checkouts validated, {failing} failing "
+                f"({state['cycle_duration']:.1f}s)"
+            )
+            if metrics_file:
+                write_metrics_file(metrics_file, state)
+            if cycles and state["cycles"] + state["errors"] >= cycles:
+                break
+            time.sleep(max(0, interval - state["cycle_duration"]))
+    finally:
+        kcidev_session.hooks["response"].remove(hook)
+        if server:
+            server.shutdown()
+            server.server_close()
@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Bisect several regressions of a tree at the same time.
+
+Each regression of the regressions file is bisected in its own git worktree
+of the shared workdir, <workdir>/.bisect/<name>, with the bisect state file
+in it. All the worktrees use the object store of the workdir.
+"""
+
+import logging
+import os
+import time
+
+import click
+
+from kcidev.libs.common import *
+from kcidev.subcommands.bisect import (
+    MAESTRO_RETRY_BASE_DELAY,
+    MAESTRO_RETRY_LIMIT,
+    bisect_maestro,
+    close_bisect_maestro,
+    init_bisect,
+    is_partial_clone,
+    load_state,
+    mark_bisect_step,
+    new_state,
+    run_bisect_batch,
+    save_state,
+    update_tree,
+)
+
+REGRESSION_KEYS = ("name", "good", "bad", "job_filter", "platform_filter", "test")
+
+
+def load_regressions(file):
+    import yaml
+
+    try:
+        with open(file, "r") as f:
+            regressions = yaml.safe_load(f)
+    except (OSError, yaml.YAMLError) as e:
+        raise click.ClickException(f"Could not read regressions file {file}: {e}")
+    if not isinstance(regressions, list) or not regressions:
+        raise click.ClickException(f"{file} must contain a list of regressions")
+    names = set()
+    for regression in regressions:
+        missing = [key for key in REGRESSION_KEYS if not regression.get(key)]
+        if missing:
+            raise click.ClickException(
+                f"Regression {regression.get('name', '?')} misses {', '.join(missing)}"
+            )
+        name = str(regression["name"])
+        if name in names or os.sep in name or name.startswith("."):
+            raise click.ClickException(f"Invalid or duplicate regression name {name}")
+        names.add(name)
+        for key in ("job_filter", "platform_filter", "paths"):
+            if isinstance(regression.get(key), str):
+                regression[key] = [regression[key]]
+    return regressions
+
+
+def regression_worktree(workdir, name):
+    return os.path.join(workdir, ".bisect", name)
+
+
+def setup_bisection(repo, workdir, regression, giturl, branch, retry_fail, fresh):
+    """
+    Return the bisection of a regression, creating its worktree and starting
+    git bisect in it unless a saved state is resumed.
+    """
+    from git import Repo
+
+    path = regression_worktree(workdir, regression["name"])
+    state_file = os.path.join(path, "state.json")
+    state = None if fresh else load_state(state_file)
+    if state is None:
+        state = new_state()
+        state.update(
+            {
+                "giturl": giturl,
+                "branch": branch,
+                "good": regression["good"],
+                "bad": regression["bad"],
+                "retry_fail": retry_fail,
+                "job_filter": regression["job_filter"],
+                "platform_filter": regression["platform_filter"],
+                "test": regression["test"],
+                "paths": regression.get("paths") or [],
+                "workdir": path,
+            }
+        )
+    if not os.path.exists(path):
+        logging.info(f"Adding worktree {path}")
+        repo.git.worktree("prune")
+        options = ["--detach"]
+        if is_partial_clone(repo):
+            options.append("--no-checkout")
+        repo.git.worktree("add", *options, os.path.abspath(path), state["bad"])
+    if not state["bisect_init"]:
+        state["next_commit"] = init_bisect(Repo(path), state)
+        state["bisect_init"] = True
+        save_state(state, state_file)
+    return {
+        "name": regression["name"],
+        "state": state,
+        "state_file": state_file,
+        # Consecutive Maestro errors and test failure retries of next_commit
+        "errors": 0,
+        "retries": 0,
+    }
+
+
+def bisection_active(bisection):
+    state = bisection["state"]
+    return (
+        not state["first_bad"]
+        and state["next_commit"] is not None
+        and bisection["errors"] < MAESTRO_RETRY_LIMIT
+    )
+
+
+def advance_bisection(bisection, step):
+    """Record the result of the step of a bisection and mark it if final"""
+    state = bisection["state"]
+    name = bisection["name"]
+    state.setdefault("steps", []).append(step)
+    if step["code"] == 3:
+        bisection["errors"] += 1
+        kci_err(
+            f"{name}: Maestro failed to execute the test "
+            f"({bisection['errors']}/{MAESTRO_RETRY_LIMIT})"
+        )
+    elif (
+        step["code"] == 1
+        and not step.get("reused")
+        and bisection["retries"] < state.get("retry_fail", 0)
+    ):
+        bisection["retries"] += 1
+        click.secho(
+            f"{name}: test failed on {step['commit']}; retrying "
+            f"({bisection['retries']}/{state['retry_fail']})",
+            fg="yellow",
+        )
+    else:
+        bisection["errors"] = 0
+        bisection["retries"] = 0
+        olddir = os.getcwd()
+        try:
+            os.chdir(state["workdir"])
+            mark_bisect_step(state, step)
+        finally:
+            os.chdir(olddir)
+        if state["first_bad"]:
+            click.secho(
+                f"{name}: bisection complete. First bad commit: {state['first_bad']}",
+                fg="green",
+            )
+    save_state(state, bisection["state_file"])
+
+
+def run_bisections(maestro, bisections):
+    """
+    Run rounds testing the next commit of every active bisection at once,
+    with a single watch of all their trees, until they are all done.
+    """
+    while True:
+        active = [b for b in bisections if bisection_active(b)]
+        if not active:
+            return
+        click.secho(f"Bisection round: {len(active)} regressions", fg="green")
+        steps = run_bisect_batch(
+            maestro, [(b["state"], b["state"]["next_commit"]) for b in active]
+        )
+        for bisection, step in zip(active, steps):
+            advance_bisection(bisection, step)
+        errors = [b["errors"] for b in active if b["errors"]]
+        if len(errors) == len(active):
+            # Maestro failed for all of them, give it some time
+            time.sleep(MAESTRO_RETRY_BASE_DELAY ** max(errors))
+
+
+def print_bisections(bisections):
+    for bisection in bisections:
+        state = bisection["state"]
+        if state["first_bad"]:
+            result = f"first bad commit {state['first_bad']}"
+        elif bisection["errors"] >= MAESTRO_RETRY_LIMIT:
+            result = "stopped after repeated Maestro errors"
+        else:
+            result = "no commit left to test"
+        kci_msg(f"{bisection['name']}: {result} ({len(state['history'])} tested)")
+
+
+@click.command(
+    help="""Bisect several regressions of a tree at the same time.
+
+Each regression of the --regressions YAML file is bisected in its own git
+worktree of --workdir, sharing one object store. Every round checks out the
+next commit of all unfinished bisections and watches them with a single
+Maestro watcher. The state of each bisection is saved in its worktree, so
+running the command again resumes them.
+
+\b
+Regressions file example:
+  - name: gpu-login
+    good: v6.6
+    bad: v6.7
+    job_filter: [kbuild-gcc-12-x86, baseline-x86]
+    platform_filter: [qemu-x86]
+    test: baseline.login
+    paths: [drivers/gpu]
+
+\b
+Example:
+  kci-dev multibisect --giturl https://git.kernel.org/torvalds/linux.git \\
+                      --branch master --regressions regressions.yaml
+"""
+)
+@click.option(
+    "--giturl", required=True, help="Git repository URL containing the kernel source"
+)
+@click.option("--branch", required=True, help="Git branch to bisect on")
+@click.option(
+    "--regressions",
+    required=True,
+    type=click.Path(exists=True, dir_okay=False),
+    help="YAML file listing the regressions to bisect",
+)
+@click.option(
+    "--retry-fail",
+    help="Number of times to retry failed tests",
+    default=2,
+    type=click.IntRange(min=0),
+    show_default=True,
+)
+@click.option(
+    "--workdir",
+    help="Local directory for the shared kernel source clone",
+    default="kcidev-src",
+    show_default=True,
+    type=click.Path(),
+)
+@click.option(
+    "--blobless/--full-clone",
+    default=True,
+    show_default=True,
+    help="Clone the workdir without file contents or a checked out tree",
+)
+@click.option(
+    "--reference",
+    help="Borrow git objects from this local repository. It is created as a "
+    "shared object cache for all workdirs when it does not exist",
+    type=click.Path(),
+)
+@click.option(
+    "--ignore-state",
+    help="Ignore saved states and start fresh bisections",
+    is_flag=True,
+)
+@click.option(
+    "--events",
+    is_flag=True,
+    help="Follow Maestro node events instead of polling at fixed intervals",
+)
+@click.option(
+    "--reuse/--no-reuse",
+    default=True,
+    show_default=True,
+    help="Use conclusive existing dashboard and Maestro results, or a running "
+    "checkout, of a commit instead of testing it again",
+)
+@click.pass_context
+def multibisect(
+    ctx,
+    giturl,
+    branch,
+    regressions,
+    retry_fail,
+    workdir,
+    blobless,
+    reference,
+    ignore_state,
+    events,
+    reuse,
+):
+    config = ctx.obj.get("CFG")
+    instance = ctx.obj.get("INSTANCE")
+    regressions = load_regressions(regressions)
+    logging.info(f"Bisecting {len(regressions)} regressions of {giturl} {branch}")
+
+    repo = update_tree(workdir, branch, giturl, True, blobless, reference)
+    bisections = [
+        setup_bisection(
+            repo, workdir, regression, giturl, branch, retry_fail, ignore_state
+        )
+        for regression in regressions
+    ]
+    maestro = bisect_maestro(config, instance, events, reuse)
+    try:
+        run_bisections(maestro, bisections)
+    finally:
+        close_bisect_maestro(maestro)
+    print_bisections(bisections)
+    if any(not b["state"]["first_bad"] for b in bisections):
+        raise click.ClickException("Some bisections did not complete.")
+
+
+if __name__ == "__main__":
+    main_kcidev()
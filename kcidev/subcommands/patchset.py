@@ -104,8 +104,15 @@ Examples:
     "--test",
     help="Watch for specific test result and set exit code accordingly (requires --watch)",
 )
+@click.option(
+    "--events",
+    is_flag=True,
+    help="Follow Maestro node events instead of polling at fixed intervals",
+)
 @click.pass_context
-def patchset(ctx, nodeid, patch, patchurl, job_filter, platform_filter, watch, test):
+def patchset(
+    ctx, nodeid, patch, patchurl, job_filter, platform_filter, watch, test, events
+):
     logging.info(f"Starting patchset command for node: {nodeid}")
     logging.debug(f"Patches: {patch}, patch URLs: {patchurl}")
     logging.debug(
@@ -121,6 +128,8 @@ def patchset(ctx, nodeid, patch, patchurl, job_filter, platform_filter, watch, t
         raise click.UsageError("No job filter defined. Can't watch for a job(s)!")
     if test and not watch:
         raise click.UsageError("Test option only works with watch option")
+    if events and not watch:
+        raise click.UsageError("Events option only works with watch option")
 
     cfg = ctx.obj.get("CFG")
     instance = ctx.obj.get("INSTANCE")
@@ -174,5 +183,11 @@ def patchset(ctx, nodeid, patch, patchurl, job_filter, platform_filter, watch, t
         if test:
             click.secho(f"Watching for test result: {test}", fg="green")
         maestro_watch_jobs(
-            apiurl, token, treeid, job_filter, test, root_node="patchset"
+            apiurl,
+            token,
+            treeid,
+            job_filter,
+            test,
+            root_node="patchset",
+            events=events,
         )
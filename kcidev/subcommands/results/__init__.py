@@ -4,15 +4,12 @@ import sys
 from functools import wraps
 
 import click
-from tabulate import tabulate
 
 from kcidev.libs.common import kci_msg, kci_msg_green, kci_msg_json, kci_msg_red
 from kcidev.libs.dashboard import (
     dashboard_fetch_boot_issues,
-    dashboard_fetch_boots,
     dashboard_fetch_build,
     dashboard_fetch_build_issues,
-    dashboard_fetch_builds,
     dashboard_fetch_commits_history,
     dashboard_fetch_issue,
     dashboard_fetch_issue_builds,
@@ -21,10 +18,11 @@ from kcidev.libs.dashboard import (
     dashboard_fetch_issues_extra,
     dashboard_fetch_summary,
     dashboard_fetch_test,
-    dashboard_fetch_tests,
     dashboard_fetch_tree_report,
 )
 from kcidev.libs.git_repo import get_tree_name, set_giturl_branch_commit
+from kcidev.libs.results import fetch_boots, fetch_builds, fetch_tests, fetch_trees
+from kcidev.libs.shard import shard_option, shard_trees
 from kcidev.subcommands.results.hardware import hardware
 from kcidev.subcommands.results.options import (
     builds_and_tests_options,
@@ -33,18 +31,20 @@ from kcidev.subcommands.results.options import (
     single_build_and_test_options,
 )
 from kcidev.subcommands.results.parser import (
-    cmd_builds,
     cmd_commits_history,
     cmd_compare,
     cmd_list_trees,
     cmd_single_build,
     cmd_single_test,
     cmd_summary,
-    cmd_tests,
     cmd_tree_report,
+    parse_filter_file,
+    print_builds,
     print_issue,
     print_issues,
     print_missing_data,
+    print_no_inconclusive_builds,
+    print_tests,
 )
 
 
@@ -170,7 +170,10 @@ def builds(
     giturl, branch, commit = set_giturl_branch_commit(
         origin, giturl, branch, commit, latest, git_folder
     )
-    data = dashboard_fetch_builds(
+    if status == "inconclusive":
+        print_no_inconclusive_builds(use_json)
+        return
+    data = fetch_builds(
         origin,
         giturl,
         branch,
@@ -179,21 +182,14 @@ def builds(
         tree,
         start_date,
         end_date,
-        use_json,
-        error_verbose,
-    )
-    return cmd_builds(
-        data,
-        commit,
-        download_logs,
         status,
         compiler,
         config,
         git_branch,
-        count,
         use_json,
-        verbose,
+        error_verbose,
     )
+    return print_builds(data, commit, download_logs, count, use_json, verbose)
 
 
 @results.command()
@@ -246,7 +242,7 @@ def boots(
     giturl, branch, commit = set_giturl_branch_commit(
         origin, giturl, branch, commit, latest, git_folder
     )
-    data = dashboard_fetch_boots(
+    data = fetch_boots(
         origin,
         giturl,
         branch,
@@ -255,30 +251,21 @@ def boots(
         tree,
         start_date,
         end_date,
-        use_json,
         boot_origin,
-        error_verbose,
-    )
-    return cmd_tests(
-        data["boots"],
-        commit,
-        download_logs,
-        status,
-        filter,
-        start_date,
-        end_date,
-        compiler,
-        config,
-        hardware,
-        test_path,
-        git_branch,
-        compatible,
-        min_duration,
-        max_duration,
-        count,
         use_json,
-        verbose,
+        error_verbose,
+        status=status,
+        compiler=compiler,
+        config=config,
+        hardware=hardware,
+        test_path=test_path,
+        git_branch=git_branch,
+        compatible=compatible,
+        min_duration=min_duration,
+        max_duration=max_duration,
+        filter_data=parse_filter_file(filter),
     )
+    return print_tests(data, commit, download_logs, count, use_json, verbose)
 
 
 @results.command()
@@ -313,28 +300,28 @@ def tests(
     giturl, branch, commit = set_giturl_branch_commit(
         origin, giturl, branch, commit, latest, git_folder
     )
-    data = dashboard_fetch_tests(
-        origin, giturl, branch, commit, arch, tree, start_date, end_date, use_json
-    )
-    cmd_tests(
-        data["tests"],
+    data = fetch_tests(
+        origin,
+        giturl,
+        branch,
         commit,
-        download_logs,
-        status,
-        filter,
+        arch,
+        tree,
         start_date,
         end_date,
-        compiler,
-        config,
-        hardware,
-        test_path,
-        git_branch,
-        compatible,
-        min_duration,
-        max_duration,
-        count,
         use_json,
+        status=status,
+        compiler=compiler,
+        config=config,
+        hardware=hardware,
+        test_path=test_path,
+        git_branch=git_branch,
+        compatible=compatible,
+        min_duration=min_duration,
+        max_duration=max_duration,
+        filter_data=parse_filter_file(filter),
     )
+    print_tests(data, commit, download_logs, count, use_json)
 
 
 @results.command()
@@ -415,30 +402,20 @@ def compare(origin, giturl, branch, latest, commits, use_json):
         raise click.Abort()
 
 
-def get_issues(ctx, origin, item_type, giturl, branch, commit, tree_name, arch):
+def get_issues(origin, item_type, giturl, branch, commit, tree_name, arch):
     """Get KCIDB issues for builds/boots"""
     try:
         if item_type == "builds":
-            results_cmd = builds
+            fetch_items = fetch_builds
             dashboard_func = dashboard_fetch_build_issues
         elif item_type == "boots":
-            results_cmd = boots
+            fetch_items = fetch_boots
             dashboard_func = dashboard_fetch_boot_issues
         else:
             kci_msg_red("Please specify 'builds' or 'boots' as items type")
             return []
 
-        dashboard_items = ctx.invoke(
-            results_cmd,
-            origin=origin,
-            giturl=giturl,
-            branch=branch,
-            commit=commit,
-            status="all",
-            count=True,
-            verbose=False,
-            arch=arch,
-        )
+        dashboard_items = fetch_items(origin, giturl, branch, commit, arch=arch)
         final_stats = []
         for item in dashboard_items:
             # Exclude passed builds/boots
@@ -493,6 +470,8 @@ def get_issues_for_specific_item(item_type, item_id):
 
 def print_stats(data, headers, max_col_width, table_fmt):
     """Print build statistics in tabular format"""
+    from tabulate import tabulate
+
     print("Creating a stats report...")
     print(
         tabulate(data, headers=headers, maxcolwidths=max_col_width, tablefmt=table_fmt)
@@ -626,9 +605,8 @@ Examples:
     is_flag=True,
     help="Select latest results available",
 )
-@click.pass_context
+@shard_option
 def detect(
-    ctx,
     origin,
     builds,
     boots,
@@ -642,17 +620,20 @@ def detect(
     commit,
     latest,
     git_folder,
+    shard,
 ):
 
     if not (builds or boots or new):
         raise click.UsageError(
             "Provide --builds or --boots or --new to fetch issues for"
         )
+    if shard and not all_checkouts:
+        raise click.UsageError("--shard only works with --all-checkouts")
 
     if new:
         if all_checkouts:
             print("Fetching new issues for all checkouts...")
-            trees_list = ctx.invoke(trees, origin=origin, days=days, verbose=False)
+            trees_list = shard_trees(fetch_trees(origin, days), shard)
             for tree in trees_list:
                 giturl = tree["git_repository_url"]
                 branch = tree["git_repository_branch"]
@@ -682,14 +663,14 @@ def detect(
         if item_id:
             raise click.UsageError("Cannot use --all-checkouts with --id")
         final_stats = []
-        trees_list = ctx.invoke(trees, origin=origin, days=days, verbose=False)
+        trees_list = shard_trees(fetch_trees(origin, days), shard)
         for tree in trees_list:
             giturl = tree["git_repository_url"]
             branch = tree["git_repository_branch"]
             commit = tree["git_commit_hash"]
             tree_name = tree["tree_name"]
             stats = get_issues(
-                ctx, origin, item_type, giturl, branch, commit, tree_name, arch
+                origin, item_type, giturl, branch, commit, tree_name, arch
             )
             final_stats.extend(stats)
         if final_stats:
@@ -714,33 +695,22 @@ def detect(
             print_stats(stats, headers, max_col_width, table_fmt)
 
 
-def get_missing_issue_items(
-    ctx, origin, item_type, giturl, branch, commit, tree_name, arch
-):
+def get_missing_issue_items(origin, item_type, giturl, branch, commit, tree_name, arch):
     """Get information of failed or inconclusive builds/boots for which KCIDB
     issues don't exist"""
     try:
         if item_type == "builds":
-            results_cmd = builds
+            fetch_items = fetch_builds
             dashboard_func = dashboard_fetch_build_issues
         elif item_type == "boots":
-            results_cmd = boots
+            fetch_items = fetch_boots
             dashboard_func = dashboard_fetch_boot_issues
         else:
             kci_msg_red("Please specify 'builds' or 'boots' as items type")
             return []
 
-        dashboard_items = ctx.invoke(
-            results_cmd,
-            origin=origin,
-            giturl=giturl,
-            branch=branch,
-            commit=commit,
-            status="all",
-            count=True,
-            verbose=False,
-            arch=arch,
-            error_verbose=False,
+        dashboard_items = fetch_items(
+            origin, giturl, branch, commit, arch=arch, error_verbose=False
         )
 
         missing_ids = []
@@ -886,10 +856,9 @@ Examples:
 )
 @click.option("--arch", help="Filter by arch")
 @click.option("--tree", help="Filter by tree name")
-@click.pass_context
+@shard_option
 @results_display_options
 def issues(
-    ctx,
     origin,
     days,
     new,
@@ -904,8 +873,14 @@ def issues(
     missing,
     builds,
     boots,
+    shard,
 ):
     """Issues command handler"""
+    if shard and (any([giturl, branch, commit]) or not (new or missing)):
+        raise click.UsageError(
+            "--shard only works with --new or --missing for all the checkouts, "
+            "without --giturl, --branch and --commit"
+        )
     if not new and not missing:
         if not any([giturl, branch, commit]):
             data = dashboard_fetch_issue_list(origin, days, use_json)
@@ -924,7 +899,7 @@ def issues(
     if new:
         if not any([giturl, branch, commit]):
             kci_msg("Fetching new issues for all checkouts...")
-            trees_list = ctx.invoke(trees, origin=origin, days=days, verbose=False)
+            trees_list = shard_trees(fetch_trees(origin, days), shard)
             for t in trees_list:
                 giturl = t["git_repository_url"]
                 branch = t["git_repository_branch"]
@@ -963,7 +938,7 @@ def issues(
                 kci_msg("")
                 kci_msg_green(f"Fetching data for {item_type}...")
                 stats = get_missing_issue_items(
-                    ctx, origin, item_type, giturl, branch, commit, tree, arch
+                    origin, item_type, giturl, branch, commit, tree, arch
                 )
                 if stats:
                     final_stats.append(stats)
@@ -971,7 +946,7 @@ def issues(
                     print_missing_data(item_type, final_stats)
 
         else:
-            trees_list = ctx.invoke(trees, origin=origin, days=days, verbose=False)
+            trees_list = shard_trees(fetch_trees(origin, days), shard)
             for item_type in item_types:
                 kci_msg("")
                 kci_msg_green(f"Fetching data for {item_type}...")
@@ -982,7 +957,7 @@ def issues(
                     commit = tree["git_commit_hash"]
                     tree_name = tree["tree_name"]
                     stats = get_missing_issue_items(
-                        ctx, origin, item_type, giturl, branch, commit, tree_name, arch
+                        origin, item_type, giturl, branch, commit, tree_name, arch
                     )
                     if stats:
                         final_stats.append(stats)
@@ -5,24 +5,11 @@ import re
 from urllib.parse import urlparse
 
 import requests
-import yaml
 
 from kcidev.libs.common import *
-from kcidev.libs.dashboard import dashboard_fetch_tree_list, get_dashboard_url
+from kcidev.libs.dashboard import get_dashboard_url
 from kcidev.libs.files import download_logs_to_file
-from kcidev.libs.filters import (
-    CompatibleFilter,
-    CompilerFilter,
-    ConfigFilter,
-    DateRangeFilter,
-    DurationFilter,
-    FilterSet,
-    GitBranchFilter,
-    HardwareFilter,
-    PathFilter,
-    StatusFilter,
-)
-from kcidev.libs.job_filters import HardwareRegexFilter, TestRegexFilter, TreeFilter
+from kcidev.libs.results import fetch_trees, filter_builds, filter_tests
 
 
 def print_summary(type, n_pass, n_fail, n_inconclusive):
@@ -162,7 +149,7 @@ def get_command_summary(command_data):
 
 def cmd_list_trees(origin, use_json, days, verbose):
     logging.info(f"Listing trees for origin: {origin}")
-    trees = dashboard_fetch_tree_list(origin, use_json, days)
+    trees = fetch_trees(origin, days, use_json)
     logging.debug(f"Found {len(trees)} trees")
     if use_json:
         kci_msg(json.dumps(list(map(lambda t: create_tree_json(t), trees))))
@@ -196,32 +183,28 @@ def cmd_builds(
         f"Processing builds with filters - status: {status}, compiler: {compiler}, config: {config}, branch: {git_branch}"
     )
 
-    if status == "inconclusive" and use_json:
-        kci_msg('{"message":"No information about inconclusive builds."}')
-        return
-    elif status == "inconclusive":
-        kci_msg("No information about inconclusive builds.")
+    if status == "inconclusive":
+        print_no_inconclusive_builds(use_json)
         return
 
-    # Create filter set for builds
-    filter_set = FilterSet()
-    filter_set.add_filter(StatusFilter(status))
-    filter_set.add_filter(CompilerFilter(compiler))
-    filter_set.add_filter(ConfigFilter(config))
-    filter_set.add_filter(GitBranchFilter(git_branch))
+    filtered_builds_list = filter_builds(
+        data["builds"], status, compiler, config, git_branch
+    )
+    print_builds(filtered_builds_list, commit, download_logs, count, use_json, verbose)
+    return filtered_builds_list
 
-    logging.debug(f"Created filter set with {len(filter_set.filters)} filters")
 
-    filtered_builds = 0
-    filtered_builds_list = []
-    builds = []
-    total_builds = len(data["builds"])
-    logging.debug(f"Processing {total_builds} builds")
+def print_no_inconclusive_builds(use_json):
+    if use_json:
+        kci_msg('{"message":"No information about inconclusive builds."}')
+    else:
+        kci_msg("No information about inconclusive builds.")
 
-    for build in data["builds"]:
-        if not filter_set.matches(build):
-            continue
-        filtered_builds_list.append(build)
+
+def print_builds(builds, commit, download_logs, count, use_json, verbose=True):
+    """Print already filtered builds, or their count"""
+    builds_json = []
+    for build in builds:
         log_path = build["log_url"]
         if download_logs:
             try:
@@ -233,20 +216,19 @@ def cmd_builds(
                 kci_err(f"Failed to fetch log {build['log_url']}.")
                 pass
         if count:
-            filtered_builds += 1
+            continue
         elif use_json:
-            builds.append(create_build_json(build, log_path))
+            builds_json.append(create_build_json(build, log_path))
         else:
             print_build(build, log_path)
-    logging.info(f"Filtered {filtered_builds} builds from {total_builds} total")
 
     if count and use_json:
-        kci_msg(f'{{"count":{filtered_builds}}}')
+        kci_msg(f'{{"count":{len(builds)}}}')
     elif count and verbose:
-        kci_msg(filtered_builds)
+        kci_msg(len(builds))
     elif use_json:
-        kci_msg(json.dumps(builds))
-    return filtered_builds_list
+        kci_msg(json.dumps(builds_json))
+    return builds
 
 
 def print_build(build, log_path):
@@ -285,6 +267,7 @@ def filter_array2regex(filter_array):
 def parse_filter_file(filter):
     if not filter:
         return None
+    import yaml
 
     logging.debug("Parsing filter file")
     try:
@@ -339,37 +322,29 @@ def cmd_tests(
         f"Date range: {start_date} to {end_date}, duration: {min_duration}-{max_duration}s"
     )
 
-    # Create filter set for tests
-    filter_set = FilterSet()
-    filter_set.add_filter(StatusFilter(status_filter))
-    filter_set.add_filter(DateRangeFilter(start_date, end_date))
-    filter_set.add_filter(CompilerFilter(compiler))
-    filter_set.add_filter(ConfigFilter(config))
-    filter_set.add_filter(HardwareFilter(hardware))
-    filter_set.add_filter(PathFilter(test_path))
-    filter_set.add_filter(GitBranchFilter(git_branch))
-    filter_set.add_filter(CompatibleFilter(compatible))
-    filter_set.add_filter(DurationFilter(min_duration, max_duration))
-
-    # Parse YAML filter file if provided
-    filter_data = parse_filter_file(filter)
-    if filter_data:
-        if "hardware" in filter_data:
-            filter_set.add_filter(HardwareRegexFilter(filter_data["hardware"]))
-        if "test" in filter_data:
-            filter_set.add_filter(TestRegexFilter(filter_data["test"]))
-        if "tree" in filter_data:
-            filter_set.add_filter(TreeFilter(filter_data["tree"]))
-
-    filtered_tests = 0
-    tests = []
-    total_tests = len(data)
-    logging.debug(f"Processing {total_tests} tests")
-
-    for test in data:
-        if not filter_set.matches(test):
-            continue
+    tests = filter_tests(
+        data,
+        status=status_filter,
+        start_date=start_date,
+        end_date=end_date,
+        compiler=compiler,
+        config=config,
+        hardware=hardware,
+        test_path=test_path,
+        git_branch=git_branch,
+        compatible=compatible,
+        min_duration=min_duration,
+        max_duration=max_duration,
+        filter_data=parse_filter_file(filter),
+    )
+    print_tests(tests, id, download_logs, count, use_json, verbose)
+    return data
+
 
+def print_tests(tests, id, download_logs, count, use_json, verbose=True):
+    """Print already filtered boots or tests, or their count"""
+    tests_json = []
+    for test in tests:
         log_path = test["log_url"]
         if download_logs:
             platform = (
@@ -384,20 +359,19 @@ def cmd_tests(
             except Exception as e:
                 logging.error(f"Failed to download log for test {test['id']}: {e}")
         if count:
-            filtered_tests += 1
+            continue
         elif use_json:
-            tests.append(create_test_json(test, log_path))
+            tests_json.append(create_test_json(test, log_path))
         else:
             print_test(test, log_path)
-    logging.info(f"Filtered {filtered_tests} tests from {total_tests} total")
 
     if count and use_json:
-        kci_msg(f'{{"count":{filtered_tests}}}')
+        kci_msg(f'{{"count":{len(tests)}}}')
     elif count and verbose:
-        kci_msg(filtered_tests)
+        kci_msg(len(tests))
     elif use_json:
-        kci_msg(json.dumps(tests))
-    return data
+        kci_msg(json.dumps(tests_json))
+    return tests
 
 
 def print_test(test, log_path):
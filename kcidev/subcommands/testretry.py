@@ -4,7 +4,6 @@
 import logging
 
 import click
-from git import Repo
 
 from kcidev.libs.common import *
 from kcidev.libs.maestro_common import *
@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+import json
 import logging
 
 import click
@@ -29,12 +30,24 @@ Examples:
   # Watch and return exit code based on specific test result
   kci-dev watch --nodeid 65a5c89f1234567890abcdef \\
                 --job-filter baseline --test baseline.login
+
+  # Watch several trees at once, printing JSON events
+  kci-dev watch --treeid <TREE_ID_A> --treeid <TREE_ID_B> \\
+                --job-filter baseline --test baseline.login
 """
 )
 @click.option(
     "--nodeid",
-    help="Node ID of the test run to watch (obtained from checkout or test results)",
-    required=True,
+    help=(
+        "Node ID of the test run to watch (obtained from checkout or test "
+        "results). Can be used multiple times"
+    ),
+    multiple=True,
+)
+@click.option(
+    "--treeid",
+    help="Tree ID of a checkout to watch. Can be used multiple times",
+    multiple=True,
 )
 @click.option(
     "--job-filter",
@@ -49,9 +62,16 @@ Examples:
     "--test",
     help="Watch for specific test result and set exit code (0=pass, 1=fail)",
 )
+@click.option(
+    "--events",
+    is_flag=True,
+    help="Follow Maestro node events instead of polling at fixed intervals",
+)
 @click.pass_context
-def watch(ctx, nodeid, job_filter, test):
-    logging.info(f"Starting watch command for node {nodeid}")
+def watch(ctx, nodeid, treeid, job_filter, test, events):
+    if not nodeid and not treeid:
+        raise click.UsageError("Provide --nodeid or --treeid to watch")
+    logging.info(f"Starting watch command for nodes {nodeid} and trees {treeid}")
     if job_filter:
         logging.debug(f"Job filters: {job_filter}")
     if test:
@@ -66,6 +86,42 @@ def watch(ctx, nodeid, job_filter, test):
     logging.debug(f"Using instance: {instance}")
     logging.debug(f"API URL: {apiurl}")
 
+    trees = {}
+    for node_id in nodeid:
+        tree_id, root_node = get_node_tree(apiurl, node_id)
+        trees[tree_id] = root_node
+    for tree_id in treeid:
+        trees.setdefault(tree_id, "checkout")
+
+    if len(trees) == 1 and not treeid:
+        tree_id, root_node = next(iter(trees.items()))
+        logging.info(f"Starting job watch for tree {tree_id}")
+        maestro_watch_jobs(
+            apiurl,
+            token,
+            tree_id,
+            job_filter,
+            test,
+            root_node=root_node,
+            events=events,
+        )
+        return
+
+    exit_codes = maestro_watch_trees(
+        apiurl,
+        token,
+        trees,
+        job_filter,
+        test,
+        on_event=lambda event: kci_msg(json.dumps(event)),
+        events=events,
+    )
+    kci_msg(json.dumps({"event": "summary", "exit_codes": exit_codes}))
+    sys.exit(max(exit_codes.values()))
+
+
+def get_node_tree(apiurl, nodeid):
+    """Return the tree ID and root node name of a Maestro node"""
     logging.info(f"Fetching node details for {nodeid}")
     node = maestro_get_node(apiurl, nodeid)
     if not node:
@@ -75,10 +131,8 @@ def watch(ctx, nodeid, job_filter, test):
 
     tree_id = node["treeid"]
     logging.info(f"Found node {nodeid} with tree ID: {tree_id}")
-    logging.info(f"Starting job watch for tree {tree_id}")
-
     root_node = "patchset" if node.get("name") == "patchset" else "checkout"
-    maestro_watch_jobs(apiurl, token, tree_id, job_filter, test, root_node=root_node)
+    return tree_id, root_node
 
 
 if __name__ == "__main__":
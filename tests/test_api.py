@@ -222,3 +222,31 @@ def test_trigger_patchset_failure_raises(monkeypatch):
     monkeypatch.setattr(maestro_common.kcidev_session, "post", post)
     with pytest.raises(KciDevError, match="patchset failed"):
         _client().trigger_patchset("0" * 24, patches=["patch content"])
+
+
+def test_iter_nodes_walks_all_pages(monkeypatch):
+    def get(url, headers, params, timeout):
+        offset = dict(params)["offset"]
+        response = Mock(status_code=200)
+        response.json.return_value = [{"id": f"n{i}"} for i in range(offset, 5)][:2]
+        return response
+
+    monkeypatch.setattr(maestro_common.kcidev_session, "get", Mock(side_effect=get))
+
+    nodes = list(_client().iter_nodes(filters=["kind=kbuild"], page_size=2))
+
+    assert [node["id"] for node in nodes] == ["n0", "n1", "n2", "n3", "n4"]
+
+
+def test_iter_nodes_http_error_raises_library_error(monkeypatch):
+    response = Mock(status_code=500, url="https://api.example.org/latest/nodes/fast")
+    response.json.return_value = {"detail": "boom"}
+    response.raise_for_status.side_effect = requests.exceptions.HTTPError(
+        response=response
+    )
+    monkeypatch.setattr(
+        maestro_common.kcidev_session, "get", Mock(return_value=response)
+    )
+
+    with pytest.raises(KciDevError, match="Maestro nodes request failed"):
+        list(_client().iter_nodes())
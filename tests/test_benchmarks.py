@@ -0,0 +1,71 @@
+import importlib.util
+import json
+import os
+
+from click.testing import CliRunner
+
+BENCH_PATH = os.path.join(os.path.dirname(__file__), "..", "benchmarks", "bench.py")
+
+
+def _bench():
+    spec = importlib.util.spec_from_file_location("bench", BENCH_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_throughput_benchmarks_save_json_results(tmp_path):
+    bench = _bench()
+    output = tmp_path / "results.json"
+
+    result = CliRunner().invoke(
+        bench.main,
+        ["--only", "throughput", "--sizes", "200", "--repeat", "1"]
+        + ["--output", str(output)],
+    )
+
+    assert result.exit_code == 0, result.output
+    report = json.loads(output.read_text())
+    assert {r["name"] for r in report["results"]} == {
+        "throughput.filterset",
+        "throughput.cmd_tests",
+        "throughput.cmd_compare",
+        "throughput.validate_reconcile",
+    }
+    assert all(r["size"] == 200 and r["seconds"] > 0 for r in report["results"])
+
+
+def test_results_benchmarks_run_against_dashboard_stub(tmp_path):
+    bench = _bench()
+    output = tmp_path / "results.json"
+
+    result = CliRunner().invoke(
+        bench.main, ["--only", "results", "--repeat", "1", "--output", str(output)]
+    )
+
+    assert result.exit_code == 0, result.output
+    names = [r["name"] for r in json.loads(output.read_text())["results"]]
+    assert names == ["results.summary", "results.builds", "results.tests"]
+
+
+def test_compare_results_reports_slowdowns_over_threshold():
+    bench = _bench()
+    baseline = {
+        "results": [
+            {"name": "startup.bisect", "seconds": 0.2},
+            {"name": "throughput.filterset", "size": 10, "seconds": 1.0},
+            {"name": "throughput.filterset", "size": 100, "seconds": 1.0},
+        ]
+    }
+    current = {
+        "results": [
+            {"name": "startup.bisect", "seconds": 0.22},
+            {"name": "throughput.filterset", "size": 10, "seconds": 1.5},
+            {"name": "throughput.filterset", "size": 100, "seconds": 0.5},
+            {"name": "throughput.cmd_tests", "size": 10, "seconds": 9.0},
+        ]
+    }
+
+    regressions = bench.compare_results(baseline, current, 0.2)
+
+    assert regressions == [("throughput.filterset", 10, 1.0, 1.5)]
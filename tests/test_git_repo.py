@@ -8,6 +8,7 @@ from kcidev.libs.git_repo import (
     get_folder_repository,
     get_repository_url,
     is_inside_work_tree,
+    read_git_metadata,
     repository_url_cleaner,
 )
 
@@ -90,3 +91,48 @@ def test_bare_repository_has_no_work_tree(tmp_path, monkeypatch, capsys):
         in capsys.readouterr().err
     )
     os.chdir(original_folder)
+
+
+def _git_output(path, *args):
+    return subprocess.run(
+        ["git", *args], cwd=path, check=True, capture_output=True, text=True
+    ).stdout.strip()
+
+
+def test_read_git_metadata_reads_refs_without_git(tmp_path, monkeypatch):
+    repository = tmp_path / "repository"
+    _create_repository(repository, "git@github.com:kernelci/kci-dev.git")
+    _git_output(repository, "checkout", "-q", "-b", "for-next")
+    _git_output(repository, "pack-refs", "--all")
+    commit = _git_output(repository, "rev-parse", "HEAD")
+    worktree = tmp_path / "worktree"
+    _git_output(repository, "worktree", "add", "-q", "--detach", str(worktree))
+    nested = repository / "one"
+    nested.mkdir()
+
+    def no_subprocess(*args, **kwargs):
+        raise AssertionError("git must not be run")
+
+    monkeypatch.setattr(subprocess, "run", no_subprocess)
+    monkeypatch.setattr(subprocess, "Popen", no_subprocess)
+    monkeypatch.setattr(os, "chdir", no_subprocess)
+    metadata = read_git_metadata(nested)
+    detached = read_git_metadata(worktree)
+
+    assert metadata["work_tree"] == str(repository)
+    assert metadata["url"] == "https://github.com/kernelci/kci-dev.git"
+    assert (metadata["branch"], metadata["commit"]) == ("for-next", commit)
+    assert (detached["branch"], detached["commit"]) == ("", commit)
+    assert detached["url"] == metadata["url"]
+
+
+def test_read_git_metadata_lets_git_rewrite_urls(tmp_path):
+    repository = tmp_path / "repository"
+    _create_repository(repository, "kci:kernelci/kci-dev.git")
+    _git_output(repository, "config", "url.https://github.com/.insteadOf", "kci:")
+
+    metadata = read_git_metadata(repository)
+
+    assert metadata["url"] == "https://github.com/kernelci/kci-dev.git"
+    assert metadata["commit"] == _git_output(repository, "rev-parse", "HEAD")
+    assert read_git_metadata(tmp_path) is None
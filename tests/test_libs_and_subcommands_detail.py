@@ -7,12 +7,14 @@ from unittest.mock import Mock
 
 import click
 import pytest
+import requests
 from click.testing import CliRunner
 
-from kcidev.libs import files, git_repo, job_filters, maestro_common
+from kcidev.libs import files, git_repo, job_filters, maestro_common, remote_refs
 from kcidev.libs.common import HTTP_TIMEOUT, config_path, load_toml
 from kcidev.subcommands import bisect, checkout, commit
 from kcidev.subcommands.config import add_config, check_configuration, config
+from kcidev.subcommands.maestro import coverage
 from kcidev.subcommands.mcp import mcp
 from kcidev.subcommands.testretry import testretry as retry_command
 from kcidev.subcommands.watch import watch
@@ -164,6 +166,341 @@ def test_git_exec_getcommit_detects_completed_real_bisect(tmp_path, monkeypatch)
     assert commit == first_bad
 
 
+def test_parallel_bisection_narrows_range_with_all_results(tmp_path, monkeypatch):
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    _init_git_repo(repo)
+    commits = [_commit_file(repo, f"c{i}", f"commit {i}\n") for i in range(9)]
+    # commits[0] is good, commits[8] is bad and commits[5] introduced the bug
+    subprocess.run(
+        ["git", "bisect", "start", commits[8], commits[0]],
+        cwd=repo,
+        check=True,
+        capture_output=True,
+    )
+    monkeypatch.chdir(repo)
+
+    candidates = bisect.bisect_candidates(3)
+    assert candidates == [commits[6], commits[4], commits[2]]
+
+    state = bisect.new_state()
+    state.update({"workdir": str(repo), "next_commit": commits[4], "retry_fail": 1})
+    run_bisect_steps = Mock(
+        side_effect=lambda maestro, state, pending: [
+            {"commit": commit, "code": 1 if commit == commits[6] else 0}
+            for commit in pending
+        ]
+    )
+    monkeypatch.setattr(bisect, "run_bisect_steps", run_bisect_steps)
+
+    result = bisect.bisection_loop(state, _bisect_maestro(), parallel=3)
+
+    # one round for the three commits, one retry of the failed commit
+    assert [call.args[2] for call in run_bisect_steps.call_args_list] == [
+        candidates,
+        [commits[6]],
+    ]
+    assert result["history"] == [
+        {commits[6]: "bad"},
+        {commits[4]: "good"},
+        {commits[2]: "good"},
+    ]
+    assert bisect.bisect_candidates(3) == [commits[5]]
+    assert result["next_commit"] == commits[5]
+
+
+def test_bisect_step_watches_running_checkout_of_commit(monkeypatch):
+    state = _reuse_state()
+    state.update({"job_filter": ["baseline-x86"], "steps": [{"treeid": "old"}]})
+    find_checkout = Mock(return_value={"id": "n1", "treeid": "t1"})
+    send_checkout = Mock()
+    monkeypatch.setattr(bisect, "maestro_find_checkout", find_checkout)
+    monkeypatch.setattr(bisect, "send_checkout_full", send_checkout)
+    maestro = bisect.bisect_maestro({"prod": {"api": "https://api/"}}, "prod")
+
+    step = bisect.submit_bisect_step(maestro, state, "c1")
+
+    assert step["treeid"] == "t1"
+    send_checkout.assert_not_called()
+    assert find_checkout.call_args.kwargs["exclude"] == {"old"}
+
+
+def test_bisect_step_submits_checkout_when_lookup_fails(monkeypatch):
+    monkeypatch.setattr(
+        maestro_common.kcidev_session,
+        "get",
+        Mock(side_effect=requests.ConnectionError("reset")),
+    )
+    send_checkout = Mock(return_value={"node": {"treeid": "t2"}})
+    monkeypatch.setattr(bisect, "send_checkout_full", send_checkout)
+    maestro = bisect.bisect_maestro({"prod": {"api": "https://api/"}}, "prod")
+
+    step = bisect.submit_bisect_step(maestro, _reuse_state(), "c1")
+
+    assert step["treeid"] == "t2"
+    send_checkout.assert_called_once()
+
+
+def test_checkout_reuses_existing_checkout(monkeypatch):
+    find_checkout = Mock(return_value={"id": "n1", "treeid": "t1"})
+    send_checkout = Mock()
+    monkeypatch.setattr(checkout, "maestro_find_checkout", find_checkout)
+    monkeypatch.setattr(checkout, "send_checkout_full", send_checkout)
+
+    result = CliRunner().invoke(
+        checkout.checkout,
+        [
+            "--giturl",
+            "https://git.example.org/linux.git",
+            "--branch",
+            "master",
+            "--commit",
+            "c" * 40,
+            "--job-filter",
+            "baseline",
+            "--reuse-existing",
+            "any",
+        ],
+        obj={
+            "CFG": {
+                "prod": {"pipeline": "https://p/", "api": "https://api/", "token": "t"}
+            },
+            "INSTANCE": "prod",
+        },
+    )
+
+    assert result.exit_code == 0, result.output
+    assert "Reusing existing checkout n1" in result.output
+    assert find_checkout.call_args.kwargs["policy"] == "any"
+    send_checkout.assert_not_called()
+
+
+def test_bisect_candidates_weighs_commits_touching_paths(tmp_path, monkeypatch):
+    repo = tmp_path / "repo"
+    (repo / "drivers").mkdir(parents=True)
+    _init_git_repo(repo)
+    commits = [_commit_file(repo, f"c{i}", f"commit {i}\n") for i in range(8)]
+    commits.append(_commit_file(repo, "drivers/gpu", "gpu\n"))
+    commits.append(_commit_file(repo, "c9", "commit 9\n"))
+    subprocess.run(
+        ["git", "bisect", "start", "--no-checkout", commits[9], commits[0]],
+        cwd=repo,
+        check=True,
+        capture_output=True,
+    )
+    monkeypatch.chdir(repo)
+
+    assert bisect.bisect_candidates(1) == [commits[5]]
+    # commits[8] touches drivers: a good result on commits[7] leaves it and
+    # bad, a bad result leaves the unrelated commits
+    assert bisect.bisect_candidates(1, ["drivers"]) == [commits[7]]
+    state = {"paths": ["drivers"]}
+    assert bisect.next_bisect_commit(state, commits[5]) == commits[7]
+    assert bisect.next_bisect_commit({"paths": []}, commits[5]) == commits[5]
+
+
+def test_run_bisect_steps_watches_all_trees_together(monkeypatch):
+    state = bisect.new_state()
+    state.update({"job_filter": ["baseline-x86"], "test": "baseline.login"})
+    send_checkout = Mock(
+        side_effect=[{"node": {"treeid": "t1"}}, None, {"node": {"treeid": "t3"}}]
+    )
+
+    def watch_trees(url, token, trees, job_filter, test, on_event, events):
+        spec = {
+            "root_node": "checkout",
+            "job_filter": ["baseline-x86"],
+            "test": "baseline.login",
+        }
+        assert trees == {"t1": spec, "t3": spec}
+        on_event({"event": "job", "treeid": "t1"})
+        on_event(
+            {
+                "event": "tree",
+                "treeid": "t1",
+                "exit_code": 1,
+                "test_result": "fail",
+                "failed_job": None,
+            }
+        )
+        on_event(
+            {
+                "event": "tree",
+                "treeid": "t3",
+                "exit_code": 2,
+                "test_result": None,
+                "failed_job": "kbuild-gcc-12-x86",
+            }
+        )
+        return {"t1": 1, "t3": 2}
+
+    monkeypatch.setattr(bisect, "send_checkout_full", send_checkout)
+    monkeypatch.setattr(bisect, "maestro_watch_trees", watch_trees)
+
+    steps = bisect.run_bisect_steps(_bisect_maestro(), state, ["c1", "c2", "c3"])
+
+    assert [(s["commit"], s["treeid"], s["code"]) for s in steps] == [
+        ("c1", "t1", 1),
+        ("c2", None, 3),
+        ("c3", "t3", 2),
+    ]
+    assert steps[2]["failed_job"] == "kbuild-gcc-12-x86"
+
+
+def _reuse_state():
+    state = bisect.new_state()
+    state.update(
+        {
+            "giturl": "https://git.example.org/linux.git",
+            "branch": "master",
+            "test": "baseline.login",
+            "platform_filter": ["qemu-x86"],
+        }
+    )
+    return state
+
+
+def test_bisect_step_reuses_conclusive_dashboard_results(monkeypatch):
+    fetch_tests = Mock(
+        return_value={
+            "tests": [
+                {
+                    "path": "baseline.login",
+                    "status": "FAIL",
+                    "environment_misc": {"platform": "qemu-x86"},
+                },
+                {
+                    "path": "baseline.login",
+                    "status": "PASS",
+                    "environment_misc": {"platform": "rk3399"},
+                },
+            ]
+        }
+    )
+    send_checkout = Mock()
+    monkeypatch.setattr("kcidev.libs.results.dashboard_fetch_tests", fetch_tests)
+    monkeypatch.setattr(bisect, "send_checkout_full", send_checkout)
+    maestro = bisect.bisect_maestro({"prod": {"api": "https://api/"}}, "prod")
+
+    step = bisect.run_bisect_step(maestro, _reuse_state(), "c1")
+
+    assert (step["code"], step["reused"], step["treeid"]) == (1, "dashboard", None)
+    send_checkout.assert_not_called()
+
+
+def test_bisect_step_checks_maestro_when_dashboard_inconclusive(monkeypatch):
+    fetch_tests = Mock(
+        return_value={
+            "tests": [
+                {"path": "baseline.login", "status": status, "environment_misc": {}}
+                for status in ("PASS", "FAIL")
+            ]
+        }
+    )
+    nodes = [
+        {"result": "pass", "data": {"platform": "qemu-x86"}},
+        {"result": "fail", "data": {"platform": "rk3399"}},
+        {"result": "incomplete", "data": {"platform": "qemu-x86"}},
+    ]
+    get_nodes = Mock(
+        side_effect=lambda url, limit, offset, filters, paginate: (
+            [] if "kind=kbuild" in filters else nodes
+        )
+    )
+    monkeypatch.setattr("kcidev.libs.results.dashboard_fetch_tests", fetch_tests)
+    monkeypatch.setattr(bisect, "maestro_get_nodes", get_nodes)
+    state = _reuse_state()
+    state["platform_filter"] = []
+    maestro = bisect.bisect_maestro({"prod": {"api": "https://api/"}}, "prod")
+
+    assert bisect.find_existing_step(maestro, state, "c1") is None
+
+    state["platform_filter"] = ["qemu-x86"]
+    step = bisect.find_existing_step(maestro, state, "c1")
+
+    assert (step["code"], step["reused"]) == (0, "maestro")
+    assert "data.kernel_revision.commit=c1" in get_nodes.call_args.args[3]
+
+
+def test_bisect_step_skips_commits_with_failed_builds(monkeypatch):
+    monkeypatch.setattr(
+        "kcidev.libs.results.dashboard_fetch_tests", Mock(return_value={"tests": []})
+    )
+    get_nodes = Mock(
+        side_effect=lambda url, limit, offset, filters, paginate: (
+            [
+                {"name": "kbuild-gcc-12-x86", "result": "fail"},
+                {"name": "kbuild-clang-17-arm64", "result": "pass"},
+            ]
+            if "kind=kbuild" in filters
+            else []
+        )
+    )
+    monkeypatch.setattr(bisect, "maestro_get_nodes", get_nodes)
+    state = _reuse_state()
+    state["job_filter"] = ["kbuild-gcc-12-x86", "baseline-x86"]
+    maestro = bisect.bisect_maestro({"prod": {"api": "https://api/"}}, "prod")
+
+    step = bisect.find_existing_step(maestro, state, "c1")
+
+    assert (step["code"], step["failed_job"]) == (2, "kbuild-gcc-12-x86")
+
+
+def test_bisect_step_falls_back_to_a_run_when_maestro_lookup_fails(monkeypatch):
+    monkeypatch.setattr(
+        "kcidev.libs.results.dashboard_fetch_tests", Mock(return_value={"tests": []})
+    )
+    monkeypatch.setattr(
+        maestro_common.kcidev_session,
+        "get",
+        Mock(side_effect=requests.ConnectionError("reset")),
+    )
+    maestro = bisect.bisect_maestro({"prod": {"api": "https://api/"}}, "prod")
+
+    assert bisect.find_existing_step(maestro, _reuse_state(), "c1") is None
+
+
+def test_bisect_retries_failed_step_despite_its_maestro_result(monkeypatch):
+    state = _reuse_state()
+    state.update({"job_filter": ["baseline-x86"], "retry_fail": 2})
+    monkeypatch.setattr(
+        "kcidev.libs.results.dashboard_fetch_tests", Mock(return_value={"tests": []})
+    )
+    # Maestro has the failing result of every run of the bisection
+    monkeypatch.setattr(
+        bisect,
+        "maestro_get_nodes",
+        Mock(
+            side_effect=lambda url, limit, offset, filters, paginate: (
+                []
+                if "kind=kbuild" in filters or not send_checkout.called
+                else [{"result": "fail", "data": {"platform": "qemu-x86"}}]
+            )
+        ),
+    )
+    monkeypatch.setattr(bisect, "maestro_find_checkout", Mock(return_value=None))
+    send_checkout = Mock(
+        side_effect=[{"node": {"treeid": f"t{i}"}} for i in range(1, 4)]
+    )
+    monkeypatch.setattr(bisect, "send_checkout_full", send_checkout)
+    monkeypatch.setattr(bisect, "maestro_watch_session", Mock(return_value={}))
+
+    def watch_tree(watch, treeid):
+        watch["trees"] = {treeid: {"test_result": "fail", "failed_job": None}}
+        return 1
+
+    monkeypatch.setattr(bisect, "maestro_watch_tree", watch_tree)
+    mark = Mock()
+    monkeypatch.setattr(bisect, "mark_bisect_step", mark)
+    state["next_commit"] = "c1"
+
+    bisect._bisection_loop(state, bisect.bisect_maestro({}, None))
+
+    assert [step["treeid"] for step in state["steps"]] == ["t1", "t2", "t3"]
+    assert send_checkout.call_count == 3
+    assert mark.call_args.args[1]["treeid"] == "t3"
+
+
 def test_execute_cmdline_raises_click_exception_on_failure():
     with pytest.raises(click.ClickException, match="exit code 7"):
         bisect.execute_cmdline(
@@ -173,20 +510,19 @@ def test_execute_cmdline_raises_click_exception_on_failure():
         )
 
 
-def test_kcidev_exec_streams_stdout_and_stderr(capsys):
-    process = bisect.kcidev_exec(
-        [
-            "sh",
-            "-c",
-            "printf 'standard output\\n'; printf 'error output\\n' >&2; exit 7",
-        ]
+def _bisect_maestro():
+    return bisect.bisect_maestro(
+        {
+            "prod": {
+                "pipeline": "https://pipeline.example.org/",
+                "api": "https://api.example.org/",
+                "token": "token123",
+            }
+        },
+        "prod",
+        reuse=False,
     )
 
-    output = capsys.readouterr().out
-    assert "standard output\n" in output
-    assert "error output\n" in output
-    assert process.returncode == 7
-
 
 @pytest.mark.parametrize(
     ("returncodes", "expected_result"),
@@ -206,17 +542,25 @@ def test_bisection_loop_retries_failures_before_marking_commit(
             "next_commit": "deadbeef",
         }
     )
-    executions = [Mock(returncode=code) for code in returncodes]
-    kcidev_exec = Mock(side_effect=executions)
+    steps = [
+        {"commit": "deadbeef", "code": code, "submit_seconds": 1, "watch_seconds": 2}
+        for code in returncodes
+    ]
+    run_bisect_step = Mock(side_effect=steps)
     git_exec_getcommit = Mock(return_value=("cafebabe", False))
-    monkeypatch.setattr(bisect, "kcidev_exec", kcidev_exec)
+    monkeypatch.setattr(bisect, "run_bisect_step", run_bisect_step)
     monkeypatch.setattr(bisect, "git_exec_getcommit", git_exec_getcommit)
 
-    result = bisect.bisection_loop(state)
+    maestro = _bisect_maestro()
+    result = bisect.bisection_loop(state, maestro)
 
-    assert kcidev_exec.call_count == len(returncodes)
-    git_exec_getcommit.assert_called_once_with(["git", "bisect", expected_result])
+    assert run_bisect_step.call_count == len(returncodes)
+    assert all(call.args[0] is maestro for call in run_bisect_step.call_args_list)
+    git_exec_getcommit.assert_called_once_with(
+        ["git", "bisect", expected_result, "deadbeef"]
+    )
     assert result["history"] == [{"deadbeef": expected_result}]
+    assert result["steps"] == steps
 
 
 def test_bisection_loop_restores_working_directory_after_maestro_error(
@@ -237,12 +581,71 @@ def test_bisection_loop_restores_working_directory_after_maestro_error(
             "next_commit": "deadbeef",
         }
     )
-    monkeypatch.setattr(bisect, "kcidev_exec", Mock(return_value=Mock(returncode=3)))
+    monkeypatch.setattr(
+        bisect,
+        "run_bisect_step",
+        Mock(return_value={"commit": "deadbeef", "code": 3}),
+    )
 
-    assert bisect.bisection_loop(state) is None
+    assert bisect.bisection_loop(state, _bisect_maestro()) is None
     assert os.getcwd() == str(original_dir)
 
 
+def test_bisect_steps_reuse_one_watch_session(monkeypatch):
+    state = bisect.new_state()
+    state.update(
+        {
+            "giturl": "https://git.example/linux.git",
+            "branch": "main",
+            "job_filter": ["baseline-x86"],
+            "platform_filter": ["qemu-x86"],
+            "test": "baseline.login",
+        }
+    )
+    send_checkout = Mock(
+        side_effect=[{"node": {"treeid": "t1"}}, {"node": {"treeid": "t2"}}, None]
+    )
+    session = {"trees": {}}
+    watch_session = Mock(return_value=session)
+
+    def watch_tree(watch, treeid):
+        watch["trees"] = {
+            treeid: {"test_result": "fail", "failed_job": None},
+        }
+        return 1
+
+    monkeypatch.setattr(bisect, "send_checkout_full", send_checkout)
+    monkeypatch.setattr(bisect, "maestro_watch_session", watch_session)
+    monkeypatch.setattr(bisect, "maestro_watch_tree", Mock(side_effect=watch_tree))
+    close = Mock()
+    monkeypatch.setattr(bisect, "maestro_watch_close", close)
+    maestro = _bisect_maestro()
+
+    first = bisect.run_bisect_step(maestro, state, "deadbeef")
+    second = bisect.run_bisect_step(maestro, state, "deadbeef")
+    failed = bisect.run_bisect_step(maestro, state, "cafebabe")
+    bisect.close_bisect_maestro(maestro)
+
+    assert (first["treeid"], first["code"], first["test_result"]) == ("t1", 1, "fail")
+    assert second["treeid"] == "t2"
+    assert (failed["treeid"], failed["code"]) == (None, 3)
+    watch_session.assert_called_once_with(
+        "https://api.example.org/",
+        "token123",
+        ["baseline-x86"],
+        "baseline.login",
+        events=False,
+    )
+    close.assert_called_once_with(session)
+    assert send_checkout.call_args.kwargs == {
+        "giturl": "https://git.example/linux.git",
+        "branch": "main",
+        "commit": "cafebabe",
+        "job_filter": ["baseline-x86"],
+        "platform_filter": ["qemu-x86"],
+    }
+
+
 def test_bisect_limits_maestro_retries_and_uses_backoff(tmp_path, monkeypatch):
     state = bisect.new_state()
     state.update(
@@ -314,6 +717,39 @@ def test_update_tree_preserves_bisect_commit_when_resuming(tmp_path):
     assert saved_next_commit != bad
 
 
+def test_blobless_workdir_bisects_without_checkout(tmp_path, monkeypatch):
+    origin = tmp_path / "origin"
+    origin.mkdir()
+    _init_git_repo(origin)
+    subprocess.run(["git", "config", "uploadpack.allowFilter", "true"], cwd=origin)
+    commits = [_commit_file(origin, f"c{i}", f"commit {i}\n") for i in range(5)]
+    giturl = origin.as_uri()
+    cache = tmp_path / "cache"
+    workdir = tmp_path / "workdir"
+
+    repo = bisect.update_tree(str(workdir), "main", giturl, reference=str(cache))
+
+    assert bisect.is_partial_clone(repo)
+    assert (workdir / ".git" / "objects" / "info" / "alternates").exists()
+    assert not (workdir / "c0").exists()
+    cached = subprocess.run(
+        ["git", "--git-dir", str(cache), "for-each-ref", "--format=%(objectname)"],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout.split()
+    assert cached == [commits[4]]
+
+    state = bisect.new_state()
+    state.update({"workdir": str(workdir), "good": commits[0], "bad": commits[4]})
+    monkeypatch.chdir(tmp_path)
+    next_commit = bisect.init_bisect(repo, state)
+
+    assert next_commit in commits[1:4]
+    assert repo.head.commit.hexsha == commits[4]
+    assert not (workdir / "c0").exists()
+
+
 def test_commit_find_diff_returns_latest_patch(tmp_path):
     subprocess.run(
         ["git", "init", "-b", "master", str(tmp_path)],
@@ -341,27 +777,79 @@ def test_commit_find_diff_returns_latest_patch(tmp_path):
     assert "feature" in diff
 
 
-def test_checkout_retrieve_tot_commit_success(monkeypatch):
-    process = Mock(returncode=0)
-    process.communicate.return_value = (b"deadbeef\trefs/heads/main\n", b"")
-    popen = Mock(return_value=process)
-    monkeypatch.setattr(checkout.subprocess, "Popen", popen)
+def test_checkout_retrieve_tot_commit_success(tmp_path, monkeypatch):
+    monkeypatch.setattr(remote_refs, "_ref_cache_path", str(tmp_path / "refs.json"))
+    run = Mock(
+        return_value=subprocess.CompletedProcess(
+            [], 0, stdout="deadbeef\trefs/heads/main\n", stderr=""
+        )
+    )
+    monkeypatch.setattr(remote_refs.subprocess, "run", run)
 
     assert (
         checkout.retrieve_tot_commit("https://git.example/linux.git", "main")
         == "deadbeef"
     )
-    popen.assert_called_once()
+    run.assert_called_once()
 
 
-def test_checkout_retrieve_tot_commit_failure(monkeypatch):
-    process = Mock(returncode=128)
-    process.communicate.return_value = (b"", b"fatal")
-    monkeypatch.setattr(checkout.subprocess, "Popen", Mock(return_value=process))
+def test_checkout_retrieve_tot_commit_failure(tmp_path, monkeypatch):
+    monkeypatch.setattr(remote_refs, "_ref_cache_path", str(tmp_path / "refs.json"))
+    run = Mock(
+        return_value=subprocess.CompletedProcess([], 128, stdout="", stderr="fatal")
+    )
+    monkeypatch.setattr(remote_refs.subprocess, "run", run)
 
     assert checkout.retrieve_tot_commit("https://git.example/linux.git", "main") is None
 
 
+def test_ls_remote_ref_prefers_annotated_tag_over_branch(tmp_path, monkeypatch):
+    monkeypatch.setattr(remote_refs, "_ref_cache_path", str(tmp_path / "refs.json"))
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    _init_git_repo(repo)
+    tagged = _commit_file(repo, "a", "a\n")
+    for cmd in (["tag", "-a", "v1", "-m", "v1"], ["branch", "feature/v1"]):
+        subprocess.run(["git", *cmd], cwd=repo, check=True, capture_output=True)
+    _commit_file(repo, "b", "b\n")
+    subprocess.run(
+        ["git", "branch", "-f", "feature/v1"], cwd=repo, check=True, capture_output=True
+    )
+
+    assert remote_refs.ls_remote_ref(str(repo), "v1") == tagged
+
+
+def test_ls_remote_ref_peels_tags_and_caches_them(tmp_path, monkeypatch):
+    monkeypatch.setattr(remote_refs, "_ref_cache_path", str(tmp_path / "refs.json"))
+    outputs = {
+        "v6.6": "aaaa\trefs/tags/v6.6\ncccc\trefs/tags/v6.6^{}\n",
+        "master": "bbbb\trefs/heads/master\n",
+    }
+    run = Mock(
+        side_effect=lambda cmd, **kwargs: subprocess.CompletedProcess(
+            cmd, 0, stdout=outputs[cmd[3]], stderr=""
+        )
+    )
+    monkeypatch.setattr(remote_refs.subprocess, "run", run)
+    now = [1000.0]
+    monkeypatch.setattr(remote_refs.time, "time", lambda: now[0])
+    url = "https://git.example/linux.git"
+
+    assert remote_refs.ls_remote_ref(url, "v6.6") == "cccc"
+    assert remote_refs.ls_remote_ref(url, "master") == "bbbb"
+    assert run.call_args_list[0].args[0] == ["git", "ls-remote", url, "v6.6", "v6.6^{}"]
+    now[0] += remote_refs.REF_CACHE_TTL + 1
+    assert remote_refs.ls_remote_ref(url, "v6.6") == "cccc"
+    assert remote_refs.ls_remote_ref(url, "master") == "bbbb"
+
+    # the tag came from the cache, the branch head was resolved again
+    assert [call.args[0][3] for call in run.call_args_list] == [
+        "v6.6",
+        "master",
+        "master",
+    ]
+
+
 def test_files_download_logs_to_file_decompresses_and_sanitizes(tmp_path, monkeypatch):
     response = Mock(content=gzip.compress(b"boot log\n"))
     response.raise_for_status.return_value = None
@@ -466,5 +954,58 @@ def test_watch_forwards_filters_to_watch_jobs(monkeypatch):
 
     assert result.exit_code == 0, result.output
     watch_jobs.assert_called_once_with(
-        "https://api/", "secret", "tree-1", ("baseline",), "login", root_node="checkout"
+        "https://api/",
+        "secret",
+        "tree-1",
+        ("baseline",),
+        "login",
+        root_node="checkout",
+        events=False,
+    )
+
+
+def test_coverage_looks_up_children_level_by_level(monkeypatch):
+    builds = [{"id": f"b{i}"} for i in range(3)]
+    revision = {"kernel_revision": {"branch": "main", "commit": "abc"}}
+    processes = {
+        "b0": [
+            {
+                "id": "r0",
+                "name": "coverage-report-x86",
+                "artifacts": {"coverage_report": "https://report/0"},
+                "data": revision,
+            }
+        ],
+        "b1": [{"id": "o1", "name": "other", "artifacts": {}, "data": {}}],
+        "b2": [],
+    }
+    tests = {
+        "r0": [
+            {"name": "coverage.functions", "data": {"misc": {"measurement": 40}}},
+            {"name": "coverage.lines", "data": {"misc": {"measurement": 30}}},
+        ]
+    }
+    get_children = Mock(
+        side_effect=lambda url, ids, filter, cache: {
+            i: (processes if "kind=process" in filter else tests)[i] for i in ids
+        }
     )
+    monkeypatch.setattr(
+        "kcidev.subcommands.maestro.maestro_iter_nodes", Mock(return_value=builds)
+    )
+    monkeypatch.setattr("kcidev.subcommands.maestro.maestro_get_children", get_children)
+
+    result = CliRunner().invoke(
+        coverage,
+        [],
+        obj={"CFG": {"production": {"api": "https://api/"}}, "INSTANCE": "production"},
+    )
+
+    assert result.exit_code == 0, result.output
+    assert [call.args[1] for call in get_children.mock_calls] == [
+        ["b0", "b1", "b2"],
+        ["r0"],
+    ]
+    assert "chromiumos/main" in result.output
+    assert "Function coverage: 40%" in result.output
+    assert "https://report/0" in result.output
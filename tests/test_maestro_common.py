@@ -124,10 +124,10 @@ def test_maestro_get_node_plain_text_http_error_is_clean(monkeypatch):
         maestro_common.kcidev_session, "get", Mock(return_value=response)
     )
 
-    with pytest.raises(SystemExit) as exc_info:
+    with pytest.raises(maestro_common.MaestroError) as exc_info:
         maestro_common.maestro_get_node("https://api.example.org", "n1")
 
-    assert exc_info.value.code == 2
+    assert exc_info.value.exit_code == 2
 
 
 def test_maestro_print_nodes_emits_one_json_document(capsys):
@@ -294,4 +294,360 @@ def test_maestro_watch_jobs_times_out_waiting_for_test_result(monkeypatch):
         )
 
     assert exc_info.value.code == 2
-    sleep.assert_called_once_with(30)
+    sleep.assert_called_once_with(maestro_common.WATCH_POLL_FAST)
+
+
+def _paged_get(total):
+    """Return a fake session.get serving ``total`` nodes by limit/offset."""
+
+    def get(url, headers, params, timeout):
+        params = dict(params)
+        start = params["offset"]
+        stop = min(start + params["limit"], total)
+        return _response(json_data=[{"id": f"n{i}"} for i in range(start, stop)])
+
+    return Mock(side_effect=get)
+
+
+def test_maestro_iter_nodes_walks_pages_until_short_page(monkeypatch):
+    get = _paged_get(7)
+    monkeypatch.setattr(maestro_common.kcidev_session, "get", get)
+
+    nodes = list(
+        maestro_common.maestro_iter_nodes(
+            "https://api.example.org", ["kind=kbuild"], page_size=3
+        )
+    )
+
+    assert [node["id"] for node in nodes] == [f"n{i}" for i in range(7)]
+    offsets = sorted(dict(call.kwargs["params"])["offset"] for call in get.mock_calls)
+    # The page at offset 9 may already have been prefetched speculatively.
+    assert offsets[:3] == [0, 3, 6]
+    assert all(("kind", "kbuild") in call.kwargs["params"] for call in get.mock_calls)
+
+
+def test_maestro_iter_nodes_stops_at_limit(monkeypatch):
+    get = _paged_get(100)
+    monkeypatch.setattr(maestro_common.kcidev_session, "get", get)
+
+    nodes = list(
+        maestro_common.maestro_iter_nodes(
+            "https://api.example.org", [], page_size=4, offset=2, limit=10
+        )
+    )
+
+    assert [node["id"] for node in nodes] == [f"n{i}" for i in range(2, 12)]
+    pages = sorted(
+        (dict(call.kwargs["params"])["offset"], dict(call.kwargs["params"])["limit"])
+        for call in get.mock_calls
+    )
+    assert pages == [(2, 4), (6, 4), (10, 2)]
+
+
+def test_maestro_iter_nodes_prefetches_following_pages(monkeypatch):
+    get = _paged_get(100)
+    monkeypatch.setattr(maestro_common.kcidev_session, "get", get)
+
+    nodes = maestro_common.maestro_iter_nodes(
+        "https://api.example.org", [], page_size=5, prefetch=2
+    )
+    assert next(nodes)["id"] == "n0"
+    nodes.close()
+
+    offsets = sorted(dict(call.kwargs["params"])["offset"] for call in get.mock_calls)
+    assert offsets[0] == 0
+    assert set(offsets[1:]) <= {5, 10}
+
+
+def test_maestro_get_nodes_without_pagination_fetches_every_page(monkeypatch):
+    total = maestro_common.MAESTRO_PAGE_SIZE + 5
+    monkeypatch.setattr(maestro_common.kcidev_session, "get", _paged_get(total))
+
+    nodes = maestro_common.maestro_get_nodes(
+        "https://api.example.org", 50, 0, [], False
+    )
+
+    assert len(nodes) == total
+
+
+def _children_get(children):
+    """Return a fake session.get serving ``children`` by parent__in."""
+
+    def get(url, headers, params, timeout):
+        params = dict(params)
+        parents = params["parent__in"].split(",")
+        nodes = [node for node in children if node["parent"] in parents]
+        start = params["offset"]
+        return _response(json_data=nodes[start : start + params["limit"]])
+
+    return Mock(side_effect=get)
+
+
+def test_maestro_get_children_batches_parents(monkeypatch):
+    children = [{"id": f"c{i}", "parent": f"p{i % 5}"} for i in range(10)]
+    get = _children_get(children)
+    monkeypatch.setattr(maestro_common.kcidev_session, "get", get)
+
+    result = maestro_common.maestro_get_children(
+        "https://api.example.org",
+        [f"p{i}" for i in range(6)],
+        ["kind=process"],
+        batch_size=4,
+    )
+
+    assert [c["id"] for c in result["p0"]] == ["c0", "c5"]
+    assert result["p5"] == []
+    batches = sorted(
+        dict(call.kwargs["params"])["parent__in"] for call in get.mock_calls
+    )
+    assert batches == ["p0,p1,p2,p3", "p4,p5"]
+    assert all(("kind", "process") in call.kwargs["params"] for call in get.mock_calls)
+
+
+def test_maestro_get_children_serves_known_parents_from_cache(monkeypatch):
+    get = _children_get([{"id": "c0", "parent": "p0"}, {"id": "c1", "parent": "p1"}])
+    monkeypatch.setattr(maestro_common.kcidev_session, "get", get)
+    cache = {}
+
+    maestro_common.maestro_get_children(
+        "https://api.example.org", ["p0"], ["kind=test"], cache
+    )
+    result = maestro_common.maestro_get_children(
+        "https://api.example.org", ["p0", "p1"], ["kind=test"], cache
+    )
+
+    assert [c["id"] for c in result["p0"]] == ["c0"]
+    assert [c["id"] for c in result["p1"]] == ["c1"]
+    batches = [dict(call.kwargs["params"])["parent__in"] for call in get.mock_calls]
+    assert batches == ["p0", "p1"]
+
+
+def _watch_node(node_id, name, state, result=None, updated="2025-01-01T00:00:00"):
+    return {
+        "id": node_id,
+        "name": name,
+        "kind": "checkout" if name == "checkout" else "job",
+        "state": state,
+        "result": result,
+        "updated": updated,
+    }
+
+
+def test_maestro_watch_jobs_polls_incrementally(monkeypatch):
+    polls = [
+        [
+            _watch_node("c1", "checkout", "available", updated="2025-01-01T00:00:01"),
+            _watch_node("j1", "job1", "running", updated="2025-01-01T00:00:02"),
+        ],
+        [],
+        [_watch_node("j1", "job1", "done", "pass", updated="2025-01-01T00:00:09")],
+    ]
+    retrieve = Mock(side_effect=polls)
+    monkeypatch.setattr(maestro_common, "maestro_retrieve_treeid_nodes", retrieve)
+    monkeypatch.setattr(maestro_common.time, "sleep", Mock())
+
+    maestro_common.maestro_watch_jobs(
+        "https://api.example.org/", "token123", "t1", ["job1"], None
+    )
+
+    updated_after = [call.kwargs["updated_after"] for call in retrieve.mock_calls]
+    assert updated_after == [None, "2025-01-01T00:00:02", "2025-01-01T00:00:02"]
+
+
+def test_maestro_watch_jobs_backs_off_while_idle(monkeypatch):
+    running = [
+        _watch_node("c1", "checkout", "available"),
+        _watch_node("j1", "job1", "running"),
+    ]
+    done = [_watch_node("j1", "job1", "done", "pass", updated="2025-01-01T00:01:00")]
+    monkeypatch.setattr(
+        maestro_common,
+        "maestro_retrieve_treeid_nodes",
+        Mock(side_effect=[running, [], [], [], [], done]),
+    )
+    sleep = Mock()
+    monkeypatch.setattr(maestro_common.time, "sleep", sleep)
+
+    maestro_common.maestro_watch_jobs(
+        "https://api.example.org/", "token123", "t1", ["job1"], None
+    )
+
+    fast = maestro_common.WATCH_POLL_FAST
+    idle = maestro_common.WATCH_POLL_IDLE
+    delays = [call.args[0] for call in sleep.mock_calls]
+    assert delays == [fast, fast * 2, fast * 4, min(fast * 8, idle), idle]
+
+
+def test_maestro_watch_jobs_exits_once_test_resolves(monkeypatch):
+    nodes = [
+        _watch_node("c1", "checkout", "available"),
+        _watch_node("j1", "job1", "running"),
+        _watch_node("t1", "baseline.login", "done", "fail"),
+    ]
+    monkeypatch.setattr(
+        maestro_common, "maestro_retrieve_treeid_nodes", Mock(return_value=nodes)
+    )
+    monkeypatch.setattr(
+        maestro_common.time,
+        "sleep",
+        Mock(side_effect=RuntimeError("watch loop did not stop")),
+    )
+
+    with pytest.raises(SystemExit) as exc_info:
+        maestro_common.maestro_watch_jobs(
+            "https://api.example.org/", "token123", "t1", ["job1"], "baseline.login"
+        )
+
+    assert exc_info.value.code == 1
+
+
+def test_maestro_watch_session_returns_result_per_tree(monkeypatch):
+    trees = {
+        "t1": [_watch_node("t1-test", "baseline.login", "done", "fail")],
+        "t2": [_watch_node("t2-test", "baseline.login", "done", "pass")],
+    }
+    retrieve = Mock(side_effect=lambda url, token, treeid, updated_after: trees[treeid])
+    monkeypatch.setattr(maestro_common, "maestro_retrieve_treeid_nodes", retrieve)
+
+    session = maestro_common.maestro_watch_session(
+        "https://api.example.org/", "token123", ["job1"], "baseline.login"
+    )
+    first = maestro_common.maestro_watch_tree(session, "t1")
+    second = maestro_common.maestro_watch_tree(session, "t2")
+    maestro_common.maestro_watch_close(session)
+
+    assert (first, second) == (1, 0)
+    assert list(session["trees"]) == ["t2"]
+    assert session["trees"]["t2"]["test_result"] == "pass"
+
+
+def test_maestro_retrieve_tree_nodes_filters_on_update_time(monkeypatch):
+    get = Mock(return_value=_response(json_data=[]))
+    monkeypatch.setattr(maestro_common.kcidev_session, "get", get)
+
+    maestro_common.maestro_retrieve_treeid_nodes(
+        "https://api.example.org", "token", "tree-1", updated_after="2025-01-01"
+    )
+
+    assert get.call_args.kwargs["params"] == {
+        "treeid": "tree-1",
+        "updated__gt": "2025-01-01",
+    }
+
+
+def test_maestro_watch_trees_polls_all_trees_together(monkeypatch):
+    def node(treeid, node_id, name, state, result=None, updated="2025-01-01"):
+        return {**_watch_node(node_id, name, state, result, updated), "treeid": treeid}
+
+    polls = [
+        [
+            node("t1", "c1", "checkout", "available"),
+            node("t1", "j1", "job1", "done", "pass"),
+            node("t2", "c2", "checkout", "available"),
+            node("t2", "j2", "job1", "running"),
+        ],
+        [node("t2", "j2", "job1", "done", "fail", updated="2025-01-02")],
+    ]
+    retrieve = Mock(side_effect=polls)
+    monkeypatch.setattr(maestro_common, "maestro_retrieve_trees_nodes", retrieve)
+    monkeypatch.setattr(maestro_common.time, "sleep", Mock())
+    events = []
+
+    exit_codes = maestro_common.maestro_watch_trees(
+        "https://api.example.org/",
+        "token123",
+        {"t1": "checkout", "t2": "checkout"},
+        ["job1"],
+        None,
+        on_event=events.append,
+    )
+
+    assert exit_codes == {"t1": 0, "t2": 0}
+    assert retrieve.mock_calls[0].args[2] == ["t1", "t2"]
+    assert retrieve.mock_calls[1].args[2] == ["t2"]
+    assert retrieve.mock_calls[1].kwargs["updated_after"] == "2025-01-01"
+    assert [e["treeid"] for e in events if e["event"] == "tree"] == ["t1", "t2"]
+    json.dumps(events)
+
+
+def test_maestro_watch_trees_uses_per_tree_jobs_and_tests(monkeypatch):
+    def node(treeid, node_id, name, state, result=None):
+        return {**_watch_node(node_id, name, state, result), "treeid": treeid}
+
+    retrieve = Mock(
+        return_value=[
+            node("t1", "c1", "checkout", "available"),
+            node("t1", "j1", "job-a", "done", "pass"),
+            node("t1", "x1", "test-a", "done", "pass"),
+            node("t2", "c2", "checkout", "available"),
+            node("t2", "j2", "job-b", "done", "pass"),
+            node("t2", "x2", "test-b", "done", "fail"),
+        ]
+    )
+    monkeypatch.setattr(maestro_common, "maestro_retrieve_trees_nodes", retrieve)
+
+    exit_codes = maestro_common.maestro_watch_trees(
+        "https://api.example.org/",
+        "token123",
+        {
+            "t1": {"job_filter": ["job-a"], "test": "test-a"},
+            "t2": {"job_filter": ["job-b"], "test": "test-b"},
+        },
+        [],
+        None,
+    )
+
+    assert exit_codes == {"t1": 0, "t2": 1}
+
+
+def test_maestro_retrieve_trees_nodes_uses_one_combined_query(monkeypatch):
+    get = Mock(return_value=_response(json_data=[]))
+    monkeypatch.setattr(maestro_common.kcidev_session, "get", get)
+
+    maestro_common.maestro_retrieve_trees_nodes(
+        "https://api.example.org", "token", ["t1", "t2"]
+    )
+
+    get.assert_called_once()
+    assert get.call_args.kwargs["params"] == {"treeid__in": "t1,t2"}
+
+
+def test_maestro_find_checkout_matches_filters_and_policy(monkeypatch):
+    def checkout(node_id, state, result=None, jobs=("baseline",), created="1"):
+        return {
+            "id": node_id,
+            "treeid": f"tree-{node_id}",
+            "state": state,
+            "result": result,
+            "jobfilter": list(jobs),
+            "platform_filter": ["qemu-x86"],
+            "created": created,
+        }
+
+    nodes = [
+        checkout("other-jobs", "available", jobs=("ltp",)),
+        checkout("failed", "done", "fail", created="4"),
+        checkout("passed", "done", "pass", created="3"),
+        checkout("running", "closing", created="2"),
+    ]
+    get_nodes = Mock(return_value=nodes)
+    monkeypatch.setattr(maestro_common, "maestro_get_nodes", get_nodes)
+
+    def find(policy, exclude=()):
+        node = maestro_common.maestro_find_checkout(
+            "https://api/",
+            "https://git.example.org/linux.git",
+            "master",
+            "c" * 40,
+            ["baseline"],
+            ["qemu-x86"],
+            policy=policy,
+            exclude=exclude,
+        )
+        return node and node["id"]
+
+    assert find("no") is None
+    assert find("running") == "running"
+    assert find("any") == "passed"
+    assert find("running", exclude={"tree-running"}) is None
+    assert f"data.kernel_revision.commit={'c' * 40}" in get_nodes.call_args.args[3]
@@ -0,0 +1,181 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import Mock
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+from kcidev.libs import maestro_common
+
+
+class FakeMaestro:
+    """Minimal stand-in for the Maestro nodes and pub/sub endpoints."""
+
+    def __init__(self, nodes, subscribe_status=200):
+        self.nodes = {node["id"]: node for node in nodes}
+        self.subscribe_status = subscribe_status
+        self.listen_updates = []
+        self.requests = []
+        self.lock = threading.Lock()
+
+    def handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _reply(self, status, data):
+                body = json.dumps(data).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self):
+                path = urlsplit(self.path).path
+                fake.requests.append(("POST", path))
+                if path == "/latest/subscribe/node":
+                    self._reply(fake.subscribe_status, {"id": 7, "channel": "node"})
+                else:
+                    self._reply(200, {})
+
+            def do_GET(self):
+                url = urlsplit(self.path)
+                fake.requests.append(("GET", url.path))
+                if url.path == "/latest/nodes/fast":
+                    query = parse_qs(url.query)
+                    after = query.get("updated__gt", [""])[0]
+                    with fake.lock:
+                        nodes = [n for n in fake.nodes.values() if n["updated"] > after]
+                    self._reply(200, nodes)
+                elif url.path == "/latest/listen/7":
+                    # None entries stand for keep-alive messages
+                    node = fake.listen_updates.pop(0) if fake.listen_updates else None
+                    if node is None:
+                        self._reply(200, {"type": "message", "data": "BEEP"})
+                        return
+                    with fake.lock:
+                        fake.nodes[node["id"]] = node
+                    event = {"specversion": "1.0", "data": node}
+                    self._reply(
+                        200,
+                        {
+                            "type": "message",
+                            "channel": "node",
+                            "data": json.dumps(event),
+                        },
+                    )
+                else:
+                    self._reply(404, {"detail": "Not Found"})
+
+        return Handler
+
+
+@pytest.fixture
+def fake_maestro():
+    servers = []
+
+    def start(fake):
+        server = ThreadingHTTPServer(("127.0.0.1", 0), fake.handler())
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return f"http://127.0.0.1:{server.server_address[1]}/"
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def _node(node_id, name, state, result=None, updated="2025-01-01T00:00:00"):
+    return {
+        "id": node_id,
+        "name": name,
+        "kind": "checkout" if name == "checkout" else "job",
+        "treeid": "tree-1",
+        "state": state,
+        "result": result,
+        "updated": updated,
+    }
+
+
+def test_watch_wakes_up_on_node_events(fake_maestro, monkeypatch):
+    fake = FakeMaestro(
+        [_node("c1", "checkout", "available"), _node("j1", "job1", "running")]
+    )
+    fake.listen_updates = [
+        None,
+        _node("j1", "job1", "done", "pass", updated="2025-01-01T00:00:05"),
+    ]
+    url = fake_maestro(fake)
+    monkeypatch.setattr(
+        maestro_common.time,
+        "sleep",
+        Mock(side_effect=RuntimeError("watch fell back to polling")),
+    )
+
+    maestro_common.maestro_watch_jobs(
+        url, "token", "tree-1", ["job1"], None, events=True
+    )
+
+    assert ("POST", "/latest/subscribe/node") in fake.requests
+    assert ("POST", "/latest/unsubscribe/7") in fake.requests
+    listens = [r for r in fake.requests if r == ("GET", "/latest/listen/7")]
+    # the keep-alive message is skipped, the node event ends the wait
+    assert len(listens) == 2
+
+
+def test_watch_falls_back_to_polling_without_subscription(fake_maestro, monkeypatch):
+    fake = FakeMaestro(
+        [_node("c1", "checkout", "available"), _node("j1", "job1", "running")],
+        subscribe_status=403,
+    )
+    url = fake_maestro(fake)
+
+    def sleep(seconds):
+        with fake.lock:
+            fake.nodes["j1"] = _node(
+                "j1", "job1", "done", "pass", updated="2025-01-01T00:00:05"
+            )
+
+    monkeypatch.setattr(maestro_common.time, "sleep", Mock(side_effect=sleep))
+
+    maestro_common.maestro_watch_jobs(
+        url, "token", "tree-1", ["job1"], None, events=True
+    )
+
+    maestro_common.time.sleep.assert_called_once_with(maestro_common.WATCH_POLL_FAST)
+    assert not any(path.startswith("/latest/listen") for _, path in fake.requests)
+
+
+def test_only_events_of_watched_trees_are_relevant():
+    states = {}
+    is_relevant = maestro_common._maestro_watch_relevance(states)
+    states["tree-1"] = maestro_common.maestro_watch_state(["job1"])
+    other = dict(_node("c2", "checkout", "available"), treeid="tree-2")
+
+    assert is_relevant(_node("j1", "job1", "done", "pass"))
+    assert not is_relevant(other)
+    assert not is_relevant(dict(_node("j2", "job1", "running"), treeid="tree-2"))
+
+
+def test_subscribe_returns_none_on_non_json_reply(monkeypatch):
+    response = Mock(status_code=200)
+    response.json.side_effect = ValueError("Expecting value")
+    monkeypatch.setattr(
+        maestro_common.kcidev_session, "post", Mock(return_value=response)
+    )
+
+    assert maestro_common.maestro_subscribe("https://api/", "token") is None
+
+
+def test_event_node_parsing():
+    node = {"id": "n1", "name": "job1"}
+    envelope = {"specversion": "1.0", "data": node}
+
+    assert maestro_common._maestro_event_node({"data": json.dumps(envelope)}) == node
+    assert maestro_common._maestro_event_node({"data": "BEEP"}) is None
+    assert maestro_common._maestro_event_node({"data": node}) == node
@@ -5,6 +5,7 @@ import click
 from click.testing import CliRunner
 
 from kcidev.subcommands.maestro.validate.helper import validation_rows_to_json
+from kcidev.subcommands.maestro.validate.merge import merge
 
 COMMIT = "a" * 40
 
@@ -322,7 +323,7 @@ def test_fail_on_mismatch_build_history_count_mismatch_exit_one(monkeypatch):
     monkeypatch.setattr(
         builds_module,
         "get_builds_history_stats",
-        lambda ctx, giturl, branch, tree_name, arch, days, verbose, raise_errors=False: [
+        lambda ctx, giturl, branch, tree_name, arch, days, verbose, raise_errors=False, checkpoint=None: [
             _build_row(2, 1, "❌")
         ],
     )
@@ -351,3 +352,121 @@ def test_mismatch_without_fail_on_mismatch_still_exits_zero(monkeypatch):
     result = CliRunner().invoke(command, args)
 
     assert result.exit_code == 0
+
+
+def _patch_all_command(monkeypatch, stats):
+    all_module = importlib.import_module("kcidev.subcommands.maestro.validate.all")
+    monkeypatch.setattr(
+        all_module,
+        "set_giturl_branch_commit",
+        lambda origin, giturl, branch, commit, latest, git_folder: (
+            giturl,
+            branch,
+            commit,
+        ),
+    )
+    monkeypatch.setattr(
+        all_module,
+        "get_tree_name",
+        lambda origin, giturl, branch: "mainline",
+    )
+    monkeypatch.setattr(
+        all_module,
+        "get_checkout_stats",
+        lambda ctx, giturl, branch, commit, tree_name, verbose, arch, raise_errors=False: stats,
+    )
+    return all_module.validate_all
+
+
+def test_all_json_combines_builds_and_boots(monkeypatch):
+    command = _patch_all_command(
+        monkeypatch,
+        {"builds": _build_row(), "boots": _build_row(missing_ids=["boot-1"])},
+    )
+    result = CliRunner().invoke(command, _json_args())
+
+    assert result.exit_code == 0
+    report = json.loads(_stdout(result))
+    assert report["kind"] == "all"
+    assert [r["kind"] for r in report["results"]] == ["builds", "boots"]
+    assert report["summary"]["checked"] == 2
+    assert report["summary"]["missing"] == 1
+    assert report["summary"]["ok"] is False
+
+
+def test_all_fail_on_mismatch_exit_one(monkeypatch):
+    command = _patch_all_command(
+        monkeypatch,
+        {"builds": _build_row(status_mismatch_ids=["build-1"]), "boots": []},
+    )
+    result = CliRunner().invoke(command, _json_args() + ["--fail-on-mismatch"])
+
+    assert result.exit_code == 1
+
+
+def test_checkout_stats_fetches_each_kind_once(monkeypatch):
+    helper = importlib.import_module("kcidev.subcommands.maestro.validate.helper")
+    calls = []
+    build = {"id": "b1", "result": "pass", "retry_counter": 0, "data": {}}
+
+    def get_builds(ctx, giturl, branch, commit, arch, raise_errors=False):
+        calls.append("builds")
+        return [build], [{"id": "maestro:b1", "status": "PASS"}]
+
+    def get_boots(ctx, giturl, branch, commit, arch, raise_errors=False):
+        calls.append("boots")
+        return [], None
+
+    monkeypatch.setattr(helper, "get_builds", get_builds)
+    monkeypatch.setattr(helper, "get_boots", get_boots)
+
+    stats = helper.get_checkout_stats(
+        None, "url", "master", COMMIT, "mainline", False, None
+    )
+
+    assert sorted(calls) == ["boots", "builds"]
+    assert stats["builds"][2:5] == [1, 1, "✅"]
+    assert stats["boots"] == []
+
+
+def test_merge_combines_shard_reports(tmp_path):
+    first = validation_rows_to_json("builds", [_build_row()], False, "maestro", 7, None)
+    second = validation_rows_to_json(
+        "builds", [_build_row(missing_ids=["b-1"])], False, "maestro", 7, None
+    )
+    paths = []
+    for i, report in enumerate((first, second)):
+        path = tmp_path / f"shard{i}.json"
+        path.write_text(json.dumps(report))
+        paths.append(str(path))
+
+    result = CliRunner().invoke(merge, paths + ["--fail-on-mismatch"])
+
+    assert result.exit_code == 1
+    merged = json.loads(_stdout(result))
+    assert merged["kind"] == "builds"
+    assert merged["summary"]["checked"] == 2
+    assert merged["summary"]["missing"] == 1
+
+
+def test_merge_rejects_reports_of_different_runs(tmp_path):
+    paths = []
+    for kind in ("builds", "boots"):
+        path = tmp_path / f"{kind}.json"
+        path.write_text(
+            json.dumps(validation_rows_to_json(kind, [], False, "maestro", 7, None))
+        )
+        paths.append(str(path))
+
+    result = CliRunner().invoke(merge, paths)
+
+    assert result.exit_code == 1
+    assert "different kind" in result.output
+
+
+def test_shard_requires_all_checkouts(monkeypatch):
+    command = _patch_builds_command(monkeypatch, _build_row())
+    result = CliRunner().invoke(command, _json_args() + ["--shard", "1/2"])
+
+    assert result.exit_code == 2
+    assert "--all-checkouts" in result.output
@@ -0,0 +1,171 @@
+import importlib
+import os
+from datetime import datetime, timezone
+from unittest.mock import Mock
+
+import click
+import pytest
+import requests
+from click.testing import CliRunner
+
+from kcidev.libs import maestro_common, node_store
+
+serve_module = importlib.import_module("kcidev.subcommands.maestro.validate.serve")
+
+COMMIT = "a" * 40
+
+
+def _row(tree_branch, ok=True):
+    return [
+        tree_branch,
+        COMMIT,
+        2,
+        2 if ok else 1,
+        "✅" if ok else "❌",
+        [] if ok else ["missing-1"],
+        [],
+    ]
+
+
+def _tree(name):
+    return {
+        "git_repository_url": f"https://git.example.org/{name}.git",
+        "git_repository_branch": "master",
+        "git_commit_hash": COMMIT,
+        "tree_name": name,
+        "start_time": "2025-01-01T00:00:00.000Z",
+    }
+
+
+@pytest.mark.parametrize(
+    ("value", "seconds"), [("90", 90), ("30s", 30), ("10m", 600), ("1h", 3600)]
+)
+def test_parse_interval(value, seconds):
+    assert serve_module.parse_interval(None, None, value) == seconds
+
+
+@pytest.mark.parametrize("value", ["0", "ten", "5d"])
+def test_parse_interval_rejects_invalid_values(value):
+    with pytest.raises(click.BadParameter):
+        serve_module.parse_interval(None, None, value)
+
+
+def test_serve_revalidates_only_failing_checkouts(tmp_path, monkeypatch):
+    metrics_file = tmp_path / "kci-dev.prom"
+    monkeypatch.setattr(
+        serve_module,
+        "fetch_trees",
+        Mock(return_value=[_tree("mainline"), _tree("next")]),
+    )
+
+    def checkout_stats(ctx, giturl, branch, commit, tree_name, verbose, arch):
+        ok = tree_name == "mainline"
+        return {
+            "builds": _row(f"{tree_name}/{branch}", ok),
+            "boots": _row(f"{tree_name}/{branch}"),
+        }
+
+    get_stats = Mock(side_effect=checkout_stats)
+    monkeypatch.setattr(serve_module, "get_checkout_stats", get_stats)
+    monkeypatch.setattr(serve_module.time, "sleep", Mock())
+
+    result = CliRunner().invoke(
+        serve_module.serve,
+        ["--interval", "1s", "--cycles", "2", "--metrics-file", str(metrics_file)],
+    )
+
+    assert result.exit_code == 0, result.output
+    validated = [call.args[4] for call in get_stats.mock_calls]
+    assert validated == ["mainline", "next", "next"]
+    metrics = metrics_file.read_text()
+    assert "kcidev_validate_cycles_total 2" in metrics
+    assert "kcidev_validate_revalidated_checkouts 1" in metrics
+    assert (
+        'kcidev_validate_missing_items{kind="builds",tree="next/master"} 1' in metrics
+    )
+    assert (
+        'kcidev_validate_checkouts_failed{kind="boots",tree="mainline/master"} 0'
+        in metrics
+    )
+    assert node_store.get_node_store() is None
+
+
+def test_serve_revalidates_checkouts_still_collecting_results(monkeypatch):
+    recent = _tree("next")
+    recent["start_time"] = datetime.now(timezone.utc).isoformat()
+    monkeypatch.setattr(
+        serve_module, "fetch_trees", Mock(return_value=[_tree("mainline"), recent])
+    )
+
+    def checkout_stats(ctx, giturl, branch, commit, tree_name, verbose, arch):
+        row = _row(f"{tree_name}/{branch}")
+        return {"builds": row, "boots": row}
+
+    get_stats = Mock(side_effect=checkout_stats)
+    monkeypatch.setattr(serve_module, "get_checkout_stats", get_stats)
+    monkeypatch.setattr(serve_module.time, "sleep", Mock())
+
+    result = CliRunner().invoke(
+        serve_module.serve,
+        ["--interval", "1s", "--cycles", "3", "--metrics-file", os.devnull],
+    )
+
+    assert result.exit_code == 0, result.output
+    validated = [call.args[4] for call in get_stats.mock_calls]
+    assert validated == ["mainline", "next", "next", "next"]
+
+
+def test_serve_counts_a_failed_maestro_fetch_and_keeps_running(tmp_path, monkeypatch):
+    metrics_file = tmp_path / "kci-dev.prom"
+    monkeypatch.setattr(serve_module, "fetch_trees", Mock(return_value=[_tree("next")]))
+    response = Mock(status_code=200)
+    response.json.return_value = []
+    monkeypatch.setattr(
+        maestro_common.kcidev_session,
+        "get",
+        Mock(side_effect=[requests.ConnectionError("reset"), response]),
+    )
+
+    def checkout_stats(ctx, giturl, branch, commit, tree_name, verbose, arch):
+        maestro_common.maestro_get_nodes("https://api/", None, 0, ["kind=kbuild"], 0)
+        return {"builds": _row(tree_name), "boots": _row(tree_name)}
+
+    monkeypatch.setattr(serve_module, "get_checkout_stats", checkout_stats)
+    monkeypatch.setattr(serve_module.time, "sleep", Mock())
+
+    result = CliRunner().invoke(
+        serve_module.serve,
+        ["--interval", "1s", "--cycles", "2", "--metrics-file", str(metrics_file)],
+    )
+
+    assert result.exit_code == 0, result.output
+    assert "Validation cycle failed: Could not fetch Maestro nodes" in result.output
+    metrics = metrics_file.read_text()
+    assert "kcidev_validate_cycle_errors_total 1" in metrics
+    assert "kcidev_validate_cycles_total 1" in metrics
+
+
+def test_serve_requires_a_metrics_output():
+    result = CliRunner().invoke(serve_module.serve, ["--cycles", "1"])
+
+    assert result.exit_code == 2
+    assert "--metrics-file or --metrics-port" in result.output
+
+
+def test_render_metrics_reports_api_latency():
+    state = serve_module.new_serve_state()
+    hook = serve_module.record_api_latency(state)
+    response = Mock(url="https://api.example.org/latest/nodes")
+    response.elapsed.total_seconds.return_value = 0.5
+    hook(response)
+    hook(response)
+
+    metrics = serve_module.render_metrics(state)
+
+    assert (
+        'kcidev_api_request_duration_seconds_sum{host="api.example.org"} 1.000'
+        in metrics
+    )
+    assert (
+        'kcidev_api_request_duration_seconds_count{host="api.example.org"} 2' in metrics
+    )
@@ -1,3 +1,8 @@
+import threading
+import time
+from datetime import datetime, timezone
+
+import click
 import pytest
 
 from kcidev.subcommands.maestro.validate import helper
@@ -32,3 +37,184 @@ def test_equal_counts_with_different_ids_fail_validation(
 
     assert stats[2:5] == [1, 1, "❌"]
     assert stats[5] == ["dashboard-only"]
+
+
+def _maestro(node_id, result, retry_counter=0, **data):
+    return {
+        "id": node_id,
+        "result": result,
+        "retry_counter": retry_counter,
+        "data": data,
+    }
+
+
+def test_reconcile_items_reports_missing_and_mismatch_in_one_pass():
+    maestro_builds = [
+        _maestro("b1", "pass"),
+        _maestro("b2", "fail"),
+        _maestro("b3", "incomplete"),  # retried, not reported as missing
+        _maestro("b4", "pass"),
+    ]
+    dashboard_builds = [
+        {"id": "maestro:b1", "status": "PASS"},
+        {"id": "maestro:b2", "status": "PASS"},
+    ]
+
+    missing, mismatch = helper.reconcile_items(
+        maestro_builds, dashboard_builds, "build"
+    )
+
+    assert missing == ["b4"]
+    assert mismatch == ["b2"]
+    assert helper.find_missing_items(
+        maestro_builds, dashboard_builds, "build", False
+    ) == ["b4"]
+    assert helper.validate_build_status(maestro_builds, dashboard_builds) == ["b2"]
+
+
+def test_reconcile_items_maps_boot_error_codes():
+    maestro_boots = [
+        _maestro("t1", "incomplete", 3, error_code="Infrastructure"),
+        _maestro("t2", "incomplete", 3, error_code="submit_error"),
+        _maestro("t3", "incomplete", 3, error_code="unknown"),
+    ]
+    dashboard_boots = [
+        {"id": "maestro:t1", "status": "ERROR"},
+        {"id": "maestro:t2", "status": "ERROR"},
+        {"id": "maestro:t3", "status": "ERROR"},
+        {"id": "maestro:t4", "status": "PASS"},
+    ]
+
+    missing, mismatch = helper.reconcile_items(maestro_boots, dashboard_boots, "boot")
+
+    assert missing == ["t4"]
+    assert mismatch == ["t2", "t3"]
+
+
+def test_get_builds_history_keeps_checkout_order(monkeypatch):
+    checkouts = [{"id": f"c{i}"} for i in range(4)]
+    threads = set()
+
+    def fetch(ctx, checkout, arch, raise_errors):
+        threads.add(threading.get_ident())
+        # Finish in reverse order to make sure rows are not collected by completion
+        time.sleep(0.01 * (4 - int(checkout["id"][1:])))
+        if checkout["id"] == "c2":
+            return None
+        return [checkout["id"], [], []]
+
+    monkeypatch.setattr(helper, "_get_checkout_builds", fetch)
+
+    rows = helper.get_builds_history(None, checkouts, None, workers=4)
+
+    assert [row[0] for row in rows] == ["c0", "c1", "c3"]
+    assert len(threads) > 1
+
+
+def _row(commit, ok=True):
+    return ["mainline/master", commit, 1, 1 if ok else 0, "✅" if ok else "❌", [], []]
+
+
+OLD_CHECKOUT = "2025-01-01T00:00:00.000Z"
+
+
+def test_checkpointed_skips_validated_checkouts_on_resume(tmp_path):
+    state_file = str(tmp_path / "validate.json")
+    checkpoint = helper.load_checkpoint(state_file, False)
+    helper.checkpointed(
+        checkpoint, "builds", "mainline/master", "c1", lambda: _row("c1"), OLD_CHECKOUT
+    )
+    helper.checkpointed(
+        checkpoint,
+        "builds",
+        "mainline/master",
+        "c2",
+        lambda: _row("c2", ok=False),
+        OLD_CHECKOUT,
+    )
+
+    resumed = helper.load_checkpoint(state_file, True)
+    computed = []
+
+    def compute(commit):
+        computed.append(commit)
+        return _row(commit)
+
+    for commit in ("c1", "c2", "c3"):
+        helper.checkpointed(
+            resumed, "builds", "mainline/master", commit, lambda: compute(commit)
+        )
+
+    # c1 validated fine before, c2 failed and is retried
+    assert computed == ["c2", "c3"]
+    assert helper.load_checkpoint(state_file, False)["rows"] == {}
+    assert len(helper.load_checkpoint(state_file, True)["rows"]) == 3
+
+
+def test_recent_or_empty_checkouts_are_validated_again(tmp_path):
+    state_file = str(tmp_path / "validate.json")
+    checkpoint = helper.load_checkpoint(state_file, False)
+    recent = datetime.now(timezone.utc).isoformat()
+    empty = ["mainline/master", "c2", 0, 0, "✅", [], []]
+    helper.save_checkpoint_row(checkpoint, "builds", _row("c1"), recent)
+    helper.save_checkpoint_row(checkpoint, "builds", empty, OLD_CHECKOUT)
+    helper.save_checkpoint_row(checkpoint, "builds", _row("c3"), done=True)
+
+    resumed = helper.load_checkpoint(state_file, True)
+
+    assert helper.checkpoint_row(resumed, "builds", "mainline/master", "c1") is None
+    assert helper.checkpoint_row(resumed, "builds", "mainline/master", "c2") is None
+    assert helper.checkpoint_row(resumed, "builds", "mainline/master", "c3")
+
+
+def test_resume_with_other_options_is_refused(tmp_path):
+    state_file = str(tmp_path / "validate.json")
+    options = {"origin": "maestro", "arch": None, "days": 7}
+    checkpoint = helper.load_checkpoint(state_file, False, options)
+    helper.save_checkpoint_row(checkpoint, "builds", _row("c1"), OLD_CHECKOUT)
+
+    assert helper.load_checkpoint(state_file, True, options)["rows"]
+    with pytest.raises(click.UsageError, match="Run without --resume"):
+        helper.load_checkpoint(state_file, True, dict(options, arch="arm64"))
+
+
+def test_resume_requires_state_file():
+    with pytest.raises(click.UsageError):
+        helper.load_checkpoint(None, True)
+
+
+def test_builds_history_checkpoints_completed_checkouts(tmp_path, monkeypatch):
+    state_file = str(tmp_path / "validate.json")
+    checkouts = [
+        {"id": f"n{i}", "data": {"kernel_revision": {"commit": f"c{i}"}}}
+        for i in range(3)
+    ]
+    monkeypatch.setattr(helper, "get_checkouts", lambda *args: checkouts)
+    build = {"id": "b1", "result": "pass", "retry_counter": 0, "data": {}}
+    fetched = []
+    failing = {"n1"}
+
+    def fetch(ctx, checkout, arch, raise_errors):
+        fetched.append(checkout["id"])
+        if checkout["id"] in failing:
+            raise click.Abort()
+        commit = checkout["data"]["kernel_revision"]["commit"]
+        return [commit, [build], [{"id": "maestro:b1", "status": "PASS"}]]
+
+    monkeypatch.setattr(helper, "_get_checkout_builds", fetch)
+
+    def history_stats(resume):
+        checkpoint = helper.load_checkpoint(state_file, resume)
+        return helper.get_builds_history_stats(
+            None, "url", "master", "mainline", None, 7, False, True, checkpoint
+        )
+
+    with pytest.raises(click.Abort):
+        history_stats(False)
+
+    failing.clear()
+    fetched.clear()
+    rows = history_stats(True)
+
+    assert "n0" not in fetched
+    assert [row[1] for row in rows] == ["c0", "c1", "c2"]
@@ -0,0 +1,140 @@
+import json
+import subprocess
+from unittest.mock import Mock
+
+from click.testing import CliRunner
+
+from kcidev.subcommands import bisect, multibisect
+
+
+def _git(repo, *args):
+    return subprocess.run(
+        ["git", *args], cwd=repo, check=True, capture_output=True, text=True
+    ).stdout.strip()
+
+
+def _origin(path, count):
+    path.mkdir()
+    _git(path, "init", "-b", "main")
+    _git(path, "config", "user.email", "test@example.org")
+    _git(path, "config", "user.name", "Test User")
+    _git(path, "config", "uploadpack.allowFilter", "true")
+    commits = []
+    for i in range(count):
+        (path / f"c{i}").write_text(f"{i}\n")
+        _git(path, "add", f"c{i}")
+        _git(path, "commit", "-m", f"commit {i}")
+        commits.append(_git(path, "rev-parse", "HEAD"))
+    return commits
+
+
+def test_multibisect_runs_regressions_in_shared_rounds(tmp_path, monkeypatch):
+    commits = _origin(tmp_path / "origin", 9)
+    culprits = {"login": commits[3], "smoke": commits[6]}
+    (tmp_path / "regressions.yaml").write_text(
+        "\n".join(
+            f"- {{name: {name}, good: {commits[0]}, bad: {commits[8]}, "
+            f"job_filter: baseline, platform_filter: qemu-x86, test: {name}}}"
+            for name in culprits
+        )
+    )
+    rounds = []
+
+    def run_batch(maestro, work):
+        rounds.append([state["test"] for state, commit in work])
+        steps = []
+        for state, commit in work:
+            culprit = culprits[state["test"]]
+            bad = subprocess.run(
+                ["git", "merge-base", "--is-ancestor", culprit, commit],
+                cwd=tmp_path / "origin",
+            )
+            steps.append(
+                {
+                    "commit": commit,
+                    "code": 1 if bad.returncode == 0 else 0,
+                    "reused": "maestro",
+                    "submit_seconds": 0.0,
+                    "watch_seconds": 0.0,
+                }
+            )
+        return steps
+
+    monkeypatch.setattr(multibisect, "run_bisect_batch", run_batch)
+    monkeypatch.chdir(tmp_path)
+
+    result = CliRunner().invoke(
+        multibisect.multibisect,
+        [
+            "--giturl",
+            (tmp_path / "origin").as_uri(),
+            "--branch",
+            "main",
+            "--regressions",
+            "regressions.yaml",
+        ],
+        obj={"CFG": {}, "INSTANCE": None},
+    )
+
+    assert result.exit_code == 0, result.output
+    for name, culprit in culprits.items():
+        assert f"{name}: first bad commit {culprit}" in result.output
+        state_file = tmp_path / "kcidev-src" / ".bisect" / name / "state.json"
+        assert json.loads(state_file.read_text())["first_bad"] == culprit
+    assert rounds[0] == ["login", "smoke"]
+    # one object store for all the worktrees
+    assert _git(tmp_path / "kcidev-src", "worktree", "list").count("\n") == 2
+
+
+def test_load_regressions_rejects_incomplete_entries(tmp_path):
+    regressions = tmp_path / "regressions.yaml"
+    regressions.write_text("- {name: login, good: v6.6, bad: v6.7}\n")
+
+    result = CliRunner().invoke(
+        multibisect.multibisect,
+        ["--giturl", "x", "--branch", "main", "--regressions", str(regressions)],
+        obj={"CFG": {}, "INSTANCE": None},
+    )
+
+    assert result.exit_code == 1
+    assert "misses job_filter, platform_filter, test" in result.output
+
+
+def test_regressions_testing_the_same_commit_watch_their_own_trees(monkeypatch):
+    states = []
+    for test in ("baseline.login", "baseline.dmesg"):
+        state = bisect.new_state()
+        state.update(
+            {
+                "giturl": "https://git.example.org/linux.git",
+                "branch": "master",
+                "job_filter": ["baseline-x86"],
+                "platform_filter": ["qemu-x86"],
+                "test": test,
+            }
+        )
+        states.append(state)
+
+    def find_checkout(api, giturl, branch, commit, jobs, platforms, exclude):
+        # an interrupted run left one checkout of the commit running
+        return None if "t1" in exclude else {"id": "n1", "treeid": "t1"}
+
+    send_checkout = Mock(return_value={"node": {"treeid": "t2"}})
+
+    def watch_trees(url, token, trees, job_filter, test, on_event, events):
+        assert {treeid: tree["test"] for treeid, tree in trees.items()} == {
+            "t1": "baseline.login",
+            "t2": "baseline.dmesg",
+        }
+        return {"t1": 0, "t2": 1}
+
+    monkeypatch.setattr(bisect, "find_existing_step", Mock(return_value=None))
+    monkeypatch.setattr(bisect, "maestro_find_checkout", find_checkout)
+    monkeypatch.setattr(bisect, "send_checkout_full", send_checkout)
+    monkeypatch.setattr(bisect, "maestro_watch_trees", watch_trees)
+    maestro = bisect.bisect_maestro({"prod": {"api": "https://api/"}}, "prod")
+
+    steps = multibisect.run_bisect_batch(maestro, [(s, "c1") for s in states])
+
+    assert [(s["treeid"], s["code"]) for s in steps] == [("t1", 0), ("t2", 1)]
+    send_checkout.assert_called_once()
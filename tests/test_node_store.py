@@ -0,0 +1,155 @@
+from unittest.mock import Mock
+
+import pytest
+
+from kcidev.libs import maestro_common, node_store
+
+API = "https://api.example.org/"
+
+
+def _node(node_id, state="done", updated="2025-01-01T00:00:00", **extra):
+    return {"id": node_id, "state": state, "updated": updated, **extra}
+
+
+@pytest.fixture
+def store(tmp_path):
+    node_store.set_node_store(str(tmp_path / "cache" / "nodes.sqlite"))
+    yield node_store.get_node_store()
+    node_store.set_node_store(None)
+
+
+def _response(json_data):
+    response = Mock()
+    response.json.return_value = json_data
+    response.raise_for_status.return_value = None
+    return response
+
+
+def test_node_store_keeps_only_done_nodes(store):
+    revision = {"kernel_revision": {"commit": "abc", "branch": "main"}}
+    assert store.add(API, [_node("n1", data=revision), _node("n2", "running")]) == 1
+
+    assert store.get(API, "n1")["data"] == revision
+    assert store.get(API, "n2") is None
+    assert store.get("https://other.example.org/", "n1") is None
+
+
+def test_configure_node_store_reads_instance_then_global(tmp_path):
+    cfg = {
+        "node_store": str(tmp_path / "global.sqlite"),
+        "staging": {"node_store": str(tmp_path / "staging.sqlite")},
+    }
+    try:
+        node_store.configure_node_store(cfg, "staging")
+        assert node_store.get_node_store().path.endswith("staging.sqlite")
+        node_store.configure_node_store(cfg, "production")
+        assert node_store.get_node_store().path.endswith("global.sqlite")
+    finally:
+        node_store.set_node_store(None)
+
+
+def test_maestro_get_node_serves_done_nodes_from_store(store, monkeypatch):
+    get = Mock(return_value=_response(_node("n1", result="pass")))
+    monkeypatch.setattr(maestro_common.kcidev_session, "get", get)
+
+    first = maestro_common.maestro_get_node(API, "n1")
+    second = maestro_common.maestro_get_node(API, "n1")
+
+    assert first == second
+    get.assert_called_once()
+
+
+def test_repeated_node_walk_only_fetches_changes(store, monkeypatch):
+    served = {
+        (): [_node("n1"), _node("n2", "running", "2025-01-01T00:00:05")],
+        ("updated__gt",): [_node("n2", updated="2025-01-01T00:01:00")],
+        ("state__ne",): [_node("n3", "running", "2025-01-01T00:01:30")],
+    }
+
+    def get(url, headers, params, timeout):
+        params = dict(params)
+        if params["offset"]:
+            return _response([])
+        key = tuple(k for k in ("updated__gt", "state__ne") if k in params)
+        return _response(served[key])
+
+    session_get = Mock(side_effect=get)
+    monkeypatch.setattr(maestro_common.kcidev_session, "get", session_get)
+
+    first = maestro_common.maestro_get_nodes(API, 50, 0, ["kind=job"], False)
+    second = maestro_common.maestro_get_nodes(API, 50, 0, ["kind=job"], False)
+
+    assert [(n["id"], n["state"]) for n in first] == [("n1", "done"), ("n2", "running")]
+    assert [(n["id"], n["state"]) for n in second] == [
+        ("n1", "done"),
+        ("n2", "done"),
+        ("n3", "running"),
+    ]
+    incremental = [
+        dict(call.kwargs["params"])
+        for call in session_get.mock_calls
+        if "updated__gt" in dict(call.kwargs["params"])
+    ]
+    # the running n2 does not move the mark
+    assert incremental[0]["updated__gt"] == "2025-01-01T00:00:00"
+    assert incremental[0]["state"] == "done"
+
+
+def test_node_finishing_before_the_mark_is_fetched_again(store, monkeypatch):
+    # n1 finishes while the first walk runs, n2 is still running then and
+    # ends up done with an updated value older than n1's
+    nodes = {
+        "n1": _node("n1", updated="2025-01-01T00:10:00"),
+        "n2": _node("n2", "running", "2025-01-01T00:05:00"),
+    }
+
+    def get(url, headers, params, timeout):
+        params = dict(params)
+        if params["offset"]:
+            return _response([])
+        served = nodes.values()
+        if "updated__gt" in params:
+            served = [
+                n
+                for n in served
+                if n["state"] == "done" and n["updated"] > params["updated__gt"]
+            ]
+        elif "state__ne" in params:
+            served = [n for n in served if n["state"] != "done"]
+        return _response(list(served))
+
+    monkeypatch.setattr(maestro_common.kcidev_session, "get", Mock(side_effect=get))
+    monkeypatch.setattr(maestro_common, "sync_limit", lambda: "2025-01-01T00:04:00")
+
+    maestro_common.maestro_get_nodes(API, 50, 0, ["kind=job"], False)
+    nodes["n2"] = _node("n2", updated="2025-01-01T00:08:00")
+    second = maestro_common.maestro_get_nodes(API, 50, 0, ["kind=job"], False)
+
+    assert [(n["id"], n["state"]) for n in second] == [("n1", "done"), ("n2", "done")]
+    assert store.query_synced(API, store.query_key(["kind=job"])) == (
+        "2025-01-01T00:04:00"
+    )
+
+
+def test_node_walk_from_store_keeps_the_api_order(store, monkeypatch):
+    nodes = [_node("n3"), _node("n1", "running"), _node("n2")]
+
+    def get(url, headers, params, timeout):
+        params = dict(params)
+        if params["offset"]:
+            return _response([])
+        served = nodes
+        if "updated__gt" in params:
+            served = [n for n in nodes[3:] if n["state"] == "done"]
+        elif "state__ne" in params:
+            served = [n for n in nodes if n["state"] != "done"]
+        return _response(served)
+
+    monkeypatch.setattr(maestro_common.kcidev_session, "get", Mock(side_effect=get))
+
+    first = maestro_common.maestro_get_nodes(API, 50, 0, ["kind=job"], False)
+    nodes.append(_node("n0", updated="2025-01-01T00:01:00"))
+    second = maestro_common.maestro_get_nodes(API, 50, 0, ["kind=job"], False)
+
+    assert [n["id"] for n in first] == ["n3", "n1", "n2"]
+    assert [n["id"] for n in second] == ["n3", "n1", "n2", "n0"]
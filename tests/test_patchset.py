@@ -221,4 +221,5 @@ def test_patchset_watch_calls_watch_jobs(monkeypatch, patch_file):
         ("baseline-x86",),
         "baseline.login",
         root_node="patchset",
+        events=False,
     )
@@ -0,0 +1,76 @@
+import pstats
+import subprocess
+import sys
+from pathlib import Path
+
+from click.testing import CliRunner
+
+from kcidev.main import get_cli
+
+
+def _settings(tmp_path):
+    settings = tmp_path / "kci-dev.toml"
+    settings.write_text('default_instance = "staging"\n[staging]\n')
+    return str(settings)
+
+
+def test_profile_option_writes_pstats_and_report(tmp_path):
+    profile = tmp_path / "run.prof"
+
+    result = CliRunner().invoke(
+        get_cli(),
+        ["--settings", _settings(tmp_path), "--profile", str(profile)]
+        + ["results", "--help"],
+    )
+
+    assert result.exit_code == 0, result.output
+    assert pstats.Stats(str(profile)).total_calls > 0
+    report = (tmp_path / "run.prof.txt").read_text()
+    assert report.startswith("Peak traced memory:")
+    assert "sites of memory still allocated at exit" in report
+    assert "Ordered by: cumulative time" in report
+
+
+def test_profile_path_from_environment(tmp_path):
+    profile = tmp_path / "env.prof"
+
+    result = CliRunner().invoke(
+        get_cli(),
+        ["--settings", _settings(tmp_path), "results", "--help"],
+        env={"KCIDEV_PROFILE": str(profile)},
+    )
+
+    assert result.exit_code == 0, result.output
+    assert profile.exists()
+    assert (tmp_path / "env.prof.txt").exists()
+
+
+def test_unwritable_profile_is_reported(tmp_path):
+    profile = tmp_path / "missing" / "run.prof"
+
+    result = CliRunner().invoke(
+        get_cli(),
+        ["--settings", _settings(tmp_path), "--profile", str(profile)]
+        + ["results", "--help"],
+    )
+
+    assert result.exit_code == 0
+    assert f"Could not write profile {profile}" in result.output
+
+
+def test_profile_includes_the_subcommand_import(tmp_path):
+    profile = tmp_path / "import.prof"
+
+    # A new interpreter, where the subcommand module is not imported yet
+    subprocess.run(
+        [sys.executable, "-m", "kcidev.main", "--settings", _settings(tmp_path)]
+        + ["--profile", str(profile), "results", "--help"],
+        cwd=Path(__file__).parents[1],
+        check=True,
+        capture_output=True,
+    )
+
+    files = {Path(filename) for filename, _, _ in pstats.Stats(str(profile)).stats}
+    assert Path("kcidev", "subcommands", "results", "__init__.py") in {
+        Path(*path.parts[-4:]) for path in files
+    }
@@ -0,0 +1,154 @@
+from unittest.mock import Mock
+
+from click.testing import CliRunner
+
+from kcidev import KernelCIClient
+from kcidev.libs import results as results_data
+from kcidev.subcommands import results as results_module
+from kcidev.subcommands.maestro.validate import helper
+
+
+def _build(build_id, status, compiler="gcc"):
+    return {
+        "id": build_id,
+        "status": status,
+        "compiler": compiler,
+        "config_name": "defconfig",
+        "architecture": "x86_64",
+        "git_repository_branch": "master",
+        "log_url": None,
+    }
+
+
+def _boot(boot_id, status, path="baseline.login"):
+    return {
+        "id": boot_id,
+        "status": status,
+        "path": path,
+        "start_time": "2025-01-02T00:00:00Z",
+    }
+
+
+def test_fetch_builds_filters_records(monkeypatch):
+    fetch = Mock(
+        return_value={
+            "builds": [
+                _build("b1", "PASS"),
+                _build("b2", "FAIL"),
+                _build("b3", "FAIL", compiler="clang"),
+            ]
+        }
+    )
+    monkeypatch.setattr(results_data, "dashboard_fetch_builds", fetch)
+
+    builds = results_data.fetch_builds(
+        "maestro", "https://git.example.org/linux.git", "master", "c" * 40, "x86_64"
+    )
+    failed_gcc = results_data.fetch_builds(
+        "maestro",
+        "https://git.example.org/linux.git",
+        "master",
+        "c" * 40,
+        status="fail",
+        compiler="gcc",
+    )
+
+    assert [b["id"] for b in builds] == ["b1", "b2", "b3"]
+    assert [b["id"] for b in failed_gcc] == ["b2"]
+    assert fetch.call_args_list[0].args[4] == "x86_64"
+
+
+def test_fetch_boots_applies_test_filters(monkeypatch):
+    fetch = Mock(
+        return_value={
+            "boots": [
+                _boot("t1", "PASS"),
+                _boot("t2", "FAIL"),
+                _boot("t3", "FAIL", path="baseline.dmesg"),
+            ]
+        }
+    )
+    monkeypatch.setattr(results_data, "dashboard_fetch_boots", fetch)
+
+    boots = results_data.fetch_boots(
+        "maestro",
+        "https://git.example.org/linux.git",
+        "master",
+        "c" * 40,
+        boot_origin="maestro",
+        status="fail",
+        test_path="baseline.login",
+    )
+
+    assert [b["id"] for b in boots] == ["t2"]
+    assert fetch.call_args.args[9] == "maestro"
+
+
+def test_builds_command_prints_fetched_records(monkeypatch):
+    fetch = Mock(return_value=[_build("b1", "FAIL"), _build("b2", "FAIL")])
+    monkeypatch.setattr(results_module, "fetch_builds", fetch)
+
+    result = CliRunner().invoke(
+        results_module.builds,
+        [
+            "--giturl",
+            "https://git.example.org/linux.git",
+            "--branch",
+            "master",
+            "--commit",
+            "c" * 40,
+            "--status",
+            "fail",
+            "--count",
+        ],
+    )
+
+    assert result.exit_code == 0, result.output
+    assert result.output.strip().endswith("2")
+    assert fetch.call_args.args[8] == "fail"
+
+
+def test_validation_fetches_without_click_commands(monkeypatch):
+    maestro_nodes = Mock(return_value=[{"id": "n1"}])
+    dashboard_builds = Mock(return_value=[{"id": "b1"}])
+    monkeypatch.setattr(helper, "maestro_get_nodes", maestro_nodes)
+    monkeypatch.setattr(helper, "fetch_builds", dashboard_builds)
+    ctx = Mock(obj={"CFG": {"prod": {"api": "https://api/"}}, "INSTANCE": "prod"})
+
+    maestro, dashboard = helper.get_builds(
+        ctx, "https://git.example.org/linux.git", "master", "c" * 40, None
+    )
+
+    assert maestro == [{"id": "n1"}]
+    assert dashboard == [{"id": "b1"}]
+    assert maestro_nodes.call_args.args[0] == "https://api/"
+    assert maestro_nodes.call_args.args[4] is False
+    ctx.invoke.assert_not_called()
+
+
+def test_client_list_builds_returns_filtered_records(monkeypatch):
+    fetch = Mock(return_value={"builds": [_build("b1", "PASS"), _build("b2", "FAIL")]})
+    monkeypatch.setattr(results_data, "dashboard_fetch_builds", fetch)
+
+    builds = KernelCIClient().list_builds(
+        "maestro",
+        "https://git.example.org/linux.git",
+        "master",
+        "c" * 40,
+        status="fail",
+    )
+
+    assert [b["id"] for b in builds] == ["b2"]
+
+
+def test_shard_is_rejected_for_a_single_checkout():
+    checkout = ["--giturl", "https://git.example.org/linux.git", "--branch", "master"]
+    checkout += ["--commit", "c" * 40, "--shard", "1/2"]
+
+    issues = CliRunner().invoke(results_module.issues, ["--new"] + checkout)
+    detect = CliRunner().invoke(results_module.detect, ["--new"] + checkout)
+
+    assert issues.exit_code == 2
+    assert "--shard only works with --new or --missing" in issues.output
+    assert detect.exit_code == 2
+    assert "--shard only works with --all-checkouts" in detect.output
@@ -7,12 +7,14 @@ pytest chain unnoticed.
 
 import importlib
 import pkgutil
+import subprocess
+import sys
 
 import click
 import pytest
 from click.testing import CliRunner
 
-from kcidev.main import get_cli
+from kcidev.main import LazyGroup, get_cli
 
 PACKAGES_UNDER_TEST = ("kcidev.subcommands", "kcidev.libs")
 
@@ -41,7 +43,9 @@ def test_every_kcidev_script_imports(module_name):
 def _click_command_paths(command, prefix=()):
     yield prefix, command
     if isinstance(command, click.Group):
-        for name, child in sorted(command.commands.items()):
+        ctx = click.Context(command)
+        for name in command.list_commands(ctx):
+            child = command.get_command(ctx, name)
             yield from _click_command_paths(child, prefix + (name,))
 
 
@@ -73,7 +77,7 @@ def test_every_registered_cli_command_has_working_help(path, command, tmp_path):
 def test_registered_cli_exposes_expected_top_level_commands():
     """Protect against accidentally dropping a kcidev subcommand from main.py."""
     cli = get_cli()
-    assert set(cli.commands) >= {
+    assert set(cli.list_commands(click.Context(cli))) >= {
         "bisect",
         "checkout",
         "config",
@@ -85,3 +89,30 @@ def test_registered_cli_exposes_expected_top_level_commands():
         "testretry",
         "watch",
     }
+
+
+def test_cli_startup_imports_no_subcommand_module():
+    """Subcommand modules and their dependencies are imported on first use."""
+    code = (
+        "import sys\n"
+        "from kcidev.main import get_cli\n"
+        "get_cli()\n"
+        "print(sorted(m for m in sys.modules if m.split('.')[0] in "
+        "('git', 'kcidev', 'tabulate', 'yaml')))\n"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", code], check=True, capture_output=True, text=True
+    ).stdout
+
+    assert "kcidev.subcommands" not in output
+    assert "'git'" not in output
+    assert "'kcidev.api'" not in output
+
+
+def test_lazy_group_loads_only_the_invoked_subcommand():
+    group = LazyGroup(lazy_subcommands={"config": "kcidev.subcommands.config:config"})
+
+    assert group.commands == {}
+    assert group.list_commands(click.Context(group)) == ["config"]
+    assert group.get_command(click.Context(group), "config").name == "config"
+    assert group.get_command(click.Context(group), "unknown") is None
@@ -0,0 +1,43 @@
+import click
+import pytest
+
+from kcidev.libs.shard import SHARD, shard_trees, tree_shard
+
+
+def _trees(count):
+    return [
+        {
+            "git_repository_url": f"https://git.example.org/tree{i}.git",
+            "git_repository_branch": "master" if i % 2 else "next",
+        }
+        for i in range(count)
+    ]
+
+
+def test_shards_partition_the_tree_list():
+    trees = _trees(50)
+    shards = [shard_trees(trees, (i, 4)) for i in range(1, 5)]
+
+    assert sorted(len(s) for s in shards) != [0, 0, 0, 50]
+    assert sum(len(s) for s in shards) == len(trees)
+    for tree in trees:
+        assert sum(tree in s for s in shards) == 1
+
+
+def test_tree_shard_is_stable():
+    url = "https://git.kernel.org/pub/scm/linux/kernel/git/torvalds/linux.git"
+    # Must not change between releases, CI jobs rely on it
+    assert tree_shard(url, "master", 4) == 4
+    assert tree_shard(url, "master", 7) == 6
+    assert tree_shard(url, "master", 1) == 1
+    assert shard_trees(_trees(3), None) == _trees(3)
+
+
+@pytest.mark.parametrize("value", ["0/4", "5/4", "1/0", "1", "a/b"])
+def test_shard_param_rejects_invalid_values(value):
+    with pytest.raises(click.BadParameter):
+        SHARD.convert(value, None, None)
+
+
+def test_shard_param_converts_to_tuple():
+    assert SHARD.convert("2/3", None, None) == (2, 3)
@@ -1,3 +1,4 @@
+import json
 from unittest.mock import Mock
 
 from click.testing import CliRunner
@@ -43,6 +44,7 @@ def test_watch_uses_patchset_root_for_patchset_node(monkeypatch):
         ("job1",),
         None,
         root_node="patchset",
+        events=False,
     )
 
 
@@ -57,6 +59,7 @@ def test_watch_uses_checkout_root_by_default(monkeypatch):
         ("job1",),
         None,
         root_node="checkout",
+        events=False,
     )
 
 
@@ -76,3 +79,38 @@ def test_watch_requires_job_filter(monkeypatch):
     assert "Missing option '--job-filter'" in result.output
     get_node.assert_not_called()
     watch_jobs.assert_not_called()
+
+
+def test_watch_requires_nodeid_or_treeid(monkeypatch):
+    result = CliRunner().invoke(watch, ["--job-filter", "job1"], obj=_cli_obj())
+
+    assert result.exit_code == 2
+    assert "Provide --nodeid or --treeid" in result.output
+
+
+def test_watch_multiple_trees_uses_one_watch_loop(monkeypatch):
+    watch_trees = Mock(return_value={"t1": 0, "t2": 1})
+    watch_jobs = Mock()
+    monkeypatch.setattr(watch_module, "maestro_watch_trees", watch_trees)
+    monkeypatch.setattr(watch_module, "maestro_watch_jobs", watch_jobs)
+
+    result = CliRunner().invoke(
+        watch,
+        ["--treeid", "t1", "--treeid", "t2", "--job-filter", "job1"],
+        obj=_cli_obj(),
+    )
+
+    assert result.exit_code == 1
+    watch_jobs.assert_not_called()
+    args = watch_trees.call_args.args
+    assert args[:5] == (
+        "https://api.example.org/",
+        "token123",
+        {"t1": "checkout", "t2": "checkout"},
+        ("job1",),
+        None,
+    )
+    assert json.loads(result.output.splitlines()[-1]) == {
+        "event": "summary",
+        "exit_codes": {"t1": 0, "t2": 1},
+    }